@@ -2,7 +2,8 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from database.db import get_db
-from database.crud import JobCRUD
+from database.crud import JobCRUD, SkillCRUD
+from jobsscraping.features import city_code, split_skills
 from ..schemas import JobResponse, JobSearch, JobCreate
 import logging
 
@@ -45,19 +46,40 @@ async def search_jobs(
     location: Optional[str] = Query(None, description="Filter by location"),
     industry: Optional[str] = Query(None, description="Filter by industry"),
     experience_level: Optional[str] = Query(None, description="Filter by experience level"),
+    skills: Optional[str] = Query(None, description="Comma-separated skills, any of them"),
+    min_salary: Optional[float] = Query(None, ge=0, description="Minimum salary (upper bound of the job's range)"),
+    salary_currency: Optional[str] = Query(None, description="Salary currency: USD or VND"),
+    max_years_experience: Optional[int] = Query(None, ge=0, description="Jobs requiring at most this many years"),
+    collapse_duplicates: bool = Query(True, description="Return one job per near-duplicate cluster"),
     db: Session = Depends(get_db)
 ):
     """Search jobs by query with optional filters"""
     try:
-        jobs = JobCRUD.search_jobs(db, query, source)
+        # Location / skill được chuẩn hóa như lúc ingest để filter theo JobFeatures / JobSkill
+        location_code = city_code(location) if location else None
+        skill_ids = None
+        if skills:
+            skill_ids = list(SkillCRUD.get_skill_ids(db, split_skills(skills)).values())
+            if not skill_ids:
+                return []
+        
+        jobs = JobCRUD.search_jobs(
+            db, query, source,
+            collapse_duplicates=collapse_duplicates,
+            city_code=location_code,
+            skill_ids=skill_ids,
+            min_salary=min_salary,
+            salary_currency=salary_currency.upper() if salary_currency else None,
+            max_years_experience=max_years_experience
+        )
         
         # Apply additional filters
-        if location:
-            jobs = [job for job in jobs if job.location and location.lower() in job.location.lower()]
+        if location and not location_code:
+            jobs = [job for job in jobs if job.Location and location.lower() in job.Location.lower()]
         if industry:
-            jobs = [job for job in jobs if job.industry and industry.lower() in job.industry.lower()]
+            jobs = [job for job in jobs if job.Industry and industry.lower() in job.Industry.lower()]
         if experience_level:
-            jobs = [job for job in jobs if job.experience_level and experience_level.lower() in job.experience_level.lower()]
+            jobs = [job for job in jobs if job.ExperienceLevel and experience_level.lower() in job.ExperienceLevel.lower()]
         
         return jobs
     except Exception as e:
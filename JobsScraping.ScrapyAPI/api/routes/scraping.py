@@ -1,21 +1,58 @@
 from fastapi import APIRouter, HTTPException, BackgroundTasks, Query, Depends
 from typing import List, Optional
-from worker.tasks import scrape_jobs, schedule_scraping
-from ..schemas import ScrapingJobCreate, ScrapingJobResponse
+from worker.tasks import SCHEDULED_SOURCES, plan_scrape, scrape_jobs, schedule_scraping
+from ..schemas import ScrapingJobCreate, ScrapingJobResponse, ScrapingThroughputTrend
 from database.db import get_db
 from database.crud import ScrapingJobCRUD
 from sqlalchemy.orm import Session
+import json
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/scraping", tags=["scraping"])
 
+def scraping_job_to_response(job) -> dict:
+    """ScrapingJob (+ ScrapingJobStats) -> dict theo ScrapingJobResponse"""
+    stats = None
+    if job.Stats is not None:
+        stats = {
+            "finish_reason": job.Stats.FinishReason,
+            "items_scraped": job.Stats.ItemsScraped or 0,
+            "request_count": job.Stats.RequestCount or 0,
+            "response_count": job.Stats.ResponseCount or 0,
+            "response_bytes": job.Stats.ResponseBytes or 0,
+            "elapsed_seconds": job.Stats.ElapsedSeconds,
+            "items_per_second": job.Stats.ItemsPerSecond,
+            "latency_p50_ms": job.Stats.LatencyP50Ms,
+            "latency_p95_ms": job.Stats.LatencyP95Ms,
+            "responses_by_status": json.loads(job.Stats.ResponsesByStatus or "{}"),
+            "latency_histogram": json.loads(job.Stats.LatencyHistogram or "{}"),
+        }
+    return {
+        "id": job.Id,
+        "source": job.Source,
+        "max_jobs": job.MaxJobs or 0,
+        "status": job.Status,
+        "task_id": job.TaskId,
+        "started_at": job.StartedAt,
+        "completed_at": job.CompletedAt,
+        "jobs_scraped": job.JobsScraped or 0,
+        "error_message": job.ErrorMessage,
+        "created_at": job.CreatedAt,
+        "shard": job.Shard,
+        "parent_id": job.ParentId,
+        "stats": stats
+    }
+
 @router.post("/start", response_model=ScrapingJobResponse)
 async def start_scraping(
     source: str = Query(..., description="Source to scrape from"),
     max_jobs: int = Query(50, ge=1, le=500, description="Maximum jobs to scrape"),
-    background_tasks: BackgroundTasks = None
+    shards: int = Query(1, ge=1, le=32, description="Split the crawl into parallel shards across workers"),
+    background_tasks: BackgroundTasks = None,
+    db: Session = Depends(get_db)
 ):
     """Start scraping jobs from specified source"""
     try:
@@ -27,21 +64,17 @@ async def start_scraping(
                 detail=f"Invalid source. Must be one of: {', '.join(valid_sources)}"
             )
         
-        # Start scraping task
-        task = scrape_jobs.delay(source, max_jobs)
+        # Tạo dòng ScrapingJobs trước để trả về Id thật, worker cập nhật khi chạy
+        task_id = str(uuid.uuid4())
+        db_job = ScrapingJobCRUD.create_scraping_job(db, source, task_id=task_id, max_jobs=max_jobs)
+        if shards > 1:
+            # Planner tạo các shard con (ParentId = dòng này) và gộp kết quả khi xong
+            plan_scrape.apply_async(args=(source, shards, max_jobs), kwargs={'scraping_job_id': db_job.Id},
+                                    task_id=task_id)
+        else:
+            scrape_jobs.apply_async(args=(source, max_jobs), kwargs={'scraping_job_id': db_job.Id}, task_id=task_id)
         
-        return {
-            "id": 0,  # Will be updated when stored in DB
-            "source": source,
-            "status": "started",
-            "task_id": task.id,
-            "max_jobs": max_jobs,
-            "started_at": None,
-            "completed_at": None,
-            "jobs_scraped": 0,
-            "error_message": None,
-            "created_at": "2024-01-01T00:00:00Z"  # Placeholder
-        }
+        return scraping_job_to_response(db_job)
     except HTTPException:
         raise
     except Exception as e:
@@ -57,7 +90,7 @@ async def schedule_scraping_jobs():
             "status": "success",
             "message": "Scraping jobs scheduled for all sources",
             "task_id": task.id,
-            "scheduled_sources": ['topdev', 'vietnamwork', 'topcv', 'linkedin']
+            "scheduled_sources": SCHEDULED_SOURCES
         }
     except Exception as e:
         logger.error(f"Error scheduling scraping: {e}")
@@ -92,21 +125,50 @@ async def get_scraping_history(
 ):
     """Get scraping job history"""
     try:
-        if source:
-            jobs = ScrapingJobCRUD.get_recent_scraping_jobs(db, source, hours)
-        else:
-            # Get all recent scraping jobs
-            from datetime import datetime, timedelta
-            cutoff_time = datetime.utcnow() - timedelta(hours=hours)
-            jobs = db.query(ScrapingJobCRUD).filter(
-                ScrapingJobCRUD.created_at >= cutoff_time
-            ).order_by(ScrapingJobCRUD.created_at.desc()).all()
-        
-        return jobs
+        jobs = ScrapingJobCRUD.get_scraping_job_history(db, source, hours)
+        return [scraping_job_to_response(job) for job in jobs]
     except Exception as e:
         logger.error(f"Error getting scraping history: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
 
+@router.get("/jobs/trends", response_model=List[ScrapingThroughputTrend])
+async def get_scraping_trends(
+    source: Optional[str] = Query(None, description="Filter by source"),
+    days: int = Query(7, ge=1, le=90, description="Days to look back"),
+    db: Session = Depends(get_db)
+):
+    """Throughput per source per day from completed runs"""
+    try:
+        trends = {}
+        for job in ScrapingJobCRUD.get_scraping_job_history(db, source, days * 24):
+            if job.Stats is None or job.CreatedAt is None:
+                continue
+            key = (job.Source, job.CreatedAt.date())
+            trend = trends.setdefault(key, {"runs": 0, "items": 0, "bytes": 0, "ips": [], "p95": []})
+            trend["runs"] += 1
+            trend["items"] += job.Stats.ItemsScraped or 0
+            trend["bytes"] += job.Stats.ResponseBytes or 0
+            if job.Stats.ItemsPerSecond is not None:
+                trend["ips"].append(job.Stats.ItemsPerSecond)
+            if job.Stats.LatencyP95Ms is not None:
+                trend["p95"].append(job.Stats.LatencyP95Ms)
+        
+        return [
+            {
+                "source": job_source,
+                "day": day,
+                "runs": trend["runs"],
+                "items_scraped": trend["items"],
+                "response_bytes": trend["bytes"],
+                "avg_items_per_second": round(sum(trend["ips"]) / len(trend["ips"]), 3) if trend["ips"] else None,
+                "avg_latency_p95_ms": round(sum(trend["p95"]) / len(trend["p95"]), 1) if trend["p95"] else None
+            }
+            for (job_source, day), trend in sorted(trends.items(), key=lambda kv: (kv[0][0], kv[0][1]))
+        ]
+    except Exception as e:
+        logger.error(f"Error getting scraping trends: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
 @router.get("/sources/status")
 async def get_sources_status():
     """Get current status of all scraping sources"""
@@ -146,7 +208,8 @@ async def cancel_scraping_task(task_id: str):
     """Cancel a running scraping task"""
     try:
         from worker.celery_app import celery_app
-        celery_app.control.revoke(task_id, terminate=True)
+        # SIGUSR1 = soft time limit: crawl dừng êm và giữ state để /resume chạy tiếp
+        celery_app.control.revoke(task_id, terminate=True, signal='SIGUSR1')
         
         return {
             "status": "success",
@@ -171,7 +234,7 @@ async def cancel_all_scraping_tasks():
                 for task in tasks:
                     if task['name'] == 'worker.tasks.scrape_jobs':
                         # Tắt task
-                        celery_app.control.revoke(task['id'], terminate=True)
+                        celery_app.control.revoke(task['id'], terminate=True, signal='SIGUSR1')
                         cancelled_tasks.append(task['id'])
         
         return {
@@ -182,4 +245,27 @@ async def cancel_all_scraping_tasks():
         }
     except Exception as e:
         logger.error(f"Error cancelling all tasks: {e}")
-        raise HTTPException(status_code=500, detail="Internal server error")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.post("/resume/{task_id}", response_model=ScrapingJobResponse)
+async def resume_scraping_task(task_id: str, db: Session = Depends(get_db)):
+    """Resume a cancelled or failed scraping task from its saved crawl state"""
+    try:
+        db_job = ScrapingJobCRUD.get_scraping_job_by_task_id(db, task_id)
+        if not db_job:
+            raise HTTPException(status_code=404, detail="Scraping job not found")
+        if db_job.Status in ("pending", "running"):
+            raise HTTPException(status_code=409, detail=f"Scraping job is {db_job.Status}")
+        
+        # Task mới đọc JOBDIR của task cũ; worker cập nhật TaskId của dòng ScrapingJobs
+        scrape_jobs.apply_async(
+            args=(db_job.Source, db_job.MaxJobs or 50),
+            kwargs={'scraping_job_id': db_job.Id, 'resume_from': task_id, 'shard': db_job.Shard}
+        )
+        return scraping_job_to_response(db_job)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error resuming scraping task {task_id}: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
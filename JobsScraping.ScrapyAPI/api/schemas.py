@@ -1,6 +1,6 @@
 from pydantic import BaseModel, EmailStr
-from typing import Optional, List
-from datetime import datetime
+from typing import Dict, Optional, List
+from datetime import date, datetime
 from decimal import Decimal
 
 # Job schemas
@@ -46,19 +46,44 @@ class ScrapingJobBase(BaseModel):
 class ScrapingJobCreate(ScrapingJobBase):
     pass
 
+class ScrapingJobStatsResponse(BaseModel):
+    finish_reason: Optional[str] = None
+    items_scraped: int = 0
+    request_count: int = 0
+    response_count: int = 0
+    response_bytes: int = 0
+    elapsed_seconds: Optional[float] = None
+    items_per_second: Optional[float] = None
+    latency_p50_ms: Optional[float] = None
+    latency_p95_ms: Optional[float] = None
+    responses_by_status: Dict[str, int] = {}
+    latency_histogram: Dict[str, int] = {}
+
 class ScrapingJobResponse(ScrapingJobBase):
     id: int
     status: str
-    task_id: str
+    task_id: Optional[str] = None
     started_at: Optional[datetime] = None
     completed_at: Optional[datetime] = None
     jobs_scraped: int = 0
     error_message: Optional[str] = None
     created_at: datetime
+    shard: Optional[str] = None
+    parent_id: Optional[int] = None
+    stats: Optional[ScrapingJobStatsResponse] = None
     
     class Config:
         from_attributes = True
 
+class ScrapingThroughputTrend(BaseModel):
+    source: str
+    day: date
+    runs: int
+    items_scraped: int
+    response_bytes: int
+    avg_items_per_second: Optional[float] = None
+    avg_latency_p95_ms: Optional[float] = None
+
 # User schemas
 class UserBase(BaseModel):
     name: Optional[str] = None
@@ -123,6 +148,8 @@ class JobMatchCreate(JobMatchBase):
 class JobMatchResponse(JobMatchBase):
     id: int
     created_date: datetime
+    algorithm_version: Optional[int] = None
+    corpus_version: Optional[str] = None
     
     class Config:
         from_attributes = True
\ No newline at end of file
@@ -0,0 +1,113 @@
+"""
+Micro-benchmark trích xuất JSON nhúng của trang chi tiết VietnamWorks.
+
+So sánh cách cũ (4 regex DOTALL + json.loads + walk_find 3 lần) với
+jobsscraping.extractors trên các trang đã ghi lại trong benchmarks/fixtures.
+
+    python -m benchmarks.bench_detail_extractor [--pages DIR] [--seconds N]
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import time
+
+from jobsscraping.extractors import extract_embedded_json, extract_job_requirement
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures", "vietnamwork")
+
+
+def legacy_extract(text):
+    """Bản sao logic cũ của VietnamWorkSpider.parse_job_detail"""
+    candidates = []
+    for m in re.finditer(r'<script[^>]*id="__NEXT_DATA__"[^>]*>\s*({.*?})\s*</script>', text, flags=re.DOTALL):
+        candidates.append(m.group(1))
+    for m in re.finditer(r'window\.__NUXT__\s*=\s*({.*?});\s*</script>', text, flags=re.DOTALL):
+        candidates.append(m.group(1))
+    for m in re.finditer(r'<script[^>]*type="application/json"[^>]*>\s*({.*?})\s*</script>', text, flags=re.DOTALL):
+        candidates.append(m.group(1))
+    for m in re.finditer(r'=\s*({\".*?\"})\s*[,;]</script>', text, flags=re.DOTALL):
+        candidates.append(m.group(1))
+
+    embed = None
+    for raw in candidates:
+        try:
+            embed = json.loads(raw)
+            break
+        except Exception:
+            continue
+
+    job_level = None
+    years_of_exp = None
+    if embed:
+        def walk_find(node, keys):
+            found = []
+            if isinstance(node, dict):
+                for k, v in node.items():
+                    if k in keys:
+                        found.append((k, v))
+                    found.extend(walk_find(v, keys))
+            elif isinstance(node, list):
+                for it in node:
+                    found.extend(walk_find(it, keys))
+            return found
+
+        job_req_nodes = [v for k, v in walk_find(embed, {"jobRequirement"})]
+        if job_req_nodes:
+            jr = next((n for n in job_req_nodes if isinstance(n, (dict, str))), None)
+            if isinstance(jr, dict):
+                job_level = jr.get("jobLevel")
+                years_of_exp = jr.get("yearsOfExperience")
+        if job_level is None:
+            jl_nodes = [v for k, v in walk_find(embed, {"jobLevel"})]
+            job_level = jl_nodes[0] if jl_nodes else None
+        if years_of_exp is None:
+            y_nodes = [v for k, v in walk_find(embed, {"yearsOfExperience"})]
+            years_of_exp = y_nodes[0] if y_nodes else None
+    return job_level, years_of_exp
+
+
+def current_extract(text):
+    return extract_job_requirement(extract_embedded_json(text))
+
+
+def measure(func, pages, seconds):
+    """Chạy vòng qua các trang trong `seconds` giây, trả về pages/sec"""
+    done = 0
+    started = time.perf_counter()
+    deadline = started + seconds
+    while time.perf_counter() < deadline:
+        for text in pages:
+            func(text)
+        done += len(pages)
+    return done / (time.perf_counter() - started)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", default=FIXTURES_DIR, help="Thư mục chứa trang chi tiết (*.html)")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Thời gian chạy mỗi phiên bản")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.pages, "detail_*.html")))
+    if not paths:
+        raise SystemExit(f"No recorded pages in {args.pages}")
+    pages = []
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            pages.append(f.read())
+
+    for path, text in zip(paths, pages):
+        before, after = legacy_extract(text), current_extract(text)
+        status = "ok" if before == after else f"DIFF legacy={before} current={after}"
+        print(f"{os.path.basename(path)}: {status}")
+
+    before = measure(legacy_extract, pages, args.seconds)
+    after = measure(current_extract, pages, args.seconds)
+    print(f"legacy : {before:10.1f} pages/sec")
+    print(f"current: {after:10.1f} pages/sec ({after / before:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
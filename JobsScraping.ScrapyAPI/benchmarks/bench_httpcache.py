@@ -0,0 +1,96 @@
+"""
+So sánh FilesystemCacheStorage với jobsscraping.httpcache.SqliteCacheStorage.
+
+Ghi rồi đọc lại N response (body lấy từ benchmarks/fixtures), báo latency
+trung bình mỗi thao tác, dung lượng đĩa và số file (inode) của mỗi storage.
+
+    python -m benchmarks.bench_httpcache [--responses N]
+"""
+import argparse
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+from scrapy import Spider
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+STORAGES = {
+    "filesystem": "scrapy.extensions.httpcache.FilesystemCacheStorage",
+    "sqlite": "jobsscraping.httpcache.SqliteCacheStorage",
+}
+
+
+def disk_usage(path):
+    total = 0
+    files = 0
+    for root, dirs, names in os.walk(path):
+        files += len(dirs)
+        for name in names:
+            total += os.path.getsize(os.path.join(root, name))
+            files += 1
+    return total, files
+
+
+def run(storage_path, bodies, count, workdir):
+    from scrapy.utils.misc import load_object
+
+    cachedir = os.path.join(workdir, "httpcache")
+    crawler = get_crawler(Spider, {
+        "HTTPCACHE_DIR": cachedir,
+        "HTTPCACHE_EXPIRATION_SECS": 0,
+        "HTTPCACHE_MAX_BYTES": 0,
+    })
+    spider = crawler._create_spider("bench")
+    storage = load_object(storage_path)(crawler.settings)
+    storage.open_spider(spider)
+
+    pairs = []
+    for i in range(count):
+        request = Request(f"https://www.vietnamworks.com/job-{i}-jv", method="POST")
+        response = HtmlResponse(request.url, body=bodies[i % len(bodies)], request=request)
+        pairs.append((request, response))
+
+    started = time.perf_counter()
+    for request, response in pairs:
+        storage.store_response(spider, request, response)
+    write_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for request, _ in pairs:
+        assert storage.retrieve_response(spider, request) is not None
+    read_seconds = time.perf_counter() - started
+    storage.close_spider(spider)
+
+    size, files = disk_usage(cachedir)
+    return write_seconds / count, read_seconds / count, size, files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--responses", type=int, default=2000, help="Số response ghi/đọc")
+    args = parser.parse_args()
+
+    bodies = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "**", "*.html"), recursive=True)):
+        with open(path, "rb") as f:
+            bodies.append(f.read())
+    if not bodies:
+        raise SystemExit(f"No fixture pages in {FIXTURES_DIR}")
+
+    print(f"{'storage':<12}{'write ms':>10}{'read ms':>10}{'disk MB':>10}{'files':>8}")
+    for name, storage_path in STORAGES.items():
+        workdir = tempfile.mkdtemp(prefix=f"bench_{name}_")
+        try:
+            write, read, size, files = run(storage_path, bodies, args.responses, workdir)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        print(f"{name:<12}{write * 1000:>10.3f}{read * 1000:>10.3f}{size / 1024 ** 2:>10.1f}{files:>8}")
+
+
+if __name__ == "__main__":
+    main()
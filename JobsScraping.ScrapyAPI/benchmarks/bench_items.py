@@ -0,0 +1,231 @@
+"""
+So sánh item dict cũ của spider với jobsscraping.items.JobItem.
+
+Dựng N item từ các job trong benchmarks/fixtures (TopDev + VietnamWorks), báo
+bộ nhớ giữ lại mỗi item (tracemalloc) và thời gian đưa item qua feed exporter
+(JSON lines) cùng bước map sang cột JobsDes của pipeline.
+
+    python -m benchmarks.bench_items [--items N]
+"""
+import argparse
+import gc
+import glob
+import io
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+from scrapy.exporters import JsonLinesItemExporter
+
+from jobsscraping.items import JobItem
+from jobsscraping.utils import to_datetime, to_text
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def load_jobs():
+    topdev, vietnamwork = [], []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "topdev", "jobs_page_*.json"))):
+        with open(path, encoding="utf-8") as f:
+            topdev.extend(json.load(f)["data"])
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "vietnamwork", "search_page_*.json"))):
+        with open(path, encoding="utf-8") as f:
+            vietnamwork.extend(json.load(f)["data"])
+    return topdev, vietnamwork
+
+
+def _names(values, key):
+    return [v.get(key) for v in values or [] if isinstance(v, dict) and v.get(key)]
+
+
+# --- Cách cũ: spider yield dict thô, pipeline map từng source sang cột JobsDes ---
+
+def legacy_topdev(job):
+    company = job.get("company", {})
+    return {
+        "id": job.get("id"),
+        "title": job.get("title"),
+        "company": company.get("slug") or "Company Not Found",
+        "location": job.get("addresses"),
+        "description": job.get("content"),
+        "url": job.get("detail_url") or job.get("job_url"),
+        "posted_date": job.get("published"),
+        "job_type": job.get("job_types_str"),
+        "salary": job.get("salary"),
+        "experience_level": job.get("job_levels_str"),
+        "industry": company.get("industries_str"),
+        "employment_type": job.get("job_types_str"),
+        "required_skills": job.get("skills_str"),
+        "benefits": job.get("benefits"),
+        "source": "topdev",
+        "scraped_at": datetime.utcnow(),
+    }
+
+
+def legacy_vietnamwork(job):
+    first_loc = (job.get("workingLocations") or [None])[0] or {}
+    return {
+        "jobId": job.get("jobId"),
+        "jobTitle": job.get("jobTitle"),
+        "jobUrl": job.get("jobUrl"),
+        "companyName": job.get("companyName"),
+        "companyLogo": job.get("companyLogo"),
+        "workingLocations.address": first_loc.get("address"),
+        "workingLocations.cityNameVI": first_loc.get("cityNameVI"),
+        "salaryMin": job.get("salaryMin"),
+        "salaryMax": job.get("salaryMax"),
+        "prettySalary": job.get("prettySalary"),
+        "skills.skillName": _names(job.get("skills"), "skillName"),
+        "jobLevelVI": job.get("jobLevelVI"),
+        "industriesV3.industryV3NameVI": _names(job.get("industriesV3"), "industryV3NameVI"),
+        "jobFunctionsV3.jobFunctionV3NameVI": _names(job.get("jobFunctionsV3"), "jobFunctionV3NameVI"),
+        "createdOn": job.get("createdOn"),
+        "expiredOn": job.get("expiredOn"),
+        "source": "vietnamwork",
+        "scraped_date": datetime.utcnow(),
+        "jobRequirement.jobLevel": None,
+        "jobRequirement.yearsOfExperience": None,
+    }
+
+
+def legacy_row(item):
+    if item["source"] == "topdev":
+        row = {
+            "Title": item.get("title"),
+            "Company": item.get("company"),
+            "Location": to_text(item.get("location")),
+            "Description": to_text(item.get("description")),
+            "Url": item.get("url"),
+            "PostedDate": to_datetime(item.get("posted_date")),
+            "JobType": to_text(item.get("job_type")),
+            "Salary": to_text(item.get("salary")),
+            "ExperienceLevel": to_text(item.get("experience_level")),
+            "Industry": to_text(item.get("industry")),
+            "EmploymentType": to_text(item.get("employment_type")),
+            "RequiredSkills": to_text(item.get("required_skills")),
+            "Benefits": to_text(item.get("benefits")),
+            "Source": "topdev",
+        }
+    else:
+        row = {
+            "Title": item.get("jobTitle"),
+            "Company": item.get("companyName"),
+            "Location": to_text(item.get("workingLocations.address") or item.get("workingLocations.cityNameVI")),
+            "Description": None,
+            "Url": item.get("jobUrl"),
+            "PostedDate": to_datetime(item.get("createdOn")),
+            "JobType": to_text(item.get("jobFunctionsV3.jobFunctionV3NameVI")),
+            "Salary": to_text(item.get("prettySalary")),
+            "ExperienceLevel": to_text(item.get("jobRequirement.jobLevel") or item.get("jobLevelVI")),
+            "Industry": to_text(item.get("industriesV3.industryV3NameVI")),
+            "EmploymentType": None,
+            "RequiredSkills": to_text(item.get("skills.skillName")),
+            "Benefits": None,
+            "Source": "vietnamwork",
+        }
+    row["RawContent"] = json.dumps(item, ensure_ascii=False, default=str)
+    return row
+
+
+# --- Cách mới: spider chuẩn hóa một lần thành JobItem ---
+
+def current_topdev(job):
+    company = job.get("company") or {}
+    return JobItem(
+        title=job.get("title"),
+        company=company.get("slug") or "Company Not Found",
+        location=to_text(job.get("addresses")),
+        description=to_text(job.get("content")),
+        url=job.get("detail_url") or job.get("job_url"),
+        posted_date=to_datetime(job.get("published")),
+        job_type=to_text(job.get("job_types_str")),
+        salary=to_text(job.get("salary")),
+        experience_level=to_text(job.get("job_levels_str")),
+        industry=to_text(company.get("industries_str")),
+        employment_type=to_text(job.get("job_types_str")),
+        required_skills=to_text(job.get("skills_str")),
+        benefits=to_text(job.get("benefits")),
+        source="topdev",
+        job_id=to_text(job.get("id")),
+        scraped_at=datetime.utcnow(),
+    )
+
+
+def current_vietnamwork(job):
+    first_loc = (job.get("workingLocations") or [None])[0] or {}
+    return JobItem(
+        title=job.get("jobTitle"),
+        company=job.get("companyName"),
+        location=to_text(first_loc.get("address") or first_loc.get("cityNameVI")),
+        description="\n".join(part for part in (job.get("jobDescription"), job.get("jobRequirement"))
+                               if isinstance(part, str) and part) or None,
+        url=job.get("jobUrl"),
+        posted_date=to_datetime(job.get("createdOn")),
+        job_type=to_text(_names(job.get("jobFunctionsV3"), "jobFunctionV3NameVI")),
+        salary=to_text(job.get("prettySalary")),
+        experience_level=to_text(job.get("jobLevelVI")),
+        industry=to_text(_names(job.get("industriesV3"), "industryV3NameVI")),
+        required_skills=to_text(_names(job.get("skills"), "skillName")),
+        source="vietnamwork",
+        job_id=to_text(job.get("jobId")),
+        scraped_at=datetime.utcnow(),
+    )
+
+
+def current_row(item):
+    row = item.to_row()
+    row["RawContent"] = json.dumps(item.to_dict(), ensure_ascii=False, default=str)
+    return row
+
+
+def build(count, jobs, topdev_func, vietnamwork_func):
+    """Dựng `count` item, mỗi job được decode lại để không dùng chung object giữa các item"""
+    topdev, vietnamwork = jobs
+    raw = [(topdev_func, json.dumps(job)) for job in topdev] + [(vietnamwork_func, json.dumps(job)) for job in vietnamwork]
+    items = []
+    for i in range(count):
+        func, body = raw[i % len(raw)]
+        items.append(func(json.loads(body)))
+    return items
+
+
+def run(name, count, jobs, topdev_func, vietnamwork_func, row_func):
+    gc.collect()
+    tracemalloc.start()
+    items = build(count, jobs, topdev_func, vietnamwork_func)
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    buffer = io.BytesIO()
+    exporter = JsonLinesItemExporter(buffer)
+    exporter.start_exporting()
+    started = time.perf_counter()
+    for item in items:
+        exporter.export_item(item)
+        row_func(item)
+    elapsed = time.perf_counter() - started
+    exporter.finish_exporting()
+
+    print(f"{name:<8}{retained / count:>12.0f}{retained / 1024 ** 2:>12.1f}{count / elapsed:>14.0f}")
+    del items
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=100000, help="Số item dựng cho mỗi cách")
+    args = parser.parse_args()
+
+    jobs = load_jobs()
+    if not any(jobs):
+        raise SystemExit(f"No fixture jobs in {FIXTURES_DIR}")
+
+    print(f"{'items':<8}{'bytes/item':>12}{'total MB':>12}{'export+map/s':>14}")
+    run("dict", args.items, jobs, legacy_topdev, legacy_vietnamwork, legacy_row)
+    run("JobItem", args.items, jobs, current_topdev, current_vietnamwork, current_row)
+
+
+if __name__ == "__main__":
+    main()
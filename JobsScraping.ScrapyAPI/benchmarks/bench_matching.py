@@ -0,0 +1,133 @@
+"""
+So sánh vòng lặp chấm điểm từng job (cách cũ) với worker.matching.MatchingEngine.
+
+Dựng N job giả lập (skill, mã thành phố, số năm kinh nghiệm, token mô tả) và một
+batch CV, báo thời gian chấm một CV với mọi job và thời gian mỗi CV khi chấm theo
+batch, có và không có điểm tương đồng text (TextIndex).
+
+    python -m benchmarks.bench_matching [--jobs N] [--cvs N] [--skills N] [--terms N]
+"""
+import argparse
+import random
+import time
+from collections import Counter
+
+from worker.matching import MatchingEngine, TermCounts, TextIndex
+
+CITIES = ["HCM", "HN", "DN", "REMOTE", None]
+
+
+def generate(jobs, skills, cvs, terms, seed=42):
+    rng = random.Random(seed)
+    # Tần suất token theo phân phối Zipf như văn bản thật
+    vocabulary = [f"t{term}" for term in range(terms)]
+    weights = [1 / (rank + 1) for rank in range(terms)]
+
+    features, job_skills, job_texts = [], [], []
+    for job_id in range(1, jobs + 1):
+        features.append((job_id, None, rng.choice(CITIES), rng.choice([None, 0, 1, 2, 3, 5])))
+        job_skills.extend((job_id, skill_id) for skill_id in rng.sample(range(1, skills + 1), rng.randint(0, 8)))
+        job_texts.append((job_id, " ".join(rng.choices(vocabulary, weights, k=rng.randint(50, 300)))))
+    profiles = [{
+        "skills": {skill_id: f"Skill {skill_id}" for skill_id in rng.sample(range(1, skills + 1), rng.randint(1, 15))},
+        "city_code": rng.choice(["HCM", "HN", None]),
+        "years": rng.choice([None, 1.0, 3.5, 8.0]),
+        "terms": rng.choices(vocabulary, weights, k=rng.randint(200, 800)),
+    } for _ in range(cvs)]
+    return features, job_skills, job_texts, profiles
+
+
+# --- Cách cũ: mỗi cặp CV/job là một lần gọi hàm Python ---
+
+def legacy_score(profile, job_skill_ids, city_code, min_years):
+    score = 0.0
+    total_criteria = 0
+    if profile["skills"] and job_skill_ids:
+        score += len(job_skill_ids & profile["skills"].keys()) / len(job_skill_ids) * 0.4
+        total_criteria += 1
+    if profile["years"] is not None and min_years is not None:
+        score += 0.3 if min_years == 0 else min(profile["years"] / min_years, 1.0) * 0.3
+        total_criteria += 1
+    if profile["city_code"] and city_code:
+        if city_code in (profile["city_code"], "REMOTE"):
+            score += 0.2
+        total_criteria += 1
+    score += 0.1
+    total_criteria += 1
+    return score / total_criteria
+
+
+def legacy_match(profile, jobs, k=10):
+    scored = [(legacy_score(profile, skill_ids, city, years), job_id) for job_id, skill_ids, city, years in jobs]
+    scored.sort(reverse=True)
+    return scored[:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=100000, help="Số job")
+    parser.add_argument("--cvs", type=int, default=64, help="Số CV trong batch")
+    parser.add_argument("--skills", type=int, default=2000, help="Số skill trong vocabulary")
+    parser.add_argument("--terms", type=int, default=30000, help="Số token khác nhau trong mô tả job")
+    args = parser.parse_args()
+
+    features, job_skills, job_texts, profiles = generate(args.jobs, args.skills, args.cvs, args.terms)
+    by_job = {}
+    for job_id, skill_id in job_skills:
+        by_job.setdefault(job_id, set()).add(skill_id)
+    legacy_jobs = [(job_id, by_job.get(job_id, set()), city, years) for job_id, _, city, years in features]
+
+    started = time.perf_counter()
+    engine = MatchingEngine.build(features, job_skills)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    legacy_match(profiles[0], legacy_jobs)
+    legacy_time = time.perf_counter() - started
+
+    engine.match(profiles[:1])
+    started = time.perf_counter()
+    for _ in range(10):
+        engine.match(profiles[:1])
+    single_time = (time.perf_counter() - started) / 10
+
+    started = time.perf_counter()
+    engine.match(profiles)
+    batch_time = (time.perf_counter() - started) / len(profiles)
+
+    # Document frequency như TermStats sau khi ingest toàn bộ job
+    doc_freqs = Counter(term for _, tokens in job_texts for term in set(tokens.split()))
+    vocabulary = TextIndex.build_vocabulary(doc_freqs, len(job_texts))
+    started = time.perf_counter()
+    term_counts = TermCounts()
+    term_counts.add(job_texts)
+    count_time = time.perf_counter() - started
+
+    # Load lại ma trận trong worker: tf đã có trong TermCounts, chỉ tính lại trọng số
+    started = time.perf_counter()
+    text_engine = MatchingEngine.build(features, job_skills, vocabulary=vocabulary, term_counts=term_counts)
+    text_build_time = time.perf_counter() - started
+
+    text_engine.match(profiles[:1])
+    started = time.perf_counter()
+    for _ in range(10):
+        text_engine.match(profiles[:1])
+    text_single_time = (time.perf_counter() - started) / 10
+
+    started = time.perf_counter()
+    text_engine.match(profiles)
+    text_batch_time = (time.perf_counter() - started) / len(profiles)
+
+    print(f"{args.jobs} jobs, {engine.skills.nnz} job skills, index built in {build_time * 1000:.0f} ms")
+    print(f"{text_engine.text.postings.nnz} text entries ({len(text_engine.text.vocabulary)} terms), "
+          f"tf counted in {count_time * 1000:.0f} ms, index with text built from tf in {text_build_time * 1000:.0f} ms")
+    print(f"{'method':<20}{'ms/CV':>10}")
+    print(f"{'loop':<20}{legacy_time * 1000:>10.1f}")
+    print(f"{'engine':<20}{single_time * 1000:>10.1f}")
+    print(f"{'engine batch':<20}{batch_time * 1000:>10.1f}")
+    print(f"{'engine+text':<20}{text_single_time * 1000:>10.1f}")
+    print(f"{'engine+text batch':<20}{text_batch_time * 1000:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""
+Benchmark offline cho các callback parse của spider, không gọi mạng.
+
+Response được dựng từ các trang đã ghi lại trong benchmarks/fixtures (thay cho
+downloader) rồi đưa thẳng vào callback. Mỗi target chạy trong một process riêng
+để đo peak RSS chính xác; báo items/sec, CPU time mỗi item và peak RSS.
+
+    python -m benchmarks.replay [--target NAME ...] [--seconds N]
+    python -m benchmarks.replay --save-baseline baseline.json
+    python -m benchmarks.replay --baseline baseline.json --tolerance 0.2
+"""
+import argparse
+import glob
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def _crawler(spidercls):
+    from scrapy.utils.project import get_project_settings
+    from scrapy.utils.test import get_crawler
+
+    settings = get_project_settings().copy_to_dict()
+    settings.update({
+        "HTTPCACHE_ENABLED": False,
+        "INCREMENTAL_CRAWL": False,
+        "REQUEST_FINGERPRINTER_IMPLEMENTATION": "2.7",
+    })
+    crawler = get_crawler(spidercls, settings)
+    return crawler, spidercls.from_crawler(crawler)
+
+
+def _replay_pages(spider, callback, page_key):
+    """
+    Callback trang danh sách chỉ xử lý page đang dở dang và mỗi page một lần
+    (PageStateMixin); replay gọi lại cùng các page nên đăng ký lại page trước mỗi lần
+    """
+    def replay(response):
+        page = response.meta[page_key]
+        spider._claimed_pages.discard(page)
+        spider.page_sent(page)
+        return callback(response)
+    return replay
+
+
+def topdev_parse_job_list():
+    """TopDevSpider.parse_job_list trên các page JSON đã ghi"""
+    from scrapy.http import TextResponse
+    from jobsscraping.spiders.topdev_spider import TopDevSpider
+
+    _, spider = _crawler(TopDevSpider)
+    responses = []
+    for index, path in enumerate(sorted(glob.glob(os.path.join(FIXTURES_DIR, "topdev", "jobs_page_*.json")))):
+        request = spider.build_page_request(index)
+        responses.append(TextResponse(request.url, body=_read(path), encoding="utf-8", request=request,
+                                      headers={"Content-Type": "application/json"}))
+    return _replay_pages(spider, spider.parse_job_list, "page_index"), responses
+
+
+def vietnamwork_parse_job_list():
+    """VietnamWorkSpider.parse_job_list trên các page search JSON đã ghi"""
+    from scrapy.http import TextResponse
+    from jobsscraping.spiders.vietnamwork_spider import VietnamWorkSpider
+
+    _, spider = _crawler(VietnamWorkSpider)
+    responses = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "vietnamwork", "search_page_*.json"))):
+        page = int(os.path.basename(path).rsplit("_", 1)[1].split(".")[0])
+        request = spider.build_page_request(page)
+        responses.append(TextResponse(request.url, body=_read(path), encoding="utf-8", request=request,
+                                      headers={"Content-Type": "application/json"}))
+    return _replay_pages(spider, spider.parse_job_list, "page_index"), responses
+
+
+def vietnamwork_parse_job_detail():
+    """VietnamWorkSpider.parse_job_detail trên các trang chi tiết HTML đã ghi"""
+    from scrapy.http import HtmlResponse, Request
+    from jobsscraping.items import JobItem
+    from jobsscraping.spiders.vietnamwork_spider import VietnamWorkSpider
+
+    _, spider = _crawler(VietnamWorkSpider)
+    responses = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "vietnamwork", "detail_*.html"))):
+        job_id = int(os.path.basename(path).rsplit("_", 1)[1].split(".")[0])
+        item = JobItem(title="Replay", source="vietnamwork", job_id=str(job_id))
+        request = Request(f"https://www.vietnamworks.com/replay-{job_id}-jv", method="POST",
+                          meta={"item": item, "jobId": job_id})
+        responses.append(HtmlResponse(request.url, body=_read(path), encoding="utf-8", request=request))
+    return spider.parse_job_detail, responses
+
+
+def topcv_parse_job_list():
+    """TopCVSpider.parse_job_list trên các page JSON đã ghi"""
+    from scrapy.http import TextResponse
+    from jobsscraping.spiders.topcv_spider import TopCVSpider
+
+    _, spider = _crawler(TopCVSpider)
+    responses = []
+    for index, path in enumerate(sorted(glob.glob(os.path.join(FIXTURES_DIR, "topcv", "jobs_page_*.json")))):
+        request = spider.build_page_request(index)
+        responses.append(TextResponse(request.url, body=_read(path), encoding="utf-8", request=request,
+                                      headers={"Content-Type": "application/json"}))
+    return _replay_pages(spider, spider.parse_job_list, "page_index"), responses
+
+
+def linkedin_parse_job_list():
+    """LinkedInSpider.parse_job_list trên các fragment job card đã ghi"""
+    from scrapy.http import HtmlResponse
+    from jobsscraping.spiders.linkedin_spider import LinkedInSpider
+
+    _, spider = _crawler(LinkedInSpider)
+    paths = glob.glob(os.path.join(FIXTURES_DIR, "linkedin", "search_start_*.html"))
+    responses = []
+    for path in sorted(paths, key=lambda p: int(os.path.basename(p).rsplit("_", 1)[1].split(".")[0])):
+        offset = int(os.path.basename(path).rsplit("_", 1)[1].split(".")[0])
+        request = spider.build_page_request(offset // spider.page_size)
+        responses.append(HtmlResponse(request.url, body=_read(path), encoding="utf-8", request=request))
+    return _replay_pages(spider, spider.parse_job_list, "page_index"), responses
+
+
+def linkedin_parse_job_detail():
+    """LinkedInSpider.parse_job_detail trên các trang jobPosting đã ghi"""
+    from scrapy.http import HtmlResponse
+    from jobsscraping.items import JobItem
+    from jobsscraping.spiders.linkedin_spider import LinkedInSpider
+
+    _, spider = _crawler(LinkedInSpider)
+    responses = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "linkedin", "detail_*.html"))):
+        job_id = os.path.basename(path).rsplit("_", 1)[1].split(".")[0]
+        item = JobItem(title="Replay", source="linkedin", job_id=job_id)
+        request = spider.build_detail_request(spider.detail_url({"id": job_id}), item)
+        responses.append(HtmlResponse(request.url, body=_read(path), encoding="utf-8", request=request))
+    return spider.parse_job_detail, responses
+
+
+TARGETS = {
+    "topdev.parse_job_list": topdev_parse_job_list,
+    "vietnamwork.parse_job_list": vietnamwork_parse_job_list,
+    "vietnamwork.parse_job_detail": vietnamwork_parse_job_detail,
+    "topcv.parse_job_list": topcv_parse_job_list,
+    "linkedin.parse_job_list": linkedin_parse_job_list,
+    "linkedin.parse_job_detail": linkedin_parse_job_detail,
+}
+
+
+def _fresh(response):
+    # Response cache kết quả decode (response.json(), selector) nên tạo bản mới mỗi vòng
+    return response.replace(body=response.body)
+
+
+def measure(target, seconds):
+    """Chạy một target trong process hiện tại, trả về dict kết quả"""
+    from scrapy import Request
+
+    callback, responses = TARGETS[target]()
+    if not responses:
+        raise SystemExit(f"No fixtures for {target} in {FIXTURES_DIR}")
+
+    items = requests = 0
+    wall_started = time.perf_counter()
+    cpu_started = time.process_time()
+    deadline = wall_started + seconds
+    while time.perf_counter() < deadline:
+        for response in responses:
+            for output in callback(_fresh(response)) or ():
+                if isinstance(output, Request):
+                    requests += 1
+                else:
+                    items += 1
+    wall = time.perf_counter() - wall_started
+    cpu = time.process_time() - cpu_started
+
+    # ru_maxrss tính bằng KB trên Linux
+    peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return {
+        "target": target,
+        "items": items,
+        "requests": requests,
+        "items_per_sec": round(items / wall, 1),
+        "outputs_per_sec": round((items + requests) / wall, 1),
+        "cpu_us_per_output": round(cpu / max(items + requests, 1) * 1e6, 2),
+        "peak_rss_mb": round(peak_rss_mb, 1),
+    }
+
+
+def run_isolated(target, seconds):
+    output = subprocess.check_output(
+        [sys.executable, "-m", "benchmarks.replay", "--child", target, "--seconds", str(seconds)],
+        cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", choices=sorted(TARGETS), help="Mặc định chạy tất cả")
+    parser.add_argument("--seconds", type=float, default=3.0, help="Thời gian chạy mỗi target")
+    parser.add_argument("--baseline", help="File JSON kết quả trước đó để so sánh")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Mức giảm outputs/sec cho phép so với baseline")
+    parser.add_argument("--save-baseline", help="Ghi kết quả lần chạy này ra file JSON")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(measure(args.child, args.seconds)))
+        return
+
+    baseline = {}
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results = {}
+    regressions = []
+    print(f"{'target':<32}{'items/s':>10}{'outputs/s':>11}{'cpu us/out':>12}{'peak MB':>9}")
+    for target in args.target or list(TARGETS):
+        result = results[target] = run_isolated(target, args.seconds)
+        line = (f"{target:<32}{result['items_per_sec']:>10.1f}{result['outputs_per_sec']:>11.1f}"
+                f"{result['cpu_us_per_output']:>12.2f}{result['peak_rss_mb']:>9.1f}")
+        previous = baseline.get(target)
+        if previous:
+            change = result["outputs_per_sec"] / previous["outputs_per_sec"] - 1
+            line += f"  {change:+.0%} vs baseline"
+            if change < -args.tolerance:
+                regressions.append(target)
+        print(line)
+
+    if args.save_baseline:
+        with open(args.save_baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    if regressions:
+        raise SystemExit(f"Throughput regression: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,41 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_, desc
-from typing import List, Optional
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, or_, bindparam, case, desc, func, insert, update
+from sqlalchemy.exc import DBAPIError, IntegrityError
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
 from . import models
 from datetime import datetime, timedelta
+import time
+
+# Cột JobsDes so sánh khi upsert: dòng trùng mọi cột này với bản đã lưu không được ghi lại
+# (RawContent luôn khác vì chứa scraped_at)
+JOB_CONTENT_COLUMNS = ("Title", "Company", "Location", "Description", "PostedDate", "JobType", "Salary",
+                       "ExperienceLevel", "Industry", "EmploymentType", "RequiredSkills", "Benefits")
+
+# Số lần ghi JobTexts/TermStats khi gặp xung đột với worker khác (token mới trùng, deadlock)
+TEXT_WRITE_ATTEMPTS = 3
+
+
+def _same_content(row: dict, stored) -> bool:
+    """Dòng upsert có cùng nội dung với dòng JobsDes đã lưu (DATETIME của SQL Server làm tròn mili giây)"""
+    for column in JOB_CONTENT_COLUMNS:
+        if column not in row:
+            continue
+        value, old = row[column], getattr(stored, column)
+        if isinstance(value, datetime) and isinstance(old, datetime):
+            if value.replace(microsecond=0, tzinfo=None) != old.replace(microsecond=0, tzinfo=None):
+                return False
+        elif value != old:
+            return False
+    return True
+
+
+def is_deadlock(error: Exception) -> bool:
+    """Transaction bị SQL Server chọn làm deadlock victim (lỗi 1205, SQLSTATE 40001)"""
+    if not isinstance(error, DBAPIError) or isinstance(error, IntegrityError):
+        return False
+    message = str(error.orig)
+    return "1205" in message or "40001" in message or "deadlock" in message.lower()
 
 # Job CRUD operations
 class JobCRUD:
@@ -18,6 +51,69 @@ class JobCRUD:
     def get_job_by_url(db: Session, url: str) -> Optional[models.JobsDes]:
         return db.query(models.JobsDes).filter(models.JobsDes.Url == url).first()
     
+    @staticmethod
+    def get_job_ids_by_urls(db: Session, urls: List[str]) -> Dict[str, int]:
+        # SQL Server giới hạn ~2100 tham số mỗi câu lệnh nên chia nhỏ danh sách
+        result = {}
+        for start in range(0, len(urls), 1000):
+            chunk = urls[start:start + 1000]
+            rows = db.query(models.JobsDes.Url, models.JobsDes.Id).filter(
+                models.JobsDes.Url.in_(chunk)
+            ).all()
+            result.update({url: job_id for url, job_id in rows})
+        return result
+    
+    @staticmethod
+    def get_cluster_ids(db: Session, job_ids: List[int]) -> Dict[int, int]:
+        """JobId -> nhóm tin trùng của job (ClusterId, hoặc chính Id nếu chưa gán)"""
+        result = {}
+        for start in range(0, len(job_ids), 1000):
+            chunk = job_ids[start:start + 1000]
+            rows = db.query(models.JobsDes.Id, models.JobsDes.ClusterId).filter(
+                models.JobsDes.Id.in_(chunk)
+            ).all()
+            result.update({job_id: cluster_id or job_id for job_id, cluster_id in rows})
+        return result
+    
+    @staticmethod
+    def bulk_upsert_jobs(db: Session, rows: List[dict]) -> Dict[str, int]:
+        """
+        Insert/update nhiều job trong một transaction, khóa theo Url.
+        Dùng executemany (fast_executemany với pyodbc) thay vì commit từng dòng.
+        Dòng đã có và không đổi nội dung (JOB_CONTENT_COLUMNS) thì bỏ qua; "job_ids" là
+        Url -> Id của các job được insert hoặc update, để các bước sau chỉ xử lý job mới/đổi.
+        """
+        by_url = {row["Url"]: row for row in rows if row.get("Url")}
+        urls = list(by_url)
+        existing = {}
+        for start in range(0, len(urls), 1000):
+            chunk = urls[start:start + 1000]
+            stored = db.query(models.JobsDes.Id, models.JobsDes.Url,
+                              *(getattr(models.JobsDes, column) for column in JOB_CONTENT_COLUMNS)).filter(
+                models.JobsDes.Url.in_(chunk)
+            ).all()
+            existing.update({job.Url: job for job in stored})
+        
+        new_rows = [row for url, row in by_url.items() if url not in existing]
+        changed_rows = [dict(row, Id=existing[url].Id) for url, row in by_url.items()
+                        if url in existing and not _same_content(row, existing[url])]
+        
+        try:
+            if new_rows:
+                db.execute(insert(models.JobsDes), new_rows)
+            if changed_rows:
+                db.execute(update(models.JobsDes), changed_rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        
+        job_ids = {row["Url"]: row["Id"] for row in changed_rows}
+        if new_rows:
+            job_ids.update(JobCRUD.get_job_ids_by_urls(db, [row["Url"] for row in new_rows]))
+        return {"inserted": len(new_rows), "updated": len(changed_rows),
+                "unchanged": len(existing) - len(changed_rows), "job_ids": job_ids}
+    
     @staticmethod
     def get_jobs_by_source(db: Session, source: str, limit: int = 100) -> List[models.JobsDes]:
         return db.query(models.JobsDes).filter(
@@ -25,20 +121,70 @@ class JobCRUD:
         ).order_by(desc(models.JobsDes.PostedDate)).limit(limit).all()
     
     @staticmethod
-    def search_jobs(db: Session, query: str, source: Optional[str] = None) -> List[models.JobsDes]:
-        filters = [
-            or_(
-                models.JobsDes.Title.ilike(f"%{query}%"),
-                models.JobsDes.Description.ilike(f"%{query}%"),
-                models.JobsDes.Company.ilike(f"%{query}%"),
-                models.JobsDes.RequiredSkills.ilike(f"%{query}%")
-            )
+    def search_jobs(db: Session, query: str, source: Optional[str] = None, limit: Optional[int] = None,
+                    collapse_duplicates: bool = False, city_code: Optional[str] = None,
+                    skill_ids: Optional[List[int]] = None, min_salary: Optional[float] = None,
+                    salary_currency: Optional[str] = None, max_years_experience: Optional[int] = None,
+                    load_features: bool = False) -> List[models.JobsDes]:
+        from jobsscraping.text import tokenize
+        
+        # Mô tả được tìm trên token đã chuẩn hóa lúc ingest (JobTexts), không phải HTML gốc,
+        # nên "lap trinh vien" khớp "Lập trình viên"
+        text_query = " ".join(tokenize(query))
+        conditions = [
+            models.JobsDes.Title.ilike(f"%{query}%"),
+            models.JobsDes.Company.ilike(f"%{query}%"),
+            models.JobsDes.RequiredSkills.ilike(f"%{query}%")
         ]
+        if text_query:
+            conditions.append(models.JobText.Tokens.ilike(f"%{text_query}%"))
+        filters = [or_(*conditions)]
         
         if source:
             filters.append(models.JobsDes.Source == source)
         
-        return db.query(models.JobsDes).filter(and_(*filters)).order_by(desc(models.JobsDes.PostedDate)).all()
+        # Filter theo feature đã tính lúc ingest (JobFeatures / JobSkill), so sánh số và index
+        feature_filters = []
+        if city_code:
+            feature_filters.append(models.JobFeatures.CityCode == city_code)
+        if min_salary is not None:
+            feature_filters.append(func.coalesce(models.JobFeatures.SalaryMax, models.JobFeatures.SalaryMin) >= min_salary)
+            if salary_currency:
+                feature_filters.append(models.JobFeatures.SalaryCurrency == salary_currency)
+        if max_years_experience is not None:
+            feature_filters.append(or_(
+                models.JobFeatures.MinYearsExperience.is_(None),
+                models.JobFeatures.MinYearsExperience <= max_years_experience
+            ))
+        if skill_ids:
+            filters.append(models.JobsDes.Id.in_(
+                db.query(models.JobSkill.JobId).filter(models.JobSkill.SkillId.in_(skill_ids))
+            ))
+        
+        jobs_query = db.query(models.JobsDes)
+        if text_query:
+            jobs_query = jobs_query.outerjoin(models.JobText, models.JobText.JobId == models.JobsDes.Id)
+        if feature_filters:
+            jobs_query = jobs_query.join(models.JobFeatures, models.JobFeatures.JobId == models.JobsDes.Id)
+            filters.extend(feature_filters)
+        if load_features:
+            jobs_query = jobs_query.options(selectinload(models.JobsDes.Features), selectinload(models.JobsDes.Skills))
+        jobs_query = jobs_query.filter(and_(*filters)).order_by(desc(models.JobsDes.PostedDate))
+        if not collapse_duplicates:
+            return jobs_query.limit(limit).all() if limit else jobs_query.all()
+        
+        # Giữ job mới nhất của mỗi nhóm tin trùng (cùng ClusterId)
+        jobs = []
+        seen_clusters = set()
+        for job in jobs_query.yield_per(500):
+            cluster = job.ClusterId or job.Id
+            if cluster in seen_clusters:
+                continue
+            seen_clusters.add(cluster)
+            jobs.append(job)
+            if limit and len(jobs) >= limit:
+                break
+        return jobs
     
     @staticmethod
     def update_job(db: Session, job_id: int, job_data: dict) -> Optional[models.JobsDes]:
@@ -50,11 +196,274 @@ class JobCRUD:
             db.refresh(db_job)
         return db_job
 
+# Near-duplicate fingerprint operations (xem jobsscraping.dedup)
+class JobFingerprintCRUD:
+    @staticmethod
+    def get_band_members(db: Session, band_keys: List[int]) -> Dict[int, List[int]]:
+        """BandKey -> các JobId có khóa band đó"""
+        result = {}
+        for start in range(0, len(band_keys), 1000):
+            chunk = band_keys[start:start + 1000]
+            rows = db.query(models.JobLshBand.BandKey, models.JobLshBand.JobId).filter(
+                models.JobLshBand.BandKey.in_(chunk)
+            ).all()
+            for band_key, job_id in rows:
+                result.setdefault(band_key, []).append(job_id)
+        return result
+    
+    @staticmethod
+    def get_signatures(db: Session, job_ids: List[int]) -> Dict[int, tuple]:
+        """JobId -> (Signature, ClusterId)"""
+        result = {}
+        for start in range(0, len(job_ids), 1000):
+            chunk = job_ids[start:start + 1000]
+            rows = db.query(models.JobFingerprint.JobId, models.JobFingerprint.Signature, models.JobsDes.ClusterId).join(
+                models.JobsDes, models.JobsDes.Id == models.JobFingerprint.JobId
+            ).filter(models.JobFingerprint.JobId.in_(chunk)).all()
+            result.update({job_id: (signature, cluster_id) for job_id, signature, cluster_id in rows})
+        return result
+    
+    @staticmethod
+    def save_fingerprints(db: Session, fingerprints: List[dict], bands: List[dict], clusters: List[dict],
+                          replace_ids: List[int] = ()):
+        """
+        Ghi signature, khóa band và ClusterId của một batch trong một transaction.
+        Signature và khóa band cũ của các job trong `replace_ids` (job đổi nội dung) bị xóa trước
+        """
+        try:
+            for start in range(0, len(replace_ids), 1000):
+                chunk = list(replace_ids[start:start + 1000])
+                db.query(models.JobLshBand).filter(models.JobLshBand.JobId.in_(chunk)).delete(synchronize_session=False)
+                db.query(models.JobFingerprint).filter(models.JobFingerprint.JobId.in_(chunk)).delete(synchronize_session=False)
+            if fingerprints:
+                db.execute(insert(models.JobFingerprint), fingerprints)
+            if bands:
+                db.execute(insert(models.JobLshBand), bands)
+            if clusters:
+                db.execute(update(models.JobsDes), clusters)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    @staticmethod
+    def get_unfingerprinted_jobs(db: Session, after_id: int = 0, limit: int = 500) -> List[models.JobsDes]:
+        """Job chưa có fingerprint theo thứ tự Id, dùng để backfill"""
+        return db.query(models.JobsDes).outerjoin(
+            models.JobFingerprint, models.JobFingerprint.JobId == models.JobsDes.Id
+        ).filter(
+            models.JobFingerprint.JobId.is_(None), models.JobsDes.Id > after_id
+        ).order_by(models.JobsDes.Id).limit(limit).all()
+
+# Job feature operations (xem jobsscraping.features)
+class JobFeatureCRUD:
+    @staticmethod
+    def replace_job_features(db: Session, job_ids: List[int], features: List[dict], job_skills: List[dict]):
+        """Thay JobFeatures và JobSkill của các job trong một transaction"""
+        try:
+            for start in range(0, len(job_ids), 1000):
+                chunk = job_ids[start:start + 1000]
+                db.query(models.JobSkill).filter(models.JobSkill.JobId.in_(chunk)).delete(synchronize_session=False)
+                db.query(models.JobFeatures).filter(models.JobFeatures.JobId.in_(chunk)).delete(synchronize_session=False)
+            if features:
+                db.execute(insert(models.JobFeatures), features)
+            if job_skills:
+                db.execute(insert(models.JobSkill), job_skills)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    @staticmethod
+    def get_jobs_without_features(db: Session, after_id: int = 0, limit: int = 500) -> List[models.JobsDes]:
+        """Job chưa có JobFeatures theo thứ tự Id, dùng để backfill"""
+        return db.query(models.JobsDes).outerjoin(
+            models.JobFeatures, models.JobFeatures.JobId == models.JobsDes.Id
+        ).filter(
+            models.JobFeatures.JobId.is_(None), models.JobsDes.Id > after_id
+        ).order_by(models.JobsDes.Id).limit(limit).all()
+    
+    @staticmethod
+    def get_matching_features(db: Session, cluster_ids: Optional[List[int]] = None) -> List[tuple]:
+        """
+        (Id, ClusterId, CityCode, MinYearsExperience) của mọi job (hoặc chỉ các job thuộc
+        `cluster_ids`), mới nhất trước; chỉ đọc cột cần cho matching, không load ORM object
+        """
+        query = db.query(
+            models.JobsDes.Id, models.JobsDes.ClusterId,
+            models.JobFeatures.CityCode, models.JobFeatures.MinYearsExperience
+        ).outerjoin(
+            models.JobFeatures, models.JobFeatures.JobId == models.JobsDes.Id
+        )
+        if cluster_ids is None:
+            return query.order_by(desc(models.JobsDes.PostedDate), desc(models.JobsDes.Id)).all()
+        
+        rows = {}
+        for start in range(0, len(cluster_ids), 1000):
+            chunk = cluster_ids[start:start + 1000]
+            for row in query.add_columns(models.JobsDes.PostedDate).filter(or_(
+                models.JobsDes.Id.in_(chunk), models.JobsDes.ClusterId.in_(chunk)
+            )):
+                rows[row[0]] = row
+        # Cùng thứ tự với ORDER BY PostedDate DESC, Id DESC của SQL Server (NULL xếp cuối)
+        ordered = sorted(rows.values(), key=lambda row: (row[4] is not None, row[4] or datetime.min, row[0]),
+                         reverse=True)
+        return [tuple(row[:4]) for row in ordered]
+    
+    @staticmethod
+    def get_job_skill_pairs(db: Session, job_ids: Optional[List[int]] = None) -> List[tuple]:
+        """Mọi cặp (JobId, SkillId) trong JobSkill, hoặc chỉ của `job_ids`"""
+        query = db.query(models.JobSkill.JobId, models.JobSkill.SkillId)
+        if job_ids is None:
+            return query.all()
+        pairs = []
+        for start in range(0, len(job_ids), 1000):
+            pairs.extend(query.filter(models.JobSkill.JobId.in_(job_ids[start:start + 1000])).all())
+        return pairs
+
+# Job text operations (xem jobsscraping.text)
+class JobTextCRUD:
+    @staticmethod
+    def replace_job_texts(db: Session, job_ids: List[int], texts: List[dict]):
+        """
+        Thay JobTexts của các job và cập nhật TermStats theo token cũ/mới trong một transaction.
+        Thử lại khi worker khác vừa thêm cùng token mới hoặc khi bị chọn làm deadlock victim.
+        """
+        for attempt in range(TEXT_WRITE_ATTEMPTS):
+            try:
+                deltas = Counter()
+                for start in range(0, len(job_ids), 1000):
+                    chunk = job_ids[start:start + 1000]
+                    for (tokens,) in db.query(models.JobText.Tokens).filter(models.JobText.JobId.in_(chunk)):
+                        deltas.subtract(set((tokens or "").split()))
+                    db.query(models.JobText).filter(models.JobText.JobId.in_(chunk)).delete(synchronize_session=False)
+                for text in texts:
+                    deltas.update(set((text.get("Tokens") or "").split()))
+                if texts:
+                    db.execute(insert(models.JobText), texts)
+                TermStatCRUD.apply_deltas(db, deltas)
+                db.commit()
+                return
+            except IntegrityError:
+                # Worker khác vừa thêm cùng token mới vào TermStats: lần thử lại sẽ cập nhật dòng đó
+                db.rollback()
+                if attempt == TEXT_WRITE_ATTEMPTS - 1:
+                    raise
+            except DBAPIError as e:
+                db.rollback()
+                if not is_deadlock(e) or attempt == TEXT_WRITE_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.1 * (attempt + 1))
+            except Exception:
+                db.rollback()
+                raise
+    
+    @staticmethod
+    def get_text_versions(db: Session) -> Dict[int, datetime]:
+        """JobId -> UpdatedAt của mọi JobTexts (JobTexts ghi lại thì UpdatedAt đổi)"""
+        return dict(db.query(models.JobText.JobId, models.JobText.UpdatedAt).all())
+    
+    @staticmethod
+    def count_texts(db: Session) -> int:
+        return db.query(func.count(models.JobText.JobId)).scalar() or 0
+    
+    @staticmethod
+    def iter_tokens(db: Session, job_ids: Optional[List[int]] = None) -> Iterator[Tuple[int, str]]:
+        """(JobId, Tokens) của mọi job hoặc của `job_ids`, đọc dần theo từng khối"""
+        query = db.query(models.JobText.JobId, models.JobText.Tokens)
+        if job_ids is None:
+            yield from query.yield_per(2000)
+            return
+        for start in range(0, len(job_ids), 1000):
+            yield from query.filter(models.JobText.JobId.in_(job_ids[start:start + 1000])).all()
+    
+    @staticmethod
+    def get_jobs_without_texts(db: Session, after_id: int = 0, limit: int = 500) -> List[models.JobsDes]:
+        """Job chưa có JobTexts theo thứ tự Id, dùng để backfill"""
+        return db.query(models.JobsDes).outerjoin(
+            models.JobText, models.JobText.JobId == models.JobsDes.Id
+        ).filter(
+            models.JobText.JobId.is_(None), models.JobsDes.Id > after_id
+        ).order_by(models.JobsDes.Id).limit(limit).all()
+
+# Document frequency của token (xem worker.matching.TextIndex)
+class TermStatCRUD:
+    @staticmethod
+    def apply_deltas(db: Session, deltas: Dict[str, int]):
+        """
+        Cộng thay đổi DocFreq theo token; không commit, chạy trong transaction của JobTexts.
+        Dòng được khóa theo thứ tự Term để các worker ghi song song không deadlock nhau.
+        """
+        table = models.TermStat.__table__
+        changed = {term: deltas[term] for term in sorted(deltas) if deltas[term] and len(term) <= 100}
+        terms = list(changed)
+        existing = set()
+        for start in range(0, len(terms), 1000):
+            existing.update(term for (term,) in db.query(models.TermStat.Term).filter(
+                models.TermStat.Term.in_(terms[start:start + 1000])
+            ))
+        
+        updates = [{"term": term, "delta": delta} for term, delta in changed.items() if term in existing]
+        if updates:
+            db.execute(
+                table.update().where(table.c.Term == bindparam("term"))
+                .values(DocFreq=table.c.DocFreq + bindparam("delta")),
+                updates
+            )
+        new_rows = [{"Term": term, "DocFreq": delta} for term, delta in changed.items()
+                    if term not in existing and delta > 0]
+        if new_rows:
+            db.execute(insert(models.TermStat), new_rows)
+    
+    @staticmethod
+    def get_doc_freqs(db: Session) -> Dict[str, int]:
+        """Token -> số job chứa token (chỉ token còn trong ít nhất một job)"""
+        return dict(db.query(models.TermStat.Term, models.TermStat.DocFreq).filter(models.TermStat.DocFreq > 0))
+
+# Skill operations
+class SkillCRUD:
+    @staticmethod
+    def get_skill_ids(db: Session, names: List[str]) -> Dict[str, int]:
+        """Tên skill (chữ thường) -> Skills.Id của các skill đã có"""
+        if not names:
+            return {}
+        rows = db.query(models.Skill.Name, models.Skill.Id).filter(models.Skill.Name.in_(names)).all()
+        return {name.lower(): skill_id for name, skill_id in rows}
+    
+    @staticmethod
+    def get_or_create_skill_ids(db: Session, names: List[str]) -> Dict[str, int]:
+        """Tên skill (chữ thường) -> Skills.Id, tạo skill chưa có"""
+        wanted = {name.lower(): name for name in names}
+        result = {}
+        for start in range(0, len(names), 1000):
+            result.update(SkillCRUD.get_skill_ids(db, names[start:start + 1000]))
+        
+        new_names = [name for key, name in wanted.items() if key not in result]
+        if new_names:
+            try:
+                db.execute(insert(models.Skill), [{"Name": name} for name in new_names])
+                db.commit()
+            except IntegrityError:
+                # Worker khác vừa tạo một phần các skill này: thêm lại từng skill
+                db.rollback()
+                for name in new_names:
+                    try:
+                        db.execute(insert(models.Skill), [{"Name": name}])
+                        db.commit()
+                    except IntegrityError:
+                        db.rollback()
+            for start in range(0, len(new_names), 1000):
+                result.update(SkillCRUD.get_skill_ids(db, new_names[start:start + 1000]))
+        return result
+
 # ScrapingJob CRUD operations
 class ScrapingJobCRUD:
     @staticmethod
-    def create_scraping_job(db: Session, source: str) -> models.ScrapingJob:
-        db_job = models.ScrapingJob(Source=source, Status="pending")
+    def create_scraping_job(db: Session, source: str, task_id: Optional[str] = None,
+                            max_jobs: Optional[int] = None, shard: Optional[str] = None,
+                            parent_id: Optional[int] = None) -> models.ScrapingJob:
+        db_job = models.ScrapingJob(Source=source, Status="pending", TaskId=task_id, MaxJobs=max_jobs,
+                                    Shard=shard, ParentId=parent_id)
         db.add(db_job)
         db.commit()
         db.refresh(db_job)
@@ -78,6 +487,33 @@ class ScrapingJobCRUD:
             models.ScrapingJob.Source == source,
             models.ScrapingJob.CreatedAt >= cutoff_time
         ).order_by(desc(models.ScrapingJob.CreatedAt)).all()
+    
+    @staticmethod
+    def get_scraping_job_by_task_id(db: Session, task_id: str) -> Optional[models.ScrapingJob]:
+        return db.query(models.ScrapingJob).filter(models.ScrapingJob.TaskId == task_id).first()
+    
+    @staticmethod
+    def save_scraping_job_stats(db: Session, scraping_job_id: int, stats_data: dict) -> models.ScrapingJobStats:
+        """Ghi (hoặc ghi đè khi task retry) stats của một lần crawl"""
+        db_stats = db.get(models.ScrapingJobStats, scraping_job_id)
+        if db_stats is None:
+            db_stats = models.ScrapingJobStats(ScrapingJobId=scraping_job_id)
+            db.add(db_stats)
+        for key, value in stats_data.items():
+            setattr(db_stats, key, value)
+        db.commit()
+        return db_stats
+    
+    @staticmethod
+    def get_scraping_job_history(db: Session, source: Optional[str] = None, hours: int = 24) -> List[models.ScrapingJob]:
+        """Các lần crawl gần đây kèm stats, mới nhất trước"""
+        cutoff_time = datetime.utcnow() - timedelta(hours=hours)
+        query = db.query(models.ScrapingJob).options(joinedload(models.ScrapingJob.Stats)).filter(
+            models.ScrapingJob.CreatedAt >= cutoff_time
+        )
+        if source:
+            query = query.filter(models.ScrapingJob.Source == source)
+        return query.order_by(desc(models.ScrapingJob.CreatedAt)).all()
 
 # CV and User CRUD operations
 class CVCRUD:
@@ -112,6 +548,17 @@ class CVCRUD:
         """Lấy CV theo ID"""
         return db.query(models.CV).filter(models.CV.Id == cv_id).first()
     
+    @staticmethod
+    def get_cvs_for_matching(db: Session, cv_ids: List[int]) -> List[models.CV]:
+        """CV theo Id kèm skill, kinh nghiệm và user (cv_profile), mỗi quan hệ một truy vấn"""
+        if not cv_ids:
+            return []
+        return db.query(models.CV).options(
+            selectinload(models.CV.Skills).joinedload(models.CVSkill.Skill),
+            selectinload(models.CV.WorkExperiences),
+            joinedload(models.CV.User)
+        ).filter(models.CV.Id.in_(cv_ids)).all()
+    
     @staticmethod
     def get_cv_stats(db: Session) -> dict:
         """Lấy thống kê CV"""
@@ -154,4 +601,99 @@ class UserCRUD:
                 setattr(db_user, key, value)
             db.commit()
             db.refresh(db_user)
-        return db_user
\ No newline at end of file
+        return db_user
+
+# Job match operations
+class JobMatchCRUD:
+    @staticmethod
+    def replace_job_matches(db: Session, cv_ids: List[int], matches: List[dict],
+                            states: Optional[List[dict]] = None):
+        """
+        Thay JobMatch của các CV bằng kết quả mới trong một transaction; `states` (nếu có)
+        thay CVMatchState của các CV cùng transaction
+        """
+        try:
+            for start in range(0, len(cv_ids), 1000):
+                chunk = cv_ids[start:start + 1000]
+                db.query(models.JobMatch).filter(models.JobMatch.CVId.in_(chunk)).delete(synchronize_session=False)
+                if states is not None:
+                    db.query(models.CVMatchState).filter(
+                        models.CVMatchState.CVId.in_(chunk)
+                    ).delete(synchronize_session=False)
+            if matches:
+                db.execute(insert(models.JobMatch), matches)
+            if states:
+                db.execute(insert(models.CVMatchState), states)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    @staticmethod
+    def merge_job_matches(db: Session, delete_ids: List[int], matches: List[dict]):
+        """Xóa các JobMatch theo Id và thêm dòng mới trong một transaction (matching delta)"""
+        try:
+            for start in range(0, len(delete_ids), 1000):
+                chunk = delete_ids[start:start + 1000]
+                db.query(models.JobMatch).filter(models.JobMatch.Id.in_(chunk)).delete(synchronize_session=False)
+            if matches:
+                db.execute(insert(models.JobMatch), matches)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+    
+    @staticmethod
+    def get_match_states(db: Session) -> Dict[int, tuple]:
+        """CVId -> (ProfileHash, AlgorithmVersion, CorpusVersion) của mọi CV đã được chấm đầy đủ"""
+        rows = db.query(
+            models.CVMatchState.CVId, models.CVMatchState.ProfileHash, models.CVMatchState.AlgorithmVersion,
+            models.CVMatchState.CorpusVersion
+        ).all()
+        return {cv_id: (profile_hash, version, corpus_version)
+                for cv_id, profile_hash, version, corpus_version in rows}
+    
+    @staticmethod
+    def get_match_scores(db: Session, cv_ids: List[int]) -> Dict[int, List[tuple]]:
+        """CVId -> [(Id, JobId, MatchScore), ...] của các CV (chỉ đọc index ix_JobMatch_CVId_MatchScore)"""
+        result = {cv_id: [] for cv_id in cv_ids}
+        for start in range(0, len(cv_ids), 1000):
+            chunk = cv_ids[start:start + 1000]
+            rows = db.query(
+                models.JobMatch.Id, models.JobMatch.CVId, models.JobMatch.JobId, models.JobMatch.MatchScore
+            ).filter(models.JobMatch.CVId.in_(chunk)).all()
+            for match_id, cv_id, job_id, score in rows:
+                result[cv_id].append((match_id, job_id, float(score)))
+        return result
+    
+    @staticmethod
+    def get_matches_for_cv(db: Session, cv_id: int, min_score: float = 0.0,
+                           limit: Optional[int] = None) -> List[models.JobMatch]:
+        """JobMatch của một CV, điểm cao nhất trước (range scan trên ix_JobMatch_CVId_MatchScore)"""
+        query = db.query(models.JobMatch).filter(
+            models.JobMatch.CVId == cv_id, models.JobMatch.MatchScore >= min_score
+        ).order_by(desc(models.JobMatch.MatchScore))
+        return query.limit(limit).all() if limit else query.all()
+    
+    @staticmethod
+    def get_candidates_for_job(db: Session, job_id: int, min_score: float = 0.0,
+                               limit: Optional[int] = None) -> List[models.JobMatch]:
+        """JobMatch của một job, điểm cao nhất trước (range scan trên ix_JobMatch_JobId_MatchScore)"""
+        query = db.query(models.JobMatch).filter(
+            models.JobMatch.JobId == job_id, models.JobMatch.MatchScore >= min_score
+        ).order_by(desc(models.JobMatch.MatchScore))
+        return query.limit(limit).all() if limit else query.all()
+    
+    @staticmethod
+    def get_match_stats(db: Session, since: datetime) -> dict:
+        """Số JobMatch theo khoảng điểm và số dòng tạo từ `since`, một truy vấn"""
+        score = models.JobMatch.MatchScore
+        row = db.query(
+            func.count(models.JobMatch.Id),
+            func.sum(case((score >= 0.8, 1), else_=0)),
+            func.sum(case((and_(score >= 0.5, score < 0.8), 1), else_=0)),
+            func.sum(case((score < 0.5, 1), else_=0)),
+            func.sum(case((models.JobMatch.CreatedDate >= since, 1), else_=0)),
+        ).one()
+        total, high, medium, low, recent = (value or 0 for value in row)
+        return {"total": total, "high": high, "medium": medium, "low": low, "recent": recent}
@@ -0,0 +1,32 @@
+-- Crawl telemetry: liên kết ScrapingJobs với Celery task và lưu Scrapy stats của mỗi lần crawl.
+-- create_tables() chỉ tạo bảng mới, không thêm cột vào bảng đã có, nên chạy script này
+-- một lần trên database hiện tại.
+
+IF COL_LENGTH('ScrapingJobs', 'TaskId') IS NULL
+    ALTER TABLE ScrapingJobs ADD TaskId NVARCHAR(100) NULL;
+GO
+IF COL_LENGTH('ScrapingJobs', 'MaxJobs') IS NULL
+    ALTER TABLE ScrapingJobs ADD MaxJobs INT NULL;
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_ScrapingJobs_TaskId')
+    CREATE INDEX ix_ScrapingJobs_TaskId ON ScrapingJobs (TaskId);
+GO
+
+IF OBJECT_ID('ScrapingJobStats', 'U') IS NULL
+CREATE TABLE ScrapingJobStats (
+    ScrapingJobId INT NOT NULL PRIMARY KEY REFERENCES ScrapingJobs (Id),
+    FinishReason NVARCHAR(100) NULL,
+    ItemsScraped INT NULL,
+    RequestCount INT NULL,
+    ResponseCount INT NULL,
+    ResponseBytes BIGINT NULL,
+    ElapsedSeconds FLOAT NULL,
+    ItemsPerSecond FLOAT NULL,
+    LatencyP50Ms FLOAT NULL,
+    LatencyP95Ms FLOAT NULL,
+    ResponsesByStatus NVARCHAR(MAX) NULL,
+    LatencyHistogram NVARCHAR(MAX) NULL,
+    RawStats NVARCHAR(MAX) NULL,
+    CreatedAt DATETIME NULL DEFAULT GETUTCDATE()
+);
+GO
@@ -0,0 +1,25 @@
+-- Near-duplicate detection: ClusterId trên JobsDes, MinHash signature và khóa LSH band của mỗi job.
+-- Chạy một lần trên database hiện tại, sau đó `scrapy dedupjobs` để tính cho các job đã có.
+
+IF COL_LENGTH('JobsDes', 'ClusterId') IS NULL
+    ALTER TABLE JobsDes ADD ClusterId INT NULL;
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_JobsDes_ClusterId')
+    CREATE INDEX ix_JobsDes_ClusterId ON JobsDes (ClusterId);
+GO
+
+IF OBJECT_ID('JobFingerprints', 'U') IS NULL
+CREATE TABLE JobFingerprints (
+    JobId INT NOT NULL PRIMARY KEY REFERENCES JobsDes (Id),
+    Signature VARBINARY(MAX) NULL,
+    CreatedAt DATETIME NULL DEFAULT GETUTCDATE()
+);
+GO
+
+IF OBJECT_ID('JobLshBands', 'U') IS NULL
+CREATE TABLE JobLshBands (
+    BandKey BIGINT NOT NULL,
+    JobId INT NOT NULL REFERENCES JobsDes (Id),
+    CONSTRAINT PK_JobLshBands PRIMARY KEY (BandKey, JobId)
+);
+GO
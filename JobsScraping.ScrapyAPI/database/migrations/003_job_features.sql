@@ -0,0 +1,34 @@
+-- Feature của job tính lúc ingest: mã thành phố, lương dạng số, số năm kinh nghiệm và skill canonical.
+-- Chạy một lần trên database hiện tại, sau đó `scrapy jobfeatures` để tính cho các job đã có.
+
+IF OBJECT_ID('JobFeatures', 'U') IS NULL
+CREATE TABLE JobFeatures (
+    JobId INT NOT NULL PRIMARY KEY REFERENCES JobsDes (Id),
+    CityCode NVARCHAR(10) NULL,
+    SalaryMin FLOAT NULL,
+    SalaryMax FLOAT NULL,
+    SalaryCurrency NVARCHAR(3) NULL,
+    MinYearsExperience INT NULL,
+    UpdatedAt DATETIME NULL DEFAULT GETUTCDATE()
+);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_JobFeatures_CityCode')
+    CREATE INDEX ix_JobFeatures_CityCode ON JobFeatures (CityCode);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_JobFeatures_SalaryMin')
+    CREATE INDEX ix_JobFeatures_SalaryMin ON JobFeatures (SalaryMin);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_JobFeatures_MinYearsExperience')
+    CREATE INDEX ix_JobFeatures_MinYearsExperience ON JobFeatures (MinYearsExperience);
+GO
+
+IF OBJECT_ID('JobSkill', 'U') IS NULL
+CREATE TABLE JobSkill (
+    JobId INT NOT NULL REFERENCES JobsDes (Id),
+    SkillId INT NOT NULL REFERENCES Skills (Id),
+    CONSTRAINT PK_JobSkill PRIMARY KEY (JobId, SkillId)
+);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_JobSkill_SkillId')
+    CREATE INDEX ix_JobSkill_SkillId ON JobSkill (SkillId);
+GO
@@ -0,0 +1,11 @@
+-- Mô tả job đã bỏ HTML và token stream đã chuẩn hóa, tính lúc ingest.
+-- Chạy một lần trên database hiện tại, sau đó `scrapy jobtexts` để tính cho các job đã có.
+
+IF OBJECT_ID('JobTexts', 'U') IS NULL
+CREATE TABLE JobTexts (
+    JobId INT NOT NULL PRIMARY KEY REFERENCES JobsDes (Id),
+    PlainText NVARCHAR(MAX) NULL,
+    Tokens NVARCHAR(MAX) NULL,
+    UpdatedAt DATETIME NULL DEFAULT GETUTCDATE()
+);
+GO
@@ -0,0 +1,12 @@
+-- Crawl chia shard: mỗi shard một dòng ScrapingJobs (Shard = "i/n") trỏ về dòng của planner (ParentId).
+-- Chạy một lần trên database hiện tại.
+
+IF COL_LENGTH('ScrapingJobs', 'Shard') IS NULL
+    ALTER TABLE ScrapingJobs ADD Shard NVARCHAR(20) NULL;
+GO
+IF COL_LENGTH('ScrapingJobs', 'ParentId') IS NULL
+    ALTER TABLE ScrapingJobs ADD ParentId INT NULL REFERENCES ScrapingJobs (Id);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_ScrapingJobs_ParentId')
+    CREATE INDEX ix_ScrapingJobs_ParentId ON ScrapingJobs (ParentId);
+GO
@@ -0,0 +1,18 @@
+-- JobMatch lưu kết quả matching: phiên bản công thức chấm điểm và phiên bản tập job lúc chấm, cùng
+-- index covering để đọc kết quả theo CV / theo job sắp theo điểm mà không lookup bảng.
+-- Chạy một lần trên database hiện tại.
+
+IF COL_LENGTH('JobMatch', 'AlgorithmVersion') IS NULL
+    ALTER TABLE JobMatch ADD AlgorithmVersion INT NULL;
+GO
+IF COL_LENGTH('JobMatch', 'CorpusVersion') IS NULL
+    ALTER TABLE JobMatch ADD CorpusVersion NVARCHAR(16) NULL;
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_JobMatch_CVId_MatchScore')
+    CREATE INDEX ix_JobMatch_CVId_MatchScore ON JobMatch (CVId, MatchScore)
+        INCLUDE (JobId, MatchedSkills, CreatedDate, AlgorithmVersion, CorpusVersion);
+GO
+IF NOT EXISTS (SELECT 1 FROM sys.indexes WHERE name = 'ix_JobMatch_JobId_MatchScore')
+    CREATE INDEX ix_JobMatch_JobId_MatchScore ON JobMatch (JobId, MatchScore)
+        INCLUDE (CVId, MatchedSkills, CreatedDate, AlgorithmVersion, CorpusVersion);
+GO
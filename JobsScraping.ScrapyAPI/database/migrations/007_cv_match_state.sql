@@ -0,0 +1,12 @@
+-- Profile của CV lúc JobMatch được chấm lại toàn bộ lần cuối: matching delta khi ingest job mới
+-- chỉ chấm job mới với CV có profile không đổi, CV đổi profile thì chấm lại với mọi job.
+-- Chạy một lần trên database hiện tại; CV chưa có dòng ở đây được thêm ở lần chấm đầy đủ kế tiếp.
+
+IF OBJECT_ID('CVMatchState', 'U') IS NULL
+CREATE TABLE CVMatchState (
+    CVId INT NOT NULL PRIMARY KEY REFERENCES CVs (Id),
+    ProfileHash NVARCHAR(16) NULL,
+    AlgorithmVersion INT NULL,
+    MatchedAt DATETIME NULL DEFAULT GETUTCDATE()
+);
+GO
@@ -0,0 +1,19 @@
+-- Document frequency của token trong JobTexts.Tokens: vocabulary và IDF cho điểm tương đồng văn bản
+-- giữa CV và job (worker.matching.TextIndex). JobTextCRUD.replace_job_texts cập nhật bảng này khi ghi JobTexts.
+-- Chạy một lần trên database hiện tại (SQL Server 2016+ cho STRING_SPLIT), sau 004_job_texts.sql.
+
+IF OBJECT_ID('TermStats', 'U') IS NULL
+CREATE TABLE TermStats (
+    Term NVARCHAR(100) NOT NULL PRIMARY KEY,
+    DocFreq INT NOT NULL DEFAULT 0
+);
+GO
+IF NOT EXISTS (SELECT 1 FROM TermStats)
+INSERT INTO TermStats (Term, DocFreq)
+SELECT Term, COUNT(*) FROM (
+    SELECT DISTINCT t.JobId, s.value AS Term
+    FROM JobTexts t CROSS APPLY STRING_SPLIT(CAST(t.Tokens AS NVARCHAR(MAX)), ' ') s
+    WHERE s.value <> '' AND LEN(s.value) <= 100
+) terms
+GROUP BY Term;
+GO
@@ -0,0 +1,7 @@
+-- Phiên bản tập job (MatchingEngine.corpus_version) của lần chấm đầy đủ gần nhất của CV. Dòng JobMatch
+-- do matching delta thêm vào giữ phiên bản này thay vì fingerprint của riêng lô job mới.
+-- Chạy một lần trên database hiện tại; CV cũ có giá trị ở lần chấm đầy đủ kế tiếp.
+
+IF COL_LENGTH('CVMatchState', 'CorpusVersion') IS NULL
+    ALTER TABLE CVMatchState ADD CorpusVersion NVARCHAR(16) NULL;
+GO
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float, Boolean, DECIMAL
+from sqlalchemy import Column, BigInteger, Integer, String, DateTime, Text, ForeignKey, Float, Boolean, DECIMAL, LargeBinary, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -42,6 +42,7 @@ class CV(Base):
     WorkExperiences = relationship("WorkExperience", back_populates="CV")
     Educations = relationship("Education", back_populates="CV")
     JobMatches = relationship("JobMatch", back_populates="CV")
+    MatchState = relationship("CVMatchState", back_populates="CV", uselist=False)
 
 class Skill(Base):
     __tablename__ = "Skills"
@@ -52,6 +53,7 @@ class Skill(Base):
     
     # Relationships
     CVSkills = relationship("CVSkill", back_populates="Skill")
+    JobSkills = relationship("JobSkill", back_populates="Skill")
 
 class CVSkill(Base):
     __tablename__ = "CVSkill"
@@ -110,8 +112,75 @@ class JobsDes(Base):
     Benefits = Column(String(1000))
     Source = Column(String(100))
     RawContent = Column(Text)
+    ClusterId = Column(Integer, index=True)  # Id của job canonical trong nhóm tin trùng (xem jobsscraping.dedup)
     # Relationships
     JobMatches = relationship("JobMatch", back_populates="Job")
+    Fingerprint = relationship("JobFingerprint", back_populates="Job", uselist=False)
+    Features = relationship("JobFeatures", back_populates="Job", uselist=False)
+    Skills = relationship("JobSkill", back_populates="Job")
+    Text = relationship("JobText", back_populates="Job", uselist=False)
+
+class JobText(Base):
+    """Mô tả job đã bỏ HTML và token stream đã chuẩn hóa (xem jobsscraping.text)"""
+    __tablename__ = "JobTexts"
+    
+    JobId = Column(Integer, ForeignKey("JobsDes.Id"), primary_key=True)
+    PlainText = Column(Text)
+    Tokens = Column(Text)  # token cách nhau bởi dấu cách: chữ thường, bỏ dấu, bỏ từ dừng
+    UpdatedAt = Column(DateTime, default=func.getutcdate(), onupdate=func.getutcdate())
+    
+    # Relationships
+    Job = relationship("JobsDes", back_populates="Text")
+
+class TermStat(Base):
+    """Số job có token trong JobTexts.Tokens (document frequency), cập nhật cùng JobTexts"""
+    __tablename__ = "TermStats"
+    
+    Term = Column(String(100), primary_key=True)
+    DocFreq = Column(Integer, nullable=False, default=0)
+
+class JobFeatures(Base):
+    """Feature đã chuẩn hóa tính lúc ingest (xem jobsscraping.features)"""
+    __tablename__ = "JobFeatures"
+    
+    JobId = Column(Integer, ForeignKey("JobsDes.Id"), primary_key=True)
+    CityCode = Column(String(10), index=True)  # HCM, HN, DN, REMOTE...
+    SalaryMin = Column(Float, index=True)
+    SalaryMax = Column(Float)
+    SalaryCurrency = Column(String(3))  # USD, VND
+    MinYearsExperience = Column(Integer, index=True)
+    UpdatedAt = Column(DateTime, default=func.getutcdate(), onupdate=func.getutcdate())
+    
+    # Relationships
+    Job = relationship("JobsDes", back_populates="Features")
+
+class JobSkill(Base):
+    __tablename__ = "JobSkill"
+    
+    JobId = Column(Integer, ForeignKey("JobsDes.Id"), primary_key=True)
+    SkillId = Column(Integer, ForeignKey("Skills.Id"), primary_key=True, index=True)
+    
+    # Relationships
+    Job = relationship("JobsDes", back_populates="Skills")
+    Skill = relationship("Skill", back_populates="JobSkills")
+
+class JobFingerprint(Base):
+    """MinHash signature của title + company + description"""
+    __tablename__ = "JobFingerprints"
+    
+    JobId = Column(Integer, ForeignKey("JobsDes.Id"), primary_key=True)
+    Signature = Column(LargeBinary)  # 128 giá trị uint64 little-endian
+    CreatedAt = Column(DateTime, default=func.getutcdate())
+    
+    # Relationships
+    Job = relationship("JobsDes", back_populates="Fingerprint")
+
+class JobLshBand(Base):
+    """Khóa LSH theo band của signature; job trùng khóa band là ứng viên trùng lặp"""
+    __tablename__ = "JobLshBands"
+    
+    BandKey = Column(BigInteger, primary_key=True)
+    JobId = Column(Integer, ForeignKey("JobsDes.Id"), primary_key=True)
 
 class JobMatch(Base):
     __tablename__ = "JobMatch"
@@ -122,19 +191,74 @@ class JobMatch(Base):
     MatchScore = Column(DECIMAL(5, 2))
     MatchedSkills = Column(String(1000))
     CreatedDate = Column(DateTime, default=func.getutcdate())
+    AlgorithmVersion = Column(Integer)  # worker.matching.SCORING_VERSION lúc chấm
+    # Fingerprint ma trận job của lần chấm đầy đủ (MatchingEngine.corpus_version); dòng do matching
+    # delta thêm giữ phiên bản của lần chấm đầy đủ gần nhất của CV (CVMatchState.CorpusVersion)
+    CorpusVersion = Column(String(16))
+    
+    # Đọc kết quả theo CV hoặc theo job là một range scan trên index, không cần lookup bảng
+    __table_args__ = (
+        Index("ix_JobMatch_CVId_MatchScore", "CVId", "MatchScore",
+              mssql_include=["JobId", "MatchedSkills", "CreatedDate", "AlgorithmVersion", "CorpusVersion"]),
+        Index("ix_JobMatch_JobId_MatchScore", "JobId", "MatchScore",
+              mssql_include=["CVId", "MatchedSkills", "CreatedDate", "AlgorithmVersion", "CorpusVersion"]),
+    )
     
     # Relationships
     CV = relationship("CV", back_populates="JobMatches")
     Job = relationship("JobsDes", back_populates="JobMatches")
 
+class CVMatchState(Base):
+    """Profile CV lúc JobMatch được chấm lại toàn bộ lần cuối (xem worker.tasks.match_new_jobs)"""
+    __tablename__ = "CVMatchState"
+    
+    CVId = Column(Integer, ForeignKey("CVs.Id"), primary_key=True)
+    ProfileHash = Column(String(16))  # hash skill / thành phố / kinh nghiệm / text của CV (cv_profile)
+    AlgorithmVersion = Column(Integer)  # worker.matching.SCORING_VERSION lúc chấm
+    CorpusVersion = Column(String(16))  # MatchingEngine.corpus_version lúc chấm
+    MatchedAt = Column(DateTime, default=func.getutcdate())
+    
+    # Relationships
+    CV = relationship("CV", back_populates="MatchState")
+
 class ScrapingJob(Base):
     __tablename__ = "ScrapingJobs"
     
     Id = Column(Integer, primary_key=True, index=True)
     Source = Column(String(100), nullable=False)
-    Status = Column(String(50), default="pending")  # pending, running, completed, failed
+    Status = Column(String(50), default="pending")  # pending, running, completed, failed, cancelled
     StartedAt = Column(DateTime)
     CompletedAt = Column(DateTime)
     JobsScraped = Column(Integer, default=0)
     ErrorMessage = Column(Text)
-    CreatedAt = Column(DateTime, default=func.getutcdate())
\ No newline at end of file
+    CreatedAt = Column(DateTime, default=func.getutcdate())
+    TaskId = Column(String(100), index=True)  # Celery task id
+    MaxJobs = Column(Integer)
+    # Crawl chia shard: dòng của planner là cha, mỗi shard "i/n" một dòng con
+    Shard = Column(String(20))
+    ParentId = Column(Integer, ForeignKey("ScrapingJobs.Id"), index=True)
+    
+    # Relationships
+    Stats = relationship("ScrapingJobStats", back_populates="ScrapingJob", uselist=False)
+
+class ScrapingJobStats(Base):
+    """Scrapy stats của một lần crawl (1-1 với ScrapingJobs)"""
+    __tablename__ = "ScrapingJobStats"
+    
+    ScrapingJobId = Column(Integer, ForeignKey("ScrapingJobs.Id"), primary_key=True)
+    FinishReason = Column(String(100))
+    ItemsScraped = Column(Integer, default=0)
+    RequestCount = Column(Integer, default=0)
+    ResponseCount = Column(Integer, default=0)
+    ResponseBytes = Column(BigInteger, default=0)
+    ElapsedSeconds = Column(Float)
+    ItemsPerSecond = Column(Float)
+    LatencyP50Ms = Column(Float)
+    LatencyP95Ms = Column(Float)
+    ResponsesByStatus = Column(Text)  # JSON {"200": n, "404": n}
+    LatencyHistogram = Column(Text)  # JSON {"<=100ms": n, ...}
+    RawStats = Column(Text)  # Toàn bộ stats dạng JSON
+    CreatedAt = Column(DateTime, default=func.getutcdate())
+    
+    # Relationships
+    ScrapingJob = relationship("ScrapingJob", back_populates="Stats")
\ No newline at end of file
@@ -0,0 +1,27 @@
+from scrapy.commands import ScrapyCommand
+from scrapy.utils.project import data_path
+
+from ..httpcache import cache_files, compact
+
+
+class Command(ScrapyCommand):
+    """`scrapy compactcache`: bảo trì các file HTTP cache SQLite (mỗi source một file)"""
+
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def short_desc(self):
+        return "Remove expired entries, enforce HTTPCACHE_MAX_BYTES and VACUUM the SQLite HTTP cache"
+
+    def run(self, args, opts):
+        directory = data_path(self.settings["HTTPCACHE_DIR"], createdir=True)
+        paths = cache_files(directory)
+        if not paths:
+            print(f"No cache files in {directory}")
+            return
+        for path in paths:
+            result = compact(path, self.settings.getint("HTTPCACHE_MAX_BYTES"))
+            print(
+                f"{path}: removed {result['removed']} entries, {result['entries']} left, "
+                f"{result['bytes_before']} -> {result['bytes_after']} bytes"
+            )
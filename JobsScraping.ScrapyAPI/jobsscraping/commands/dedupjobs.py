@@ -0,0 +1,43 @@
+from scrapy.commands import ScrapyCommand
+
+from ..dedup import NearDuplicateIndex
+
+
+class Command(ScrapyCommand):
+    """`scrapy dedupjobs`: tính fingerprint và ClusterId cho các job JobsDes chưa có"""
+
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def short_desc(self):
+        return "Backfill near-duplicate fingerprints and cluster ids for existing jobs"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--batch-size", type=int, default=500, help="jobs per commit")
+        parser.add_argument("--threshold", type=float, default=None, help="similarity threshold (default DEDUP_THRESHOLD)")
+
+    def run(self, args, opts):
+        from database.crud import JobFingerprintCRUD
+        from database.db import SessionLocal
+
+        index = NearDuplicateIndex(threshold=opts.threshold or self.settings.getfloat("DEDUP_THRESHOLD", 0.7))
+        fingerprinted = duplicates = 0
+        last_id = 0
+        db = SessionLocal()
+        try:
+            while True:
+                jobs = JobFingerprintCRUD.get_unfingerprinted_jobs(db, after_id=last_id, limit=opts.batch_size)
+                if not jobs:
+                    break
+                last_id = jobs[-1].Id
+                rows = [
+                    {"Url": job.Url, "Title": job.Title, "Company": job.Company, "Description": job.Description}
+                    for job in jobs if job.Url
+                ]
+                counts = index.assign(db, rows)
+                fingerprinted += counts["fingerprinted"]
+                duplicates += counts["duplicates"]
+        finally:
+            db.close()
+        print(f"{fingerprinted} jobs fingerprinted, {duplicates} near-duplicates")
@@ -0,0 +1,40 @@
+from scrapy.commands import ScrapyCommand
+
+from ..features import JobFeatureExtractor
+
+
+class Command(ScrapyCommand):
+    """`scrapy jobfeatures`: tính JobFeatures / JobSkill cho các job JobsDes chưa có"""
+
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def short_desc(self):
+        return "Backfill normalized job features (skills, city, salary, experience) for existing jobs"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--batch-size", type=int, default=500, help="jobs per commit")
+
+    def run(self, args, opts):
+        from database.crud import JobFeatureCRUD
+        from database.db import SessionLocal
+
+        extractor = JobFeatureExtractor()
+        processed = 0
+        last_id = 0
+        db = SessionLocal()
+        try:
+            while True:
+                jobs = JobFeatureCRUD.get_jobs_without_features(db, after_id=last_id, limit=opts.batch_size)
+                if not jobs:
+                    break
+                last_id = jobs[-1].Id
+                rows = [
+                    {column.name: getattr(job, column.name) for column in job.__table__.columns}
+                    for job in jobs if job.Url
+                ]
+                processed += extractor.apply(db, rows)
+        finally:
+            db.close()
+        print(f"{processed} jobs processed")
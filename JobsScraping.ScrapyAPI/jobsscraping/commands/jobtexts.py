@@ -0,0 +1,40 @@
+from scrapy.commands import ScrapyCommand
+
+from ..text import JobTextNormalizer
+
+
+class Command(ScrapyCommand):
+    """`scrapy jobtexts`: tính JobTexts (plain text + token) cho các job JobsDes chưa có"""
+
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def short_desc(self):
+        return "Backfill HTML-stripped description text and tokens for existing jobs"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--batch-size", type=int, default=500, help="jobs per commit")
+
+    def run(self, args, opts):
+        from database.crud import JobTextCRUD
+        from database.db import SessionLocal
+
+        normalizer = JobTextNormalizer()
+        processed = 0
+        last_id = 0
+        db = SessionLocal()
+        try:
+            while True:
+                jobs = JobTextCRUD.get_jobs_without_texts(db, after_id=last_id, limit=opts.batch_size)
+                if not jobs:
+                    break
+                last_id = jobs[-1].Id
+                rows = [
+                    {"Url": job.Url, "Title": job.Title, "Description": job.Description, "RawContent": job.RawContent}
+                    for job in jobs if job.Url
+                ]
+                processed += normalizer.apply(db, rows)
+        finally:
+            db.close()
+        print(f"{processed} jobs processed")
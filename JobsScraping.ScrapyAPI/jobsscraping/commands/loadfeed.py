@@ -0,0 +1,46 @@
+from scrapy.commands import ScrapyCommand
+from scrapy.exceptions import UsageError
+
+from ..dedup import NearDuplicateIndex
+from ..features import JobFeatureExtractor
+from ..feeds import FeedLoader
+from ..matchdelta import MatchDeltaNotifier
+from ..text import JobTextNormalizer
+
+
+class Command(ScrapyCommand):
+    """`scrapy loadfeed DIR`: nạp feed JSON Lines vào JobsDes, tiếp tục từ checkpoint"""
+
+    requires_project = True
+    default_settings = {"LOG_ENABLED": False}
+
+    def syntax(self):
+        return "[options] <feed_dir>"
+
+    def short_desc(self):
+        return "Stream a JSON Lines feed directory into JobsDes, resuming from its checkpoint"
+
+    def add_options(self, parser):
+        super().add_options(parser)
+        parser.add_argument("--follow", action="store_true", help="keep reading parts until the crawl writes _DONE")
+        parser.add_argument("--batch-size", type=int, default=None, help="rows per commit (default INGEST_BATCH_SIZE)")
+        parser.add_argument("--poll-interval", type=float, default=5.0, help="seconds between polls with --follow")
+
+    def run(self, args, opts):
+        if len(args) != 1:
+            raise UsageError()
+        loader = FeedLoader(
+            args[0],
+            batch_size=opts.batch_size or self.settings.getint("INGEST_BATCH_SIZE", 500),
+            dedup_index=NearDuplicateIndex.from_settings(self.settings),
+            feature_extractor=JobFeatureExtractor.from_settings(self.settings),
+            text_normalizer=JobTextNormalizer.from_settings(self.settings),
+            match_notifier=MatchDeltaNotifier.from_settings(self.settings),
+        )
+        result = loader.run(follow=opts.follow, poll_interval=opts.poll_interval)
+        print(
+            f"{args[0]}: {result['rows_inserted']} inserted, {result['rows_updated']} updated, "
+            f"{result['rows_unchanged']} unchanged, {result['rows_skipped']} skipped, "
+            f"{result['lines_invalid']} invalid, {result['near_duplicates']} near-duplicates, "
+            f"{result['step_errors']} step errors, {result['parts_done']} parts done"
+        )
@@ -0,0 +1,167 @@
+import hashlib
+import logging
+import struct
+
+from .text import row_plain_text
+from .utils import normalize_text
+
+logger = logging.getLogger(__name__)
+
+NUM_BINS = 128
+BANDS = 32
+ROWS_PER_BAND = NUM_BINS // BANDS
+SHINGLE_SIZE = 5
+# Mô tả dài chỉ lấy phần đầu: đủ phân biệt job, giới hạn chi phí mỗi item
+DESCRIPTION_CHARS = 1500
+
+_EMPTY = (1 << 64) - 1
+
+
+def job_text(title, company, description=None):
+    """Chuỗi dùng để tính fingerprint của một job"""
+    return " ".join(part for part in (
+        normalize_text(title),
+        normalize_text(company),
+        normalize_text((description or "")[:DESCRIPTION_CHARS]),
+    ) if part)
+
+
+def _hash64(value):
+    return int.from_bytes(hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def minhash_signature(text, num_bins=NUM_BINS, shingle_size=SHINGLE_SIZE):
+    """
+    MinHash một hoán vị (one permutation hashing): mỗi shingle ký tự được hash
+    một lần, rơi vào một bin và giữ giá trị nhỏ nhất của bin. Bin rỗng lấy giá
+    trị của bin kế tiếp (densification bằng rotation) để hai signature vẫn so
+    sánh được theo từng vị trí. Chi phí O(số shingle) thay vì O(shingle x hoán vị).
+    """
+    if len(text) < shingle_size:
+        shingles = {text} if text else set()
+    else:
+        shingles = {text[i:i + shingle_size] for i in range(len(text) - shingle_size + 1)}
+
+    bins = [_EMPTY] * num_bins
+    for shingle in shingles:
+        h = _hash64(shingle)
+        index = h % num_bins
+        value = h // num_bins
+        if value < bins[index]:
+            bins[index] = value
+
+    if all(value == _EMPTY for value in bins):
+        return tuple(bins)
+    signature = list(bins)
+    for i in range(num_bins):
+        offset = 1
+        while signature[i] == _EMPTY:
+            # Cộng offset để bin mượn khác với chính bin được mượn
+            source = bins[(i + offset) % num_bins]
+            if source != _EMPTY:
+                signature[i] = source + offset
+            offset += 1
+    return tuple(signature)
+
+
+def band_keys(signature, bands=BANDS):
+    """Khóa LSH của từng band, là số nguyên 64 bit có dấu để lưu vào cột BIGINT"""
+    rows = len(signature) // bands
+    keys = []
+    for band in range(bands):
+        chunk = struct.pack(f"<H{rows}Q", band, *signature[band * rows:(band + 1) * rows])
+        keys.append(int.from_bytes(hashlib.blake2b(chunk, digest_size=8).digest(), "little", signed=True))
+    return keys
+
+
+def similarity(a, b):
+    """Ước lượng Jaccard giữa hai tập shingle từ hai signature"""
+    return sum(1 for x, y in zip(a, b) if x == y) / len(a) if a else 0.0
+
+
+def pack_signature(signature):
+    return struct.pack(f"<{len(signature)}Q", *signature)
+
+
+def unpack_signature(data):
+    return struct.unpack(f"<{len(data) // 8}Q", data)
+
+
+class NearDuplicateIndex:
+    """
+    Gán ClusterId cho job mới dựa trên MinHash + LSH lưu trong database.
+
+    Mỗi job có BANDS khóa band trong bảng JobLshBands; job mới chỉ so signature
+    với các job trùng ít nhất một khóa band (tra theo index, không quét toàn
+    bảng). Ứng viên có độ tương đồng >= `threshold` thì job nhận ClusterId của
+    ứng viên giống nhất, ngược lại job là canonical của cluster mới (ClusterId = Id).
+
+    Job đã có fingerprint được tính lại khi title/company/mô tả đổi (signature khác
+    bản đã lưu): khóa band cũ bị thay và job được gán cluster lại. Các job khác đang
+    trỏ tới job đó làm canonical giữ nguyên ClusterId.
+    """
+
+    def __init__(self, threshold=0.7):
+        self.threshold = threshold
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings.getbool("DEDUP_ENABLED", True):
+            return None
+        return cls(threshold=settings.getfloat("DEDUP_THRESHOLD", 0.7))
+
+    def assign(self, db, rows):
+        """
+        Tính fingerprint cho các dòng JobsDes vừa upsert (khóa theo Url) chưa có
+        fingerprint hoặc có nội dung đổi so với fingerprint đã lưu. Trả về số job đã
+        fingerprint và số job bị gộp vào cluster khác.
+        """
+        from database.crud import JobCRUD, JobFingerprintCRUD
+
+        by_url = {row["Url"]: row for row in rows if row.get("Url")}
+        ids = JobCRUD.get_job_ids_by_urls(db, list(by_url))
+        stored = JobFingerprintCRUD.get_signatures(db, list(ids.values()))
+
+        pending, changed = [], []
+        for url, job_id in sorted(ids.items(), key=lambda pair: pair[1]):
+            row = by_url[url]
+            signature = minhash_signature(job_text(row.get("Title"), row.get("Company"), row_plain_text(row)))
+            if job_id in stored:
+                if pack_signature(signature) == stored[job_id][0]:
+                    continue
+                changed.append(job_id)
+            pending.append((job_id, signature, band_keys(signature)))
+        if not pending:
+            return {"fingerprinted": 0, "duplicates": 0}
+
+        # Ứng viên trong database cho mọi khóa band của batch, một lượt truy vấn
+        all_keys = {key for _, _, keys in pending for key in keys}
+        buckets = JobFingerprintCRUD.get_band_members(db, list(all_keys))
+        candidates = JobFingerprintCRUD.get_signatures(
+            db, list({job_id for members in buckets.values() for job_id in members}))
+        signatures = {job_id: (unpack_signature(data), cluster_id) for job_id, (data, cluster_id) in candidates.items()}
+
+        fingerprints, bands, clusters = [], [], []
+        duplicates = 0
+        for job_id, signature, keys in pending:
+            best_cluster, best_score = None, self.threshold
+            for candidate in {member for key in keys for member in buckets.get(key, ())} - {job_id}:
+                candidate_signature, candidate_cluster = signatures[candidate]
+                score = similarity(signature, candidate_signature)
+                if score >= best_score:
+                    best_cluster, best_score = candidate_cluster or candidate, score
+            cluster_id = best_cluster or job_id
+            if best_cluster is not None:
+                duplicates += 1
+
+            # Job trong cùng batch cũng là ứng viên của các job sau
+            signatures[job_id] = (signature, cluster_id)
+            for key in keys:
+                buckets.setdefault(key, []).append(job_id)
+
+            fingerprints.append({"JobId": job_id, "Signature": pack_signature(signature)})
+            bands.extend({"BandKey": key, "JobId": job_id} for key in set(keys))
+            clusters.append({"Id": job_id, "ClusterId": cluster_id})
+
+        JobFingerprintCRUD.save_fingerprints(db, fingerprints, bands, clusters, replace_ids=changed)
+        return {"fingerprinted": len(pending), "duplicates": duplicates}
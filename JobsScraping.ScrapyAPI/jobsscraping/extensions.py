@@ -0,0 +1,131 @@
+from collections import deque
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+from .feeds import RotatingJsonLinesWriter
+from .items import JobItem
+from .middlewares import percentile
+from .utils import arg_enabled
+from .watermarks import WatermarkStore
+
+
+class WatermarkExtension:
+    """
+    Gắn WatermarkStore vào spider (`spider.watermark`) khi mở và lưu lại khi đóng.
+    Spider dùng để bỏ job không đổi (is_known), JobsScrapingPipeline đánh dấu job đã
+    ghi vào database (observe). Chạy full crawl với `-a incremental=0`.
+    """
+
+    def __init__(self, crawler, default_enabled):
+        self.crawler = crawler
+        self.default_enabled = default_enabled
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        settings = crawler.settings
+        if settings.get("WATERMARK_BACKEND", "file") == "file" and not settings.get("WATERMARK_DIR"):
+            raise NotConfigured
+        ext = cls(crawler, settings.getbool("INCREMENTAL_CRAWL", True))
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        if not arg_enabled(getattr(spider, "incremental", None), self.default_enabled):
+            spider.logger.info("Incremental crawl disabled, running full crawl.")
+            return
+        spider.watermark = WatermarkStore.from_settings(self.crawler.settings, spider.name)
+
+    def spider_closed(self, spider, reason):
+        store = getattr(spider, "watermark", None)
+        if store is None:
+            return
+        stats = self.crawler.stats
+        stats.set_value("watermark/known_jobs", store.known_count)
+        stats.set_value("watermark/new_jobs", store.new_count)
+        store.save()
+        stats.set_value("watermark/high_water", store.high_water)
+
+
+class JsonLinesFeedExtension:
+    """
+    Ghi item ra JSON Lines nén gzip trong JSONL_FEED_DIR, xoay file theo
+    JSONL_FEED_ROTATE_BYTES. Đọc lại vào DB bằng `scrapy loadfeed` hoặc
+    task worker.tasks.load_feed.
+    """
+
+    def __init__(self, crawler, directory):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.directory = directory
+        self.rotate_bytes = settings.getint("JSONL_FEED_ROTATE_BYTES", 64 * 1024 ** 2)
+        self.flush_every = settings.getint("JSONL_FEED_FLUSH_ITEMS", 100)
+        self.writer = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        directory = crawler.settings.get("JSONL_FEED_DIR")
+        if not directory:
+            raise NotConfigured
+        ext = cls(crawler, directory)
+        crawler.signals.connect(ext.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(ext.item_scraped, signal=signals.item_scraped)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def spider_opened(self, spider):
+        directory = self.directory.format(source=spider.name)
+        self.writer = RotatingJsonLinesWriter(directory, spider.name, self.rotate_bytes, self.flush_every)
+
+    def item_scraped(self, item, spider):
+        self.writer.write(item.to_dict() if isinstance(item, JobItem) else dict(item))
+
+    def spider_closed(self, spider, reason):
+        if self.writer is None:
+            return
+        self.writer.close(reason)
+        stats = self.crawler.stats
+        stats.set_value("jsonl_feed/items", self.writer.items)
+        stats.set_value("jsonl_feed/parts", len(self.writer.parts))
+
+
+class LatencyStatsExtension:
+    """
+    Histogram download latency (ms) của các response không lấy từ cache, ghi
+    vào stats dạng latency/le_<bucket>ms cùng latency/p50_ms, latency/p95_ms.
+    """
+
+    def __init__(self, stats, buckets):
+        self.stats = stats
+        self.buckets = sorted(buckets)
+        self.samples = deque(maxlen=10000)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        buckets = crawler.settings.getlist("LATENCY_HISTOGRAM_BUCKETS_MS")
+        if not buckets:
+            raise NotConfigured
+        ext = cls(crawler.stats, [int(b) for b in buckets])
+        crawler.signals.connect(ext.response_received, signal=signals.response_received)
+        crawler.signals.connect(ext.spider_closed, signal=signals.spider_closed)
+        return ext
+
+    def bucket_key(self, latency_ms):
+        for bucket in self.buckets:
+            if latency_ms <= bucket:
+                return f"latency/le_{bucket}ms"
+        return f"latency/gt_{self.buckets[-1]}ms"
+
+    def response_received(self, response, request, spider):
+        latency = request.meta.get("download_latency")
+        if latency is None or "cached" in response.flags:
+            return
+        latency_ms = latency * 1000
+        self.samples.append(latency_ms)
+        self.stats.inc_value(self.bucket_key(latency_ms))
+
+    def spider_closed(self, spider):
+        if self.samples:
+            self.stats.set_value("latency/p50_ms", round(percentile(self.samples, 0.5), 1))
+            self.stats.set_value("latency/p95_ms", round(percentile(self.samples, 0.95), 1))
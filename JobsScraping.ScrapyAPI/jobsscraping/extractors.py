@@ -0,0 +1,136 @@
+import json
+from collections import deque
+
+from .utils import json_loads
+
+# Vị trí job trong __NEXT_DATA__ của trang chi tiết, thử theo thứ tự
+JOB_DETAIL_PATHS = (
+    ("props", "pageProps", "jobDetail"),
+    ("props", "pageProps", "job"),
+    ("props", "pageProps", "data", "jobDetail"),
+    ("props", "pageProps", "initialState", "jobDetail", "data"),
+)
+
+JOB_REQUIREMENT_KEYS = ("jobRequirement", "jobLevel", "yearsOfExperience")
+
+_json_decoder = json.JSONDecoder()
+
+
+def find_embedded_json(text):
+    """
+    Quét các thẻ <script> một lượt từ trái sang phải và trả về nội dung JSON nhúng:
+    ưu tiên __NEXT_DATA__, sau đó script application/json, cuối cùng `window.__NUXT__ = {...}`.
+    """
+    fallback = None
+    nuxt = None
+    pos = 0
+    while True:
+        start = text.find("<script", pos)
+        if start < 0:
+            break
+        tag_end = text.find(">", start)
+        if tag_end < 0:
+            break
+        close = text.find("</script>", tag_end)
+        if close < 0:
+            break
+        pos = close + 9
+
+        attrs = text[start:tag_end]
+        if "__NEXT_DATA__" in attrs:
+            return text[tag_end + 1:close]
+        if fallback is None and "application/json" in attrs:
+            fallback = text[tag_end + 1:close]
+        elif nuxt is None and "window.__NUXT__" in text[tag_end + 1:tag_end + 64]:
+            nuxt = (tag_end + 1, close)
+
+    if fallback is not None:
+        return fallback
+    if nuxt is not None:
+        brace = text.find("{", nuxt[0], nuxt[1])
+        if brace >= 0:
+            try:
+                _, end = _json_decoder.raw_decode(text, brace)
+                return text[brace:end]
+            except ValueError:
+                return None
+    return None
+
+
+def extract_embedded_json(text):
+    """Decode JSON nhúng của trang, None nếu không có hoặc không hợp lệ"""
+    raw = find_embedded_json(text or "")
+    if raw is None:
+        return None
+    try:
+        return json_loads(raw.strip())
+    except ValueError:
+        return None
+
+
+def _follow(node, path):
+    for key in path:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def find_keys(root, keys, max_nodes=5000):
+    """
+    Duyệt BFS có giới hạn, trả về giá trị đầu tiên của từng key trong `keys`.
+    Dừng khi đã tìm đủ hoặc đã thăm `max_nodes` node.
+    """
+    found = {}
+    queue = deque([root])
+    visited = 0
+    while queue and visited < max_nodes and len(found) < len(keys):
+        node = queue.popleft()
+        visited += 1
+        if isinstance(node, dict):
+            for key, value in node.items():
+                if key in keys and key not in found:
+                    found[key] = value
+                if isinstance(value, (dict, list)):
+                    queue.append(value)
+        elif isinstance(node, list):
+            queue.extend(item for item in node if isinstance(item, (dict, list)))
+    return found
+
+
+def extract_job_requirement(embed):
+    """Trả về (jobLevel, yearsOfExperience) từ JSON nhúng của trang chi tiết"""
+    if not isinstance(embed, dict):
+        return None, None
+
+    job = None
+    for path in JOB_DETAIL_PATHS:
+        job = _follow(embed, path)
+        if isinstance(job, dict):
+            break
+    else:
+        job = None
+
+    # Đường dẫn đã biết trước, không cần duyệt cả cây
+    fields = {}
+    if job is not None:
+        fields = {key: job[key] for key in JOB_REQUIREMENT_KEYS if key in job}
+    if not isinstance(fields.get("jobRequirement"), dict):
+        # Fallback: tìm trong node job trước, sau đó cả cây, đều có giới hạn
+        for root in ((job, embed) if job is not None else (embed,)):
+            for key, value in find_keys(root, JOB_REQUIREMENT_KEYS).items():
+                fields.setdefault(key, value)
+            if isinstance(fields.get("jobRequirement"), dict):
+                break
+
+    job_level = None
+    years_of_exp = None
+    requirement = fields.get("jobRequirement")
+    if isinstance(requirement, dict):
+        job_level = requirement.get("jobLevel")
+        years_of_exp = requirement.get("yearsOfExperience")
+    if job_level is None:
+        job_level = fields.get("jobLevel")
+    if years_of_exp is None:
+        years_of_exp = fields.get("yearsOfExperience")
+    return job_level, years_of_exp
@@ -0,0 +1,228 @@
+import logging
+import re
+
+from .text import row_plain_text
+from .utils import json_loads, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Tên skill đã chuẩn hóa (normalize_text, bỏ khoảng trắng) -> tên canonical trong bảng Skills
+SKILL_ALIASES = {
+    "react": "React", "reactjs": "React",
+    "reactnative": "React Native",
+    "node": "Node.js", "nodejs": "Node.js",
+    "vue": "Vue.js", "vuejs": "Vue.js",
+    "angular": "Angular", "angularjs": "Angular",
+    "js": "JavaScript", "javascript": "JavaScript",
+    "ts": "TypeScript", "typescript": "TypeScript",
+    "go": "Go", "golang": "Go",
+    "csharp": "C#",
+    "net": ".NET", "dotnet": ".NET", "aspnet": ".NET", "netcore": ".NET",
+    "cpp": "C++",
+    "python": "Python", "django": "Django", "flask": "Flask", "fastapi": "FastAPI",
+    "java": "Java", "spring": "Spring", "springboot": "Spring",
+    "php": "PHP", "laravel": "Laravel",
+    "sql": "SQL", "mysql": "MySQL", "postgres": "PostgreSQL", "postgresql": "PostgreSQL",
+    "mssql": "SQL Server", "sqlserver": "SQL Server",
+    "mongo": "MongoDB", "mongodb": "MongoDB",
+    "aws": "AWS", "amazonwebservices": "AWS", "azure": "Azure", "gcp": "GCP",
+    "k8s": "Kubernetes", "kubernetes": "Kubernetes", "docker": "Docker",
+    "devops": "DevOps", "kotlin": "Kotlin", "swift": "Swift", "flutter": "Flutter",
+}
+
+# Tên tỉnh/thành đã chuẩn hóa -> mã thành phố
+CITY_CODES = {
+    "ho chi minh": "HCM", "hcm": "HCM", "tp hcm": "HCM", "hcmc": "HCM", "sai gon": "HCM", "saigon": "HCM",
+    "ha noi": "HN", "hanoi": "HN",
+    "da nang": "DN", "danang": "DN",
+    "hai phong": "HP", "can tho": "CT",
+    "binh duong": "BD", "dong nai": "DNA", "khanh hoa": "KH", "nha trang": "KH",
+    "remote": "REMOTE", "tu xa": "REMOTE",
+}
+# Địa chỉ TP.HCM thường chỉ ghi quận/huyện hoặc TP Thủ Đức
+CITY_CODES.update(dict.fromkeys((
+    "thu duc", "binh thanh", "go vap", "tan binh", "tan phu", "phu nhuan", "binh tan",
+    "nha be", "cu chi", "hoc mon", "binh chanh", "can gio",
+    *(f"{prefix} {number}" for prefix in ("quan", "q", "district") for number in range(1, 13)),
+), "HCM"))
+# Khớp tên dài trước ("tp hcm" trước "hcm")
+_CITY_PATTERN = re.compile(
+    r"\b(" + "|".join(re.escape(name) for name in sorted(CITY_CODES, key=len, reverse=True)) + r")\b"
+)
+
+# Cấp bậc (đã chuẩn hóa) -> số năm kinh nghiệm tối thiểu
+LEVEL_YEARS = {
+    "intern": 0, "thuc tap": 0, "fresher": 0, "moi tot nghiep": 0,
+    "junior": 1, "nhan vien": 1,
+    "middle": 2, "mid": 2,
+    "senior": 4, "truong nhom": 4, "giam sat": 4,
+    "lead": 5, "leader": 5, "manager": 5, "truong phong": 5,
+    "director": 8, "giam doc": 8,
+}
+
+_SKILL_SEPARATORS = re.compile(r"[,;/|\n]+")
+# Số năm/tháng kinh nghiệm hay thời hạn trong chuỗi lương không phải số tiền
+_DURATION = re.compile(r"\d+\s*\+?\s*(?:-\s*\d+\s*)?(?:năm|nam|years?|yrs?|tháng|thang|months?)\b")
+_CURRENCY = re.compile(r"\$|\busd\b|\bvn[dđ]\b|\d\s*đ\b|\bđồng\b")
+_AMOUNT = re.compile(r"(\d[\d.,]*)\s*(k|tr|triệu|trieu|million|m)?(?![\w])")
+_THOUSANDS = re.compile(r"^\d{1,3}([.,]\d{3})+$")
+_MAX_ONLY = re.compile(r"(up ?to|tới|toi|đến|den|max)\s*\$?\s*\d")
+_MIN_ONLY = re.compile(r"(from|từ|tu|trên|tren|min)\s*\$?\s*\d")
+_YEARS = re.compile(r"(\d+)\s*\+?\s*(?:-\s*\d+\s*)?(?:nam|years?|yrs?)\b")
+_MULTIPLIERS = {"k": 1_000, "tr": 1_000_000, "triệu": 1_000_000, "trieu": 1_000_000, "million": 1_000_000,
+                "m": 1_000_000}
+
+
+def canonical_skill(name):
+    """Tên canonical của một skill, None nếu rỗng"""
+    key = normalize_text((name or "").lower().replace("c#", "csharp").replace("c++", "cpp"))
+    if not key:
+        return None
+    return SKILL_ALIASES.get(key.replace(" ", "")) or SKILL_ALIASES.get(key) or name.strip()
+
+
+def split_skills(text):
+    """Danh sách skill canonical (không trùng, giữ thứ tự) từ chuỗi RequiredSkills"""
+    skills = {}
+    for part in _SKILL_SEPARATORS.split(text or ""):
+        skill = canonical_skill(part)
+        if skill:
+            skills.setdefault(skill.lower(), skill)
+    return list(skills.values())
+
+
+def city_code(location):
+    """Mã thành phố đầu tiên nhắc tới trong địa chỉ, None nếu không nhận ra"""
+    match = _CITY_PATTERN.search(normalize_text(location))
+    return CITY_CODES[match.group(1)] if match else None
+
+
+def _amount(number, unit):
+    number = number.rstrip(".,")
+    if _THOUSANDS.match(number):
+        value = float(re.sub(r"[.,]", "", number))
+    else:
+        value = float(number.replace(",", "."))
+    return value * _MULTIPLIERS.get(unit or "", 1)
+
+
+def parse_salary(text):
+    """
+    (min, max, currency) từ chuỗi lương: "1500 - 2800 USD", "Up to $2,000",
+    "15 - 25 triệu". Chỉ đọc chuỗi có tiền tệ hoặc đơn vị tiền (triệu, k, ...);
+    lương thỏa thuận hoặc chuỗi khác ("Từ 2 năm") trả về (None, None, None).
+    """
+    text = _DURATION.sub(" ", (text or "").lower())
+    amounts = _AMOUNT.findall(text)[:2]
+    units = [unit for _, unit in amounts if unit]
+    has_currency = _CURRENCY.search(text) is not None
+    if not amounts or not (has_currency or units):
+        return None, None, None
+
+    if "$" in text or "usd" in text:
+        currency = "USD"
+    elif has_currency or any(unit != "k" for unit in units):
+        currency = "VND"
+    else:
+        currency = None
+
+    # "15 - 25 triệu": đơn vị chỉ ghi ở số sau
+    unit = amounts[-1][1] or None
+    values = [_amount(number, own_unit or unit) for number, own_unit in amounts]
+    if len(values) == 2:
+        return min(values), max(values), currency
+    if _MAX_ONLY.search(text):
+        return None, values[0], currency
+    if _MIN_ONLY.search(text):
+        return values[0], None, currency
+    return values[0], values[0], currency
+
+
+def amount_currency(value):
+    """Tiền tệ của số lương không kèm đơn vị (VietnamWorks salaryMin/salaryMax): USD theo tháng không tới 100 nghìn"""
+    if value is None:
+        return None
+    return "USD" if value < 100000 else "VND"
+
+
+def min_years_experience(years=None, level=None, description=None):
+    """Số năm kinh nghiệm tối thiểu: số năm ghi rõ, rồi tới cấp bậc, rồi tới mô tả"""
+    if years is not None:
+        match = re.search(r"\d+", str(years))
+        if match:
+            return int(match.group())
+    level = normalize_text(level)
+    levels = [value for name, value in LEVEL_YEARS.items() if re.search(rf"\b{name}\b", level)]
+    if levels:
+        return min(levels)
+    match = _YEARS.search(normalize_text(description)) if description else None
+    return int(match.group(1)) if match else None
+
+
+class JobFeatureExtractor:
+    """
+    Tính feature có kiểu cho các dòng JobsDes vừa upsert và lưu vào JobFeatures /
+    JobSkill: mã thành phố, lương min/max theo số + tiền tệ, số năm kinh nghiệm tối
+    thiểu và Id skill canonical (bảng Skills). Filter và chấm điểm dùng các cột này
+    thay vì parse lại chuỗi ở mỗi request.
+    """
+
+    def __init__(self):
+        # tên skill (chữ thường) -> Skills.Id, giữ qua các batch
+        self.skill_ids = {}
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings.getbool("JOB_FEATURES_ENABLED", True):
+            return None
+        return cls()
+
+    @staticmethod
+    def extract(row):
+        """Feature của một dòng JobsDes (dict theo tên cột)"""
+        raw = {}
+        if row.get("RawContent"):
+            try:
+                raw = json_loads(row["RawContent"])
+            except ValueError:
+                pass
+        if not isinstance(raw, dict):
+            raw = {}
+
+        salary_min, salary_max, currency = parse_salary(row.get("Salary"))
+        if raw.get("salary_min") or raw.get("salary_max"):
+            # Số lương của API chính xác hơn chuỗi hiển thị; tiền tệ vẫn lấy từ chuỗi nếu có
+            salary_min, salary_max = raw.get("salary_min") or None, raw.get("salary_max") or None
+            currency = currency or amount_currency(salary_max or salary_min)
+        return {
+            "CityCode": city_code(row.get("Location")),
+            "SalaryMin": salary_min,
+            "SalaryMax": salary_max,
+            "SalaryCurrency": currency,
+            "MinYearsExperience": min_years_experience(raw.get("years_of_experience"), row.get("ExperienceLevel"),
+                                                       row_plain_text(row)),
+            "skills": split_skills(row.get("RequiredSkills")),
+        }
+
+    def apply(self, db, rows):
+        """Ghi feature cho các dòng (khóa theo Url), trả về số job đã xử lý"""
+        from database.crud import JobCRUD, JobFeatureCRUD, SkillCRUD
+
+        by_url = {row["Url"]: row for row in rows if row.get("Url")}
+        ids = JobCRUD.get_job_ids_by_urls(db, list(by_url))
+        if not ids:
+            return 0
+
+        extracted = {job_id: self.extract(by_url[url]) for url, job_id in ids.items()}
+        missing = {skill.lower(): skill for features in extracted.values() for skill in features["skills"]
+                   if skill.lower() not in self.skill_ids}
+        if missing:
+            self.skill_ids.update(SkillCRUD.get_or_create_skill_ids(db, list(missing.values())))
+
+        features, job_skills = [], []
+        for job_id, values in extracted.items():
+            skill_ids = {self.skill_ids[skill.lower()] for skill in values.pop("skills")}
+            features.append(dict(values, JobId=job_id))
+            job_skills.extend({"JobId": job_id, "SkillId": skill_id} for skill_id in skill_ids)
+        JobFeatureCRUD.replace_job_features(db, list(extracted), features, job_skills)
+        return len(features)
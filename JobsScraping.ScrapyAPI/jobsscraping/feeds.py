@@ -0,0 +1,255 @@
+import glob
+import gzip
+import json
+import logging
+import os
+import time
+import zlib
+
+from .utils import json_loads
+
+logger = logging.getLogger(__name__)
+
+PART_SUFFIX = ".jsonl.gz"
+DONE_MARKER = "_DONE"
+CHECKPOINT_FILENAME = "_checkpoint.json"
+
+
+def list_parts(directory):
+    return sorted(glob.glob(os.path.join(directory, f"*{PART_SUFFIX}")))
+
+
+class RotatingJsonLinesWriter:
+    """
+    Ghi item dạng JSON Lines nén gzip, sang file mới khi phần hiện tại vượt
+    `rotate_bytes` (tính theo dữ liệu chưa nén).
+
+    Sau mỗi `flush_every` dòng stream được sync flush, nên nếu crawl bị crash
+    thì các dòng đã flush vẫn đọc được; file chưa đóng chỉ thiếu phần cuối.
+    """
+
+    def __init__(self, directory, prefix, rotate_bytes=64 * 1024 ** 2, flush_every=100):
+        self.directory = directory
+        self.prefix = prefix
+        self.rotate_bytes = rotate_bytes
+        self.flush_every = flush_every
+        self.parts = []
+        self.items = 0
+        self._file = None
+        self._part_bytes = 0
+        self._unflushed = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _open_part(self):
+        path = os.path.join(self.directory, f"{self.prefix}-{len(self.parts):05d}{PART_SUFFIX}")
+        self._file = gzip.open(path, "wb", compresslevel=6)
+        self._part_bytes = 0
+        self.parts.append(path)
+
+    def _close_part(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def write(self, data):
+        line = json.dumps(data, ensure_ascii=False, default=str).encode("utf-8") + b"\n"
+        if self._file is None or (self.rotate_bytes > 0 and self._part_bytes + len(line) > self.rotate_bytes
+                                  and self._part_bytes > 0):
+            self._close_part()
+            self._open_part()
+        self._file.write(line)
+        self._part_bytes += len(line)
+        self.items += 1
+
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self._unflushed = 0
+            self._file.flush()
+
+    def close(self, reason=None):
+        self._close_part()
+        # Đánh dấu feed đã ghi xong để loader ở chế độ follow biết khi nào dừng
+        with open(os.path.join(self.directory, DONE_MARKER), "w", encoding="utf-8") as f:
+            json.dump({"reason": reason, "items": self.items, "parts": [os.path.basename(p) for p in self.parts]}, f)
+
+
+class PartReader:
+    """
+    Đọc tuần tự các dòng của một part .jsonl.gz, kể cả part đang được ghi.
+
+    Giữ file và trạng thái zlib giữa các lần đọc: lần đọc sau tiếp tục ở byte nén
+    kế tiếp thay vì mở lại và giải nén từ đầu, nên mỗi byte chỉ được giải nén một
+    lần dù loader poll bao nhiêu lần. `skip` bỏ qua số byte (chưa nén) đã nạp ở
+    lần chạy trước.
+    """
+
+    def __init__(self, path, skip=0, chunk_size=256 * 1024):
+        self.file = open(path, "rb")
+        self.skip = skip
+        self.chunk_size = chunk_size
+        self.finished = False
+        self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self._pending = b""
+        self._skipped = 0
+
+    def lines(self):
+        """Các dòng đầy đủ (kèm "\n") đã có trên đĩa; dòng đang ghi dở được giữ lại cho lần đọc sau"""
+        while not self.finished:
+            chunk = self.file.read(self.chunk_size)
+            if not chunk:
+                return
+            data = self._decompressor.decompress(chunk)
+            while self._decompressor.eof and self._decompressor.unused_data:
+                # Nhiều gzip member nối nhau
+                rest = self._decompressor.unused_data
+                self._decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+                data += self._decompressor.decompress(rest)
+            if self._decompressor.eof:
+                # Writer đã đóng part (gzip trailer đã ghi)
+                self.finished = True
+
+            *lines, self._pending = (self._pending + data).split(b"\n")
+            lines = [line + b"\n" for line in lines]
+            if self.finished and self._pending:
+                # Dòng cuối của part đã đóng nhưng không có "\n"
+                lines.append(self._pending)
+                self._pending = b""
+            for line in lines:
+                if self._skipped < self.skip:
+                    self._skipped += len(line)
+                    continue
+                yield line
+
+    def close(self):
+        self.file.close()
+
+
+class FeedLoader:
+    """
+    Đọc feed JSON Lines (các part *.jsonl.gz trong một thư mục) vào JobsDes theo batch.
+
+    Bộ nhớ cố định: chỉ giữ một batch dòng. Sau mỗi batch commit, byte offset
+    (dữ liệu chưa nén) của part đang đọc được ghi vào _checkpoint.json, nên chạy
+    lại sẽ tiếp tục từ offset đó. Với `follow=True` loader đọc tiếp các part
+    đang được ghi cho tới khi crawl ghi file _DONE; PartReader của part chưa xong
+    được giữ giữa các lần poll nên không phải giải nén lại từ đầu part.
+    """
+
+    def __init__(self, directory, batch_size=500, checkpoint_path=None, dedup_index=None, feature_extractor=None,
+                 text_normalizer=None, match_notifier=None):
+        self.directory = directory
+        self.match_notifier = match_notifier
+        self.text_normalizer = text_normalizer
+        self.batch_size = batch_size
+        self.dedup_index = dedup_index
+        self.feature_extractor = feature_extractor
+        self.checkpoint_path = checkpoint_path or os.path.join(directory, CHECKPOINT_FILENAME)
+        self.offsets = {}
+        self.done = set()
+        self._readers = {}
+        self.counts = {"rows_inserted": 0, "rows_updated": 0, "rows_unchanged": 0, "rows_skipped": 0,
+                       "lines_invalid": 0, "near_duplicates": 0, "step_errors": 0}
+        self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path, encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        self.offsets = data.get("offsets", {})
+        self.done = set(data.get("done", []))
+
+    def _save_checkpoint(self):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"offsets": self.offsets, "done": sorted(self.done)}, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def run(self, follow=False, poll_interval=5.0, timeout=None):
+        from database.db import SessionLocal
+        from .pipelines import jobsdes_column_lengths
+
+        column_lengths = jobsdes_column_lengths()
+        started = time.monotonic()
+        db = SessionLocal()
+        try:
+            while True:
+                progressed = False
+                for path in list_parts(self.directory):
+                    name = os.path.basename(path)
+                    if name in self.done:
+                        continue
+                    progressed |= self._load_part(db, path, name, column_lengths)
+
+                finished = os.path.exists(os.path.join(self.directory, DONE_MARKER))
+                if not follow or (finished and all(
+                        os.path.basename(p) in self.done for p in list_parts(self.directory))):
+                    break
+                if timeout is not None and time.monotonic() - started > timeout:
+                    logger.warning(f"Stopped following {self.directory} after {timeout}s")
+                    break
+                if not progressed:
+                    time.sleep(poll_interval)
+        finally:
+            db.close()
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
+            if self.match_notifier is not None:
+                self.match_notifier.flush()
+        return dict(self.counts, parts_done=len(self.done))
+
+    def _load_part(self, db, path, name, column_lengths):
+        """Đọc tiếp một part từ offset đã lưu; trả về True nếu có dòng mới"""
+        from database.crud import JobCRUD
+        from .items import JobItem
+        from .pipelines import job_row, run_ingest_steps
+
+        offset = self.offsets.get(name, 0)
+        position = offset
+        rows = []
+        reader = self._readers.get(name)
+        if reader is None:
+            # Lần đầu đọc part trong lần chạy này: giải nén lại (một lần) phần đã nạp ở lần chạy trước
+            reader = self._readers[name] = PartReader(path, skip=offset)
+
+        def flush():
+            if rows:
+                counts = JobCRUD.bulk_upsert_jobs(db, rows)
+                self.counts["rows_inserted"] += counts["inserted"]
+                self.counts["rows_updated"] += counts["updated"]
+                self.counts["rows_unchanged"] += counts["unchanged"]
+                # Các bước sau chỉ cho job mới hoặc đổi nội dung; bước lỗi không chặn checkpoint
+                written = [row for row in rows if row.get("Url") in counts["job_ids"]]
+                extra = run_ingest_steps(db, written, counts["job_ids"].values(), self.text_normalizer,
+                                         self.feature_extractor, self.dedup_index, self.match_notifier)
+                self.counts["near_duplicates"] += extra.get("ingest/near_duplicates", 0)
+                self.counts["step_errors"] += sum(value for key, value in extra.items() if key.endswith("_errors"))
+                rows.clear()
+            self.offsets[name] = position
+            self._save_checkpoint()
+
+        # Part chưa đóng (crawl đang chạy hoặc đã crash): chỉ đọc tới phần đã sync flush
+        for line in reader.lines():
+            position += len(line)
+            try:
+                row = job_row(JobItem.from_dict(json_loads(line)), column_lengths)
+            except (ValueError, AttributeError):
+                self.counts["lines_invalid"] += 1
+                continue
+            if row is None:
+                self.counts["rows_skipped"] += 1
+                continue
+            rows.append(row)
+            if len(rows) >= self.batch_size:
+                flush()
+
+        progressed = position > offset
+        if reader.finished:
+            self.done.add(name)
+            reader.close()
+            del self._readers[name]
+        if progressed or reader.finished:
+            flush()
+        return progressed
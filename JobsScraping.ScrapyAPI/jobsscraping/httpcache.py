@@ -0,0 +1,216 @@
+import glob
+import logging
+import os
+import sqlite3
+import time
+import zlib
+
+from scrapy.http import Headers
+from scrapy.responsetypes import responsetypes
+from scrapy.utils.project import data_path
+from w3lib.http import headers_dict_to_raw, headers_raw_to_dict
+
+try:
+    import zstandard
+except ImportError:  # zstandard là tùy chọn, fallback về zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Mỗi source một file trong HTTPCACHE_DIR, các source khác nhau không tranh lock ghi
+CACHE_FILENAME = "{source}.sqlite"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    fingerprint BLOB PRIMARY KEY,
+    source TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers BLOB NOT NULL,
+    body BLOB NOT NULL,
+    codec TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    stored_at REAL NOT NULL,
+    expires_at REAL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_responses_stored_at ON responses (stored_at);
+CREATE INDEX IF NOT EXISTS ix_responses_expires_at ON responses (expires_at);
+"""
+
+
+# Tái sử dụng context nén, tạo mới mỗi lần tốn hơn cả việc nén body nhỏ
+_zstd_compressor = zstandard.ZstdCompressor(level=3) if zstandard is not None else None
+_zstd_decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+
+
+def _compress(data):
+    if _zstd_compressor is not None:
+        return "zstd", _zstd_compressor.compress(data)
+    return "zlib", zlib.compress(data, 6)
+
+
+def _decompress(codec, data):
+    if codec == "zstd":
+        if _zstd_decompressor is None:
+            raise RuntimeError("Cache entry is zstd-compressed but zstandard is not installed")
+        return _zstd_decompressor.decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+def cache_path(directory, source):
+    return os.path.join(directory, CACHE_FILENAME.format(source=source))
+
+
+def cache_files(directory):
+    return sorted(glob.glob(os.path.join(directory, CACHE_FILENAME.format(source="*"))))
+
+
+def connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    # Autocommit: mỗi lần ghi là một transaction riêng, không giữ write lock giữa các lần ghi
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    # WAL cho phép nhiều worker (các shard của cùng source) đọc/ghi cùng file cache
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def evict(conn, max_bytes):
+    """
+    Xóa entry hết hạn, sau đó xóa entry cũ nhất tới khi tổng dung lượng <= 90% max_bytes,
+    trong một transaction
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        removed = _evict(conn, max_bytes)
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+    conn.execute("COMMIT")
+    return removed
+
+
+def _evict(conn, max_bytes):
+    removed = conn.execute(
+        "DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at < ?", (time.time(),)
+    ).rowcount
+    if max_bytes > 0:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        target = int(max_bytes * 0.9)
+        if total > max_bytes:
+            cursor = conn.execute("SELECT fingerprint, size FROM responses ORDER BY stored_at")
+            victims = []
+            for fingerprint, size in cursor:
+                if total <= target:
+                    break
+                victims.append((fingerprint,))
+                total -= size
+            conn.executemany("DELETE FROM responses WHERE fingerprint = ?", victims)
+            removed += len(victims)
+    return removed
+
+
+def compact(path, max_bytes=0):
+    """Bảo trì cache: evict rồi VACUUM để trả lại dung lượng đĩa"""
+    before = os.path.getsize(path) if os.path.exists(path) else 0
+    conn = connect(path)
+    try:
+        removed = evict(conn, max_bytes)
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        conn.execute("VACUUM")
+        entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "removed": removed,
+        "entries": entries,
+        "bytes_before": before,
+        "bytes_after": os.path.getsize(path),
+    }
+
+
+class SqliteCacheStorage:
+    """
+    HTTP cache SQLite thay cho FilesystemCacheStorage, một file cho mỗi spider
+    (HTTPCACHE_DIR/<spider>.sqlite).
+
+    Tra cứu theo request fingerprint (primary key), body nén zstd (zlib nếu
+    không có zstandard). TTL lấy theo tên spider trong HTTPCACHE_SOURCE_TTLS,
+    mặc định HTTPCACHE_EXPIRATION_SECS (0 = không hết hạn). Khi dung lượng
+    một file vượt HTTPCACHE_MAX_BYTES thì entry cũ nhất bị xóa.
+
+    Mỗi response ghi trong transaction riêng (WAL, synchronous=NORMAL nên commit
+    không fsync), các shard cùng source ghi chung file mà không giữ lock của nhau.
+    """
+
+    def __init__(self, settings):
+        self.directory = data_path(settings["HTTPCACHE_DIR"], createdir=True)
+        self.path = None
+        self.expiration_secs = settings.getint("HTTPCACHE_EXPIRATION_SECS")
+        self.source_ttls = settings.getdict("HTTPCACHE_SOURCE_TTLS")
+        self.max_bytes = settings.getint("HTTPCACHE_MAX_BYTES")
+        self.conn = None
+        self.ttl = self.expiration_secs
+        self._bytes_since_evict = 0
+
+    def open_spider(self, spider):
+        self.path = cache_path(self.directory, spider.name)
+        logger.debug(f"Using SQLite cache storage in {self.path}", extra={"spider": spider})
+        self._fingerprinter = spider.crawler.request_fingerprinter
+        self.ttl = int(self.source_ttls.get(spider.name, self.expiration_secs))
+        self.conn = connect(self.path)
+
+    def close_spider(self, spider):
+        if self.conn is None:
+            return
+        evict(self.conn, self.max_bytes)
+        self.conn.close()
+        self.conn = None
+
+    def retrieve_response(self, spider, request):
+        row = self.conn.execute(
+            "SELECT url, status, headers, body, codec, expires_at FROM responses WHERE fingerprint = ?",
+            (self._fingerprinter.fingerprint(request),),
+        ).fetchone()
+        if row is None:
+            return None
+        url, status, rawheaders, body, codec, expires_at = row
+        if expires_at is not None and expires_at < time.time():
+            return None
+
+        body = _decompress(codec, body)
+        headers = Headers(headers_raw_to_dict(rawheaders))
+        respcls = responsetypes.from_args(headers=headers, url=url, body=body)
+        return respcls(url=url, headers=headers, status=status, body=body)
+
+    def store_response(self, spider, request, response):
+        now = time.time()
+        codec, body = _compress(response.body)
+        headers = headers_dict_to_raw(response.headers)
+        size = len(body) + len(headers)
+        self.conn.execute(
+            "INSERT OR REPLACE INTO responses "
+            "(fingerprint, source, url, status, headers, body, codec, size, stored_at, expires_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                self._fingerprinter.fingerprint(request),
+                spider.name,
+                response.url,
+                response.status,
+                headers,
+                body,
+                codec,
+                size,
+                now,
+                now + self.ttl if self.ttl > 0 else None,
+            ),
+        )
+
+        # Evict khi đã ghi thêm khoảng 10% dung lượng cho phép
+        self._bytes_since_evict += size
+        if self.max_bytes > 0 and self._bytes_since_evict > self.max_bytes // 10:
+            self._bytes_since_evict = 0
+            evict(self.conn, self.max_bytes)
@@ -1,17 +1,91 @@
-import scrapy
-
-class JobItem(scrapy.Item):
-    title = scrapy.Field()
-    company = scrapy.Field()
-    location = scrapy.Field()
-    description = scrapy.Field()
-    url = scrapy.Field()
-    posted_date = scrapy.Field()
-    job_type = scrapy.Field()
-    salary = scrapy.Field()
-    experience_level = scrapy.Field()
-    industry = scrapy.Field()
-    employment_type = scrapy.Field()
-    required_skills = scrapy.Field()
-    benefits = scrapy.Field()
-    source = scrapy.Field()
\ No newline at end of file
+import sys
+from dataclasses import dataclass, fields
+from datetime import datetime
+from typing import ClassVar, Dict, Optional
+
+from .utils import to_datetime
+
+
+def intern_text(value):
+    """Intern chuỗi lặp lại nhiều (source, địa điểm, cấp bậc...) để các item dùng chung một object"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+@dataclass(slots=True)
+class JobItem:
+    """
+    Item chung cho mọi spider, đã chuẩn hóa theo cột JobsDes.
+
+    Spider chịu trách nhiệm làm phẳng dữ liệu API (to_text/to_datetime) khi tạo
+    item; pipeline và feed exporter chỉ đọc các field, không map lại.
+    """
+
+    title: Optional[str] = None
+    company: Optional[str] = None
+    location: Optional[str] = None
+    description: Optional[str] = None
+    url: Optional[str] = None
+    posted_date: Optional[datetime] = None
+    job_type: Optional[str] = None
+    salary: Optional[str] = None
+    experience_level: Optional[str] = None
+    industry: Optional[str] = None
+    employment_type: Optional[str] = None
+    required_skills: Optional[str] = None
+    benefits: Optional[str] = None
+    source: Optional[str] = None
+    # Không có cột riêng trong JobsDes, chỉ lưu trong RawContent
+    job_id: Optional[str] = None
+    # Mốc thời gian của job cho incremental crawl (watermarks.job_stamp), pipeline đánh dấu
+    # watermark sau khi job đã được ghi vào database
+    stamp: Optional[str] = None
+    years_of_experience: Optional[str] = None
+    # Lương dạng số và hạn nộp khi API có sẵn (VietnamWorks salaryMin/salaryMax/expiredOn);
+    # JobFeatureExtractor ưu tiên số này hơn parse chuỗi salary
+    salary_min: Optional[float] = None
+    salary_max: Optional[float] = None
+    expired_on: Optional[datetime] = None
+    scraped_at: Optional[datetime] = None
+
+    # Field nhận giá trị lặp lại giữa các job, intern khi tạo item
+    INTERNED: ClassVar[tuple] = ("location", "job_type", "experience_level", "industry", "employment_type", "source")
+
+    # Field -> cột JobsDes
+    COLUMNS: ClassVar[Dict[str, str]] = {
+        "title": "Title",
+        "company": "Company",
+        "location": "Location",
+        "description": "Description",
+        "url": "Url",
+        "posted_date": "PostedDate",
+        "job_type": "JobType",
+        "salary": "Salary",
+        "experience_level": "ExperienceLevel",
+        "industry": "Industry",
+        "employment_type": "EmploymentType",
+        "required_skills": "RequiredSkills",
+        "benefits": "Benefits",
+        "source": "Source",
+    }
+
+    def __post_init__(self):
+        for name in self.INTERNED:
+            value = getattr(self, name)
+            if value is not None:
+                setattr(self, name, intern_text(value))
+
+    def to_row(self):
+        """Dict theo tên cột JobsDes"""
+        return {column: getattr(self, name) for name, column in self.COLUMNS.items()}
+
+    def to_dict(self):
+        return {f.name: getattr(self, f.name) for f in fields(self)}
+
+    @classmethod
+    def from_dict(cls, data):
+        """Dựng lại item từ dòng JSON của feed; bỏ key lạ, parse lại ngày giờ"""
+        item = cls(**{name: data.get(name) for name in cls.__dataclass_fields__ if name in data})
+        item.posted_date = to_datetime(item.posted_date)
+        item.expired_on = to_datetime(item.expired_on)
+        item.scraped_at = to_datetime(item.scraped_at)
+        return item
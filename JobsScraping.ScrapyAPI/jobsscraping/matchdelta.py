@@ -0,0 +1,53 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+MATCH_DELTA_TASK = "worker.tasks.match_new_jobs"
+
+# Broker không kết nối được thì bỏ lô sau vài giây thay vì chờ theo retry mặc định của Celery
+SEND_RETRY_POLICY = {"max_retries": 2, "interval_start": 0, "interval_step": 0.5, "interval_max": 1}
+
+
+class MatchDeltaNotifier:
+    """
+    Gom Id các job vừa insert hoặc đổi nội dung và gửi cho worker (task worker.tasks.match_new_jobs) để
+    chỉ các job mới/đổi được chấm với những CV đã match, thay vì chấm lại mọi CV với
+    mọi job. Id được gom tới khi đủ `batch_size` hoặc khi flush() (cuối crawl / feed),
+    nên mỗi task chấm một lô job đủ lớn.
+
+    Phải chạy sau JobFeatureExtractor và NearDuplicateIndex: task đọc JobFeatures,
+    JobSkill và ClusterId của các job này. flush() chặn tới khi broker nhận task (tối đa
+    theo SEND_RETRY_POLICY), nên không gọi trực tiếp trên reactor của Scrapy.
+    """
+
+    def __init__(self, batch_size=2000):
+        self.batch_size = batch_size
+        self.pending = set()
+        self.tasks_sent = 0
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings.getbool("MATCH_DELTA_ENABLED", True):
+            return None
+        return cls(batch_size=settings.getint("MATCH_DELTA_BATCH_SIZE", 2000))
+
+    def apply(self, job_ids):
+        """Ghi nhận Id các job vừa insert hoặc đổi nội dung (JobCRUD.bulk_upsert_jobs), trả về số job được gom"""
+        self.pending.update(job_ids)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+        return len(job_ids)
+
+    def flush(self):
+        """Gửi các Id đang gom cho worker; không gửi được thì bỏ (lần chấm đầy đủ kế tiếp sẽ bù)"""
+        if not self.pending:
+            return
+        job_ids, self.pending = sorted(self.pending), set()
+
+        from worker.celery_app import celery_app
+
+        try:
+            celery_app.send_task(MATCH_DELTA_TASK, args=[job_ids], retry=True, retry_policy=SEND_RETRY_POLICY)
+            self.tasks_sent += 1
+        except Exception as e:
+            logger.error(f"Cannot send {len(job_ids)} new jobs for matching: {e}")
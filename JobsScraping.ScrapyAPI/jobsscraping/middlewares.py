@@ -0,0 +1,277 @@
+import time
+from collections import deque
+
+from scrapy import Request, signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet import reactor, threads
+from twisted.internet.task import deferLater
+
+from .items import JobItem
+from .seen import SeenFilter
+from .utils import arg_enabled
+
+try:
+    import redis
+except ImportError:  # redis chỉ cần khi bật GLOBAL_RATE_LIMIT_ENABLED
+    redis = None
+
+# Status báo server đang quá tải, cần giảm tải
+BACKOFF_HTTP_CODES = {429, 500, 502, 503, 504}
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class HostState:
+    """Trạng thái AIMD của một download slot (host)"""
+
+    def __init__(self, concurrency, delay):
+        self.concurrency = concurrency
+        self.delay = delay
+        self.credit = 0
+        self.last_decrease = 0.0
+        self.max_concurrency = concurrency
+        self.latencies = deque(maxlen=1000)
+
+
+class AdaptiveConcurrencyMiddleware:
+    """
+    Điều chỉnh concurrency của từng host theo kiểu AIMD.
+
+    Mỗi cửa sổ `concurrency` response nhanh (latency <= AIMD_TARGET_LATENCY) và
+    không lỗi thì tăng concurrency thêm 1; gặp 429/5xx hoặc lỗi kết nối thì nhân
+    concurrency với AIMD_BACKOFF_FACTOR. Khi đã ở mức tối thiểu mà vẫn bị throttle
+    thì tăng download delay thay vì concurrency.
+    """
+
+    def __init__(self, crawler):
+        settings = crawler.settings
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.start_concurrency = settings.getint("AIMD_START_CONCURRENCY", 2)
+        self.min_concurrency = settings.getint("AIMD_MIN_CONCURRENCY", 1)
+        self.max_concurrency = settings.getint("AIMD_MAX_CONCURRENCY", 16)
+        self.target_latency = settings.getfloat("AIMD_TARGET_LATENCY", 1.0)
+        self.backoff_factor = settings.getfloat("AIMD_BACKOFF_FACTOR", 0.5)
+        self.max_delay = settings.getfloat("AIMD_MAX_DELAY", 10.0)
+        self.hosts = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("AIMD_ENABLED"):
+            raise NotConfigured
+        middleware = cls(crawler)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def process_response(self, request, response, spider):
+        if "cached" not in response.flags:
+            self._feedback(
+                request,
+                latency=request.meta.get("download_latency"),
+                overloaded=response.status in BACKOFF_HTTP_CODES,
+            )
+        return response
+
+    def process_exception(self, request, exception, spider):
+        self._feedback(request, latency=None, overloaded=True)
+
+    def _feedback(self, request, latency, overloaded):
+        key = request.meta.get("download_slot")
+        slot = self.crawler.engine.downloader.slots.get(key) if key else None
+        if slot is None:
+            return
+
+        state = self.hosts.get(key)
+        if state is None:
+            state = self.hosts[key] = HostState(self.start_concurrency, slot.delay)
+        if latency is not None:
+            state.latencies.append(latency)
+
+        now = time.monotonic()
+        if overloaded:
+            # Chỉ giảm một lần cho mỗi đợt lỗi, tránh sụp về 1 vì một loạt 429 cùng lúc
+            if now - state.last_decrease >= max(self.target_latency, slot.delay):
+                state.last_decrease = now
+                state.credit = 0
+                if state.concurrency > self.min_concurrency:
+                    state.concurrency = max(self.min_concurrency, int(state.concurrency * self.backoff_factor))
+                else:
+                    state.delay = min(self.max_delay, max(state.delay * 2, 0.25))
+                self.stats.inc_value(f"aimd/{key}/backoffs")
+        elif latency is not None and latency <= self.target_latency:
+            if state.delay > 0:
+                state.delay = state.delay / 2 if state.delay > 0.05 else 0.0
+            state.credit += 1
+            if state.credit >= state.concurrency and state.concurrency < self.max_concurrency:
+                state.concurrency += 1
+                state.credit = 0
+        elif latency is not None and latency > 2 * self.target_latency:
+            # Server chậm dần: giảm nhẹ thay vì tiếp tục tăng
+            state.credit = 0
+            if state.concurrency > self.min_concurrency:
+                state.concurrency -= 1
+
+        state.max_concurrency = max(state.max_concurrency, state.concurrency)
+        slot.concurrency = state.concurrency
+        slot.delay = state.delay
+        self.stats.set_value(f"aimd/{key}/concurrency", state.concurrency)
+
+    def spider_closed(self, spider):
+        for key, state in self.hosts.items():
+            self.stats.set_value(f"aimd/{key}/concurrency", state.concurrency)
+            self.stats.set_value(f"aimd/{key}/concurrency_max", state.max_concurrency)
+            self.stats.set_value(f"aimd/{key}/delay", round(state.delay, 3))
+            p50 = percentile(state.latencies, 0.5)
+            p95 = percentile(state.latencies, 0.95)
+            if p50 is not None:
+                self.stats.set_value(f"aimd/{key}/latency_p50_ms", round(p50 * 1000, 1))
+                self.stats.set_value(f"aimd/{key}/latency_p95_ms", round(p95 * 1000, 1))
+
+
+class GlobalRateLimitMiddleware:
+    """
+    Giới hạn số request/giây của một source trên mọi worker (GLOBAL_RATE_LIMITS),
+    dùng GCRA trong Redis.
+
+    Mỗi request đặt trước một slot thời gian bằng một script Lua nguyên tử (một
+    round-trip, đồng hồ của Redis) rồi chờ tới slot đó, nên các shard của cùng một
+    source cộng lại không vượt giới hạn dù chạy trên bao nhiêu worker. AIMD vẫn
+    điều chỉnh concurrency của từng worker bên dưới giới hạn này.
+
+    Lệnh Redis chạy trong thread pool để không chặn reactor; Redis lỗi thì request
+    vẫn đi (chỉ còn AIMD giới hạn) thay vì làm hỏng cả crawl, và giới hạn tạm tắt
+    trong GLOBAL_RATE_LIMIT_RETRY_AFTER giây để các request sau không phải chờ
+    timeout của Redis.
+    """
+
+    # KEYS[1] lưu thời điểm slot trống kế tiếp (TAT); trả về số giây phải chờ
+    RESERVE_SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local interval = tonumber(ARGV[1])
+local tat = tonumber(redis.call('GET', KEYS[1]) or '0')
+if tat < now then tat = now end
+local wait = tat - now - tonumber(ARGV[2]) * interval
+if wait < 0 then wait = 0 end
+redis.call('SET', KEYS[1], tostring(tat + interval), 'PX', math.ceil((tat + interval - now) * 1000) + 1000)
+return tostring(wait)
+"""
+
+    def __init__(self, crawler, client):
+        settings = crawler.settings
+        self.stats = crawler.stats
+        self.rates = settings.getdict("GLOBAL_RATE_LIMITS")
+        self.burst = settings.getint("GLOBAL_RATE_LIMIT_BURST", 2)
+        self.retry_after = settings.getfloat("GLOBAL_RATE_LIMIT_RETRY_AFTER", 30.0)
+        self.reserve = client.register_script(self.RESERVE_SCRIPT)
+        # Redis lỗi: request không bị giới hạn tới thời điểm này (monotonic)
+        self.disabled_until = 0.0
+        self.unavailable = False
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("GLOBAL_RATE_LIMIT_ENABLED"):
+            raise NotConfigured
+        if redis is None:
+            raise RuntimeError("GLOBAL_RATE_LIMIT_ENABLED requires the redis package")
+        timeout = crawler.settings.getfloat("GLOBAL_RATE_LIMIT_TIMEOUT", 1.0)
+        client = redis.Redis.from_url(crawler.settings.get("GLOBAL_RATE_LIMIT_REDIS_URL"),
+                                      socket_timeout=timeout, socket_connect_timeout=timeout)
+        return cls(crawler, client)
+
+    async def process_request(self, request, spider):
+        rate = self.rates.get(spider.name)
+        if not rate:
+            return None
+        if time.monotonic() < self.disabled_until:
+            self.stats.inc_value("ratelimit/skipped")
+            return None
+        try:
+            wait = float(await threads.deferToThread(
+                self.reserve, keys=[f"ratelimit:{spider.name}"], args=[1.0 / float(rate), self.burst]
+            ))
+        except redis.RedisError as e:
+            self.stats.inc_value("ratelimit/errors")
+            # Chỉ ghi log một lần cho mỗi lần Redis mất kết nối, không theo từng request
+            if not self.unavailable:
+                spider.logger.warning(f"Global rate limit unavailable, retrying every {self.retry_after:g}s: {e}")
+                self.unavailable = True
+            self.disabled_until = time.monotonic() + self.retry_after
+            return None
+        if self.unavailable:
+            spider.logger.info("Global rate limit available again")
+            self.unavailable = False
+        if wait > 0:
+            self.stats.inc_value("ratelimit/delayed")
+            self.stats.inc_value("ratelimit/wait_ms", int(wait * 1000))
+            await deferLater(reactor, wait, lambda: None)
+        return None
+
+
+class SeenFilterMiddleware:
+    """
+    Spider middleware bỏ request trang chi tiết của job (meta["item"]) có cùng
+    job_id và stamp với một job đã ghi vào database trong khoảng SEEN_FILTER_TTL,
+    dùng SeenFilter lưu giữa các lần chạy (file hoặc Redis dùng chung giữa các worker).
+
+    Filter được gắn vào spider (`spider.seen_jobs`) và JobsScrapingPipeline đánh dấu
+    job cùng lúc với watermark, sau khi batch chứa job đã ghi thành công; job tải
+    được nhưng không ghi được sẽ được crawl lại lần sau. Tắt với `-a seen_filter=0`
+    (mặc định theo `-a incremental` và INCREMENTAL_CRAWL).
+
+    Job của mỗi response được tra một lượt trong thread pool (một round-trip với
+    Redis), không tra từng request trên reactor.
+    """
+
+    def __init__(self, crawler, default_enabled):
+        self.crawler = crawler
+        self.stats = crawler.stats
+        self.default_enabled = default_enabled
+        self.filter = None
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        if not crawler.settings.getbool("SEEN_FILTER_ENABLED"):
+            raise NotConfigured
+        middleware = cls(crawler, crawler.settings.getbool("INCREMENTAL_CRAWL", True))
+        crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(middleware.spider_closed, signal=signals.spider_closed)
+        return middleware
+
+    def spider_opened(self, spider):
+        incremental = arg_enabled(getattr(spider, "incremental", None), self.default_enabled)
+        if not arg_enabled(getattr(spider, "seen_filter", None), incremental):
+            spider.logger.info("Seen filter disabled for this crawl.")
+            return
+        self.filter = spider.seen_jobs = SeenFilter.from_settings(self.crawler.settings, spider.name)
+
+    def spider_closed(self, spider):
+        if self.filter is not None:
+            # Pipeline đã ghi (và đánh dấu) batch cuối trước signal spider_closed
+            self.filter.close()
+            self.filter = None
+            spider.seen_jobs = None
+
+    async def process_spider_output(self, response, result, spider):
+        if self.filter is None:
+            async for output in result:
+                yield output
+            return
+
+        # Gom output của cả response để tra mọi job một lượt, trong thread: backend Redis là I/O mạng
+        outputs = [output async for output in result]
+        jobs = [(output.meta["item"].job_id, output.meta["item"].stamp) for output in outputs
+                if isinstance(output, Request) and isinstance(output.meta.get("item"), JobItem)]
+        known = await threads.deferToThread(self.filter.known_jobs, jobs) if jobs else set()
+
+        for output in outputs:
+            item = output.meta.get("item") if isinstance(output, Request) else None
+            if isinstance(item, JobItem) and (item.job_id, item.stamp) in known:
+                self.stats.inc_value("seen_filter/filtered")
+                continue
+            yield output
@@ -1,3 +1,287 @@
+import json
+import logging
+import time
+
+from twisted.internet import defer, task, threads
+
+from .dedup import NearDuplicateIndex
+from .features import JobFeatureExtractor
+from .items import JobItem
+from .matchdelta import MatchDeltaNotifier
+from .text import JobTextNormalizer
+
+logger = logging.getLogger(__name__)
+
+
+def jobsdes_column_lengths():
+    """Độ dài tối đa của các cột chuỗi trong JobsDes"""
+    from database.models import JobsDes
+
+    return {
+        column.name: column.type.length
+        for column in JobsDes.__table__.columns
+        if getattr(column.type, "length", None)
+    }
+
+
+def job_row(item, column_lengths):
+    """JobItem -> dict cột JobsDes, None nếu thiếu Url/Title"""
+    if not isinstance(item, JobItem) or not item.url or not item.title:
+        return None
+    row = item.to_row()
+    row["Company"] = row["Company"] or "Company Not Found"
+    row["RawContent"] = json.dumps(item.to_dict(), ensure_ascii=False, default=str)
+
+    # Cắt chuỗi theo độ dài cột để SQL Server không từ chối cả batch
+    for column, length in column_lengths.items():
+        value = row.get(column)
+        if isinstance(value, str) and len(value) > length:
+            row[column] = value[:length]
+    return row
+
+
+def run_ingest_steps(db, rows, job_ids, text_normalizer=None, feature_extractor=None, dedup_index=None,
+                     match_notifier=None):
+    """
+    Các bước sau upsert cho job mới hoặc đổi nội dung (rows, job_ids từ bulk_upsert_jobs),
+    dùng chung cho pipeline và FeedLoader. Dòng đã được ghi nên bước lỗi chỉ được log và
+    đếm; trả về {stat: số cộng thêm}.
+    """
+    extra = {}
+    if not rows:
+        return extra
+
+    if text_normalizer is not None:
+        try:
+            extra["ingest/texts"] = text_normalizer.apply(db, rows)
+        except Exception as e:
+            # Job thiếu JobTexts được `scrapy jobtexts` bổ sung
+            logger.error(f"Error normalizing texts for {len(rows)} jobs: {e}")
+            extra["ingest/text_errors"] = 1
+
+    if feature_extractor is not None:
+        try:
+            extra["ingest/features"] = feature_extractor.apply(db, rows)
+        except Exception as e:
+            # Job thiếu feature được `scrapy jobfeatures` bổ sung
+            logger.error(f"Error extracting features for {len(rows)} jobs: {e}")
+            extra["ingest/feature_errors"] = 1
+
+    if dedup_index is not None:
+        try:
+            dedup_counts = dedup_index.assign(db, rows)
+        except Exception as e:
+            # Job thiếu fingerprint sẽ được `scrapy dedupjobs` bổ sung
+            logger.error(f"Error assigning duplicate clusters for {len(rows)} jobs: {e}")
+            extra["ingest/dedup_errors"] = 1
+        else:
+            extra["ingest/fingerprinted"] = dedup_counts["fingerprinted"]
+            extra["ingest/near_duplicates"] = dedup_counts["duplicates"]
+
+    if match_notifier is not None:
+        try:
+            extra["ingest/match_queued"] = match_notifier.apply(list(job_ids))
+        except Exception as e:
+            # Job mới vẫn được chấm ở lần process_batch_matches kế tiếp
+            logger.error(f"Error queueing {len(rows)} jobs for matching: {e}")
+            extra["ingest/match_errors"] = 1
+
+    return extra
+
+
 class JobsScrapingPipeline:
+    """
+    Ghi item vào bảng JobsDes theo batch.
+
+    Spider đã chuẩn hóa JobItem theo cột JobsDes; item giữ trong buffer và flush khi đủ
+    INGEST_BATCH_SIZE dòng hoặc sau INGEST_FLUSH_INTERVAL giây.
+    Mỗi lần flush là một executemany + một commit; sau đó các job được chuẩn hóa
+    mô tả (JobTextNormalizer), tính feature (JobFeatureExtractor), gán ClusterId
+    tin trùng (NearDuplicateIndex) và gửi Id cho worker chấm điểm với các CV
+    (MatchDeltaNotifier) nếu bật.
+
+    Flush chạy trong thread pool của reactor, lần lượt từng batch (Session không
+    thread-safe), và process_item chờ batch đầy được ghi xong nên download không chạy
+    vượt quá tốc độ ghi. Batch lỗi được đưa lại buffer để ghi lần sau; lỗi liên tiếp
+    INGEST_MAX_FLUSH_FAILURES lần thì dừng crawl (reason "ingest_failed").
+
+    Job chỉ được đánh dấu trong watermark và seen filter của spider (incremental
+    crawl) sau khi batch chứa nó đã ghi thành công, nên job không ghi được sẽ được
+    crawl lại lần sau.
+    """
+
+    def __init__(self, stats, batch_size=500, flush_interval=5.0, dedup_index=None, feature_extractor=None,
+                 text_normalizer=None, match_notifier=None, crawler=None, max_flush_failures=3):
+        self.stats = stats
+        self.crawler = crawler
+        self.match_notifier = match_notifier
+        self.text_normalizer = text_normalizer
+        self.dedup_index = dedup_index
+        self.feature_extractor = feature_extractor
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_flush_failures = max_flush_failures
+        self._buffer = []
+        # (job_id, stamp) của từng dòng trong buffer, cùng thứ tự
+        self._marks = []
+        self._last_flush = time.monotonic()
+        self._flush_seconds = 0.0
+        self._flushed_rows = 0
+        self._flush_failures = 0
+        self._flush_lock = defer.DeferredLock()
+        self._loop = None
+        self.spider = None
+        self.db = None
+        self._column_lengths = {}
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(
+            stats=crawler.stats,
+            batch_size=crawler.settings.getint("INGEST_BATCH_SIZE", 500),
+            flush_interval=crawler.settings.getfloat("INGEST_FLUSH_INTERVAL", 5.0),
+            dedup_index=NearDuplicateIndex.from_settings(crawler.settings),
+            feature_extractor=JobFeatureExtractor.from_settings(crawler.settings),
+            text_normalizer=JobTextNormalizer.from_settings(crawler.settings),
+            match_notifier=MatchDeltaNotifier.from_settings(crawler.settings),
+            crawler=crawler,
+            max_flush_failures=crawler.settings.getint("INGEST_MAX_FLUSH_FAILURES", 3),
+        )
+
+    def open_spider(self, spider):
+        # Import here to avoid loading the DB driver when the module is imported
+        from database.db import SessionLocal
+
+        self.spider = spider
+        self.db = SessionLocal()
+        self._column_lengths = jobsdes_column_lengths()
+        self._last_flush = time.monotonic()
+        if self.flush_interval > 0:
+            self._loop = task.LoopingCall(self._flush_if_stale)
+            self._loop.start(self.flush_interval, now=False)
+
+    def close_spider(self, spider):
+        if self._loop is not None and self._loop.running:
+            self._loop.stop()
+        d = self.flush()
+        d.addBoth(self._closed)
+        return d
+
+    def _closed(self, _):
+        if self._buffer:
+            # Lần flush cuối cũng lỗi: không còn lần sau để ghi
+            logger.error(f"Dropping {len(self._buffer)} jobs that could not be written to database")
+            self.stats.inc_value("ingest/rows_failed", len(self._buffer))
+            self._buffer, self._marks = [], []
+        if self.db is not None:
+            self.db.close()
+        if self._flush_seconds > 0:
+            self.stats.set_value("ingest/rows_per_sec", round(self._flushed_rows / self._flush_seconds, 1))
+        if self.match_notifier is not None:
+            # Gửi task qua broker là I/O chặn (broker chết thì chờ retry): chạy ngoài reactor
+            d = threads.deferToThread(self.match_notifier.flush)
+            d.addBoth(self._notified)
+            return d
+
+    def _notified(self, _):
+        self.stats.set_value("ingest/match_tasks", self.match_notifier.tasks_sent)
+
     def process_item(self, item, spider):
-        return item
\ No newline at end of file
+        row = self.map_item(item)
+        if row is None:
+            self.stats.inc_value("ingest/rows_skipped")
+            return item
+
+        self._buffer.append(row)
+        self._marks.append((item.job_id, item.stamp))
+        if len(self._buffer) >= self.batch_size:
+            d = self.flush()
+            d.addCallback(lambda _: item)
+            return d
+        return item
+
+    def map_item(self, item):
+        return job_row(item, self._column_lengths)
+
+    def _flush_if_stale(self):
+        if self._buffer and time.monotonic() - self._last_flush >= self.flush_interval:
+            return self.flush()
+
+    def flush(self):
+        """Deferred ghi buffer hiện tại, xong sau các lần flush trước"""
+        self._last_flush = time.monotonic()
+        return self._flush_lock.run(self._flush)
+
+    def _flush(self):
+        if not self._buffer:
+            return defer.succeed(None)
+        rows, marks = self._buffer, self._marks
+        self._buffer, self._marks = [], []
+        d = threads.deferToThread(self.write_rows, rows)
+        d.addCallbacks(self._flushed, self._flush_failed, callbackArgs=(rows, marks), errbackArgs=(rows, marks))
+        return d
+
+    def write_rows(self, rows):
+        """
+        Chạy trong thread pool: upsert rồi các bước sau ingest, chỉ với job mới hoặc đổi nội
+        dung. Trả về (số giây upsert, số dòng insert/update, {stat: số cộng thêm} của các bước sau)
+        """
+        from database.crud import JobCRUD
+
+        started = time.perf_counter()
+        counts = JobCRUD.bulk_upsert_jobs(self.db, rows)
+        elapsed = time.perf_counter() - started
+        rows = [row for row in rows if row.get("Url") in counts["job_ids"]]
+        extra = run_ingest_steps(self.db, rows, counts["job_ids"].values(), self.text_normalizer,
+                                 self.feature_extractor, self.dedup_index, self.match_notifier)
+        return elapsed, counts, extra
+
+    def _flushed(self, result, rows, marks):
+        elapsed, counts, extra = result
+        self._flush_failures = 0
+        self._flush_seconds += elapsed
+        self._flushed_rows += len(rows)
+        latency_ms = round(elapsed * 1000, 1)
+        self.stats.inc_value("ingest/batches")
+        self.stats.inc_value("ingest/rows_inserted", counts["inserted"])
+        self.stats.inc_value("ingest/rows_updated", counts["updated"])
+        self.stats.inc_value("ingest/rows_unchanged", counts["unchanged"])
+        self.stats.set_value("ingest/flush_latency_ms_last", latency_ms)
+        self.stats.max_value("ingest/flush_latency_ms_max", latency_ms)
+        self.stats.inc_value("ingest/flush_latency_ms_total", latency_ms)
+        for key, value in extra.items():
+            self.stats.inc_value(key, value)
+
+        watermark = getattr(self.spider, "watermark", None)
+        if watermark is not None:
+            for job_id, stamp in marks:
+                watermark.observe(job_id, stamp)
+
+        seen = getattr(self.spider, "seen_jobs", None)
+        if seen is not None:
+            # Backend Redis là I/O mạng: đánh dấu trong thread, vẫn trong flush lock
+            d = threads.deferToThread(self.mark_seen, seen, marks)
+            d.addCallback(lambda marked: self.stats.inc_value("seen_filter/marked", marked))
+            return d
+
+    def mark_seen(self, seen, marks):
+        """Chạy trong thread pool: đánh dấu job đã ghi trong seen filter, trả về số job được đánh dấu"""
+        try:
+            for job_id, stamp in marks:
+                seen.observe(job_id, stamp)
+        except Exception as e:
+            # Job đã ghi; chỉ là lần sau sẽ tải lại trang chi tiết
+            logger.error(f"Error marking {len(marks)} jobs in seen filter: {e}")
+            return 0
+        return sum(1 for job_id, _ in marks if job_id is not None)
+
+    def _flush_failed(self, failure, rows, marks):
+        logger.error(f"Error flushing {len(rows)} jobs to database: {failure.value}")
+        self.stats.inc_value("ingest/flush_errors")
+        # Giữ lại để ghi ở lần flush sau, trước các dòng mới
+        self._buffer[:0] = rows
+        self._marks[:0] = marks
+        self._flush_failures += 1
+        if self._flush_failures == self.max_flush_failures and self.crawler is not None:
+            logger.error(f"Database writes failed {self._flush_failures} times in a row, closing spider")
+            self.crawler.engine.close_spider(self.spider, "ingest_failed")
@@ -0,0 +1,227 @@
+import contextlib
+import glob
+import hashlib
+import logging
+import math
+import os
+import time
+
+from .utils import atomic_write, file_lock
+
+try:
+    import redis
+except ImportError:  # redis chỉ cần khi dùng backend "redis"
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+def job_key(job_id, stamp):
+    """Khóa một phiên bản job, cùng (job_id, stamp) mà WatermarkStore dùng; None nếu job không có id"""
+    if job_id is None:
+        return None
+    return f"{job_id}:{stamp}"
+
+
+def bloom_parameters(capacity, error_rate):
+    """Số bit và số hàm hash tối ưu cho `capacity` phần tử với tỉ lệ false positive `error_rate`"""
+    num_bits = int(math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+    num_hashes = max(1, int(round(num_bits / capacity * math.log(2))))
+    return num_bits, num_hashes
+
+
+def bit_positions(key, num_bits, num_hashes):
+    """Double hashing (Kirsch-Mitzenmacher) từ một digest blake2b 128 bit"""
+    digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+    h1 = int.from_bytes(digest[:8], "little")
+    h2 = int.from_bytes(digest[8:], "little") | 1
+    return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+
+class FileBloomBackend:
+    """
+    Mỗi generation là một file bitmap; lúc lưu OR với bản trên đĩa (trong file lock) để gộp
+    dữ liệu của worker khác
+    """
+
+    def __init__(self, directory, name, num_bits):
+        self.directory = directory
+        self.name = name
+        self.num_bytes = (num_bits + 7) // 8
+        self.bitmaps = {}
+        self.dirty = set()
+
+    def _path(self, generation):
+        return os.path.join(self.directory, f"{self.name}.{generation}.bloom")
+
+    def _read(self, generation):
+        try:
+            with open(self._path(generation), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return bytearray(self.num_bytes)
+        if len(data) != self.num_bytes:
+            # Đổi capacity/error rate thì bitmap cũ không dùng được nữa
+            logger.warning(f"Ignoring seen filter {self._path(generation)} with a different size")
+            return bytearray(self.num_bytes)
+        return bytearray(data)
+
+    def _bitmap(self, generation):
+        bitmap = self.bitmaps.get(generation)
+        if bitmap is None:
+            bitmap = self.bitmaps[generation] = self._read(generation)
+        return bitmap
+
+    def contains(self, generations, positions):
+        for generation in generations:
+            bitmap = self._bitmap(generation)
+            if all(bitmap[p >> 3] & (1 << (p & 7)) for p in positions):
+                return True
+        return False
+
+    def contains_many(self, generations, keys_positions):
+        return [self.contains(generations, positions) for positions in keys_positions]
+
+    def add(self, generation, positions):
+        bitmap = self._bitmap(generation)
+        for p in positions:
+            bitmap[p >> 3] |= 1 << (p & 7)
+        self.dirty.add(generation)
+
+    def save(self):
+        for generation in self.dirty:
+            path = self._path(generation)
+            with file_lock(path):
+                on_disk = self._read(generation)
+                merged = int.from_bytes(on_disk, "little") | int.from_bytes(self.bitmaps[generation], "little")
+                merged = bytearray(merged.to_bytes(self.num_bytes, "little"))
+                atomic_write(path, bytes(merged))
+            self.bitmaps[generation] = merged
+        self.dirty.clear()
+
+    def expire(self, oldest_generation):
+        for path in glob.glob(os.path.join(self.directory, f"{self.name}.*.bloom")):
+            generation = path[:-len(".bloom")].rsplit(".", 1)[1]
+            if generation.isdigit() and int(generation) < oldest_generation:
+                # Generation hết hạn không còn được ghi; worker khác có thể đã xóa trước
+                with contextlib.suppress(FileNotFoundError):
+                    os.remove(path)
+                    os.remove(f"{path}.lock")
+        for generation in [g for g in self.bitmaps if g < oldest_generation]:
+            del self.bitmaps[generation]
+            self.dirty.discard(generation)
+
+
+class RedisBloomBackend:
+    """Bitmap trong Redis (SETBIT/GETBIT), dùng chung giữa các worker; key tự hết hạn theo TTL"""
+
+    def __init__(self, url, name, key_ttl):
+        if redis is None:
+            raise RuntimeError("SEEN_FILTER_BACKEND = 'redis' requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = f"seen:{name}"
+        self.key_ttl = key_ttl
+
+    def contains(self, generations, positions):
+        return self.contains_many(generations, [positions])[0]
+
+    def contains_many(self, generations, keys_positions):
+        """Một round-trip (pipeline GETBIT) cho mọi key"""
+        generations = list(generations)
+        pipe = self.client.pipeline(transaction=False)
+        for positions in keys_positions:
+            for generation in generations:
+                for p in positions:
+                    pipe.getbit(f"{self.prefix}:{generation}", p)
+        bits = pipe.execute()
+        result, start = [], 0
+        for positions in keys_positions:
+            step = len(positions)
+            end = start + step * len(generations)
+            result.append(any(all(bits[i:i + step]) for i in range(start, end, step)))
+            start = end
+        return result
+
+    def add(self, generation, positions):
+        key = f"{self.prefix}:{generation}"
+        pipe = self.client.pipeline(transaction=False)
+        for p in positions:
+            pipe.setbit(key, p, 1)
+        pipe.expire(key, self.key_ttl)
+        pipe.execute()
+
+    def save(self):
+        pass
+
+    def expire(self, oldest_generation):
+        pass
+
+
+class SeenFilter:
+    """
+    Bloom filter chia theo generation thời gian để có TTL.
+
+    Thời gian chia thành các khoảng ttl / generations; key được ghi vào
+    generation hiện tại và được xem là đã thấy khi có trong một trong
+    `generations` generation gần nhất. Vì vậy key được crawl lại sau khoảng
+    (1 - 1/generations) * ttl đến ttl. Bộ nhớ cố định theo capacity và error
+    rate, không tăng theo số job đã crawl.
+    """
+
+    def __init__(self, backend, num_bits, num_hashes, ttl, generations=4):
+        self.backend = backend
+        self.num_bits = num_bits
+        self.num_hashes = num_hashes
+        self.period = max(1, ttl // generations)
+        self.generations = generations
+
+    @classmethod
+    def from_settings(cls, settings, name):
+        ttl = settings.getint("SEEN_FILTER_TTL", 7 * 24 * 3600)
+        generations = settings.getint("SEEN_FILTER_GENERATIONS", 4)
+        num_bits, num_hashes = bloom_parameters(
+            settings.getint("SEEN_FILTER_CAPACITY", 1000000),
+            settings.getfloat("SEEN_FILTER_ERROR_RATE", 0.001),
+        )
+        backend_name = settings.get("SEEN_FILTER_BACKEND", "file")
+        if backend_name == "redis":
+            backend = RedisBloomBackend(settings.get("SEEN_FILTER_REDIS_URL"), name, ttl + ttl // generations)
+        elif backend_name == "file":
+            backend = FileBloomBackend(settings.get("SEEN_FILTER_DIR"), name, num_bits)
+        else:
+            raise ValueError(f"Unknown SEEN_FILTER_BACKEND: {backend_name}")
+        return cls(backend, num_bits, num_hashes, ttl, generations)
+
+    def _current_generation(self):
+        return int(time.time() // self.period)
+
+    def __contains__(self, key):
+        current = self._current_generation()
+        generations = range(current, current - self.generations, -1)
+        return self.backend.contains(generations, bit_positions(key, self.num_bits, self.num_hashes))
+
+    def add(self, key):
+        self.backend.add(self._current_generation(), bit_positions(key, self.num_bits, self.num_hashes))
+
+    def is_known(self, job_id, stamp):
+        """Job có cùng id và stamp đã được ghi vào database gần đây (ở run/worker bất kỳ)"""
+        key = job_key(job_id, stamp)
+        return key is not None and key in self
+
+    def known_jobs(self, jobs):
+        """Tập (job_id, stamp) đã ghi gần đây trong `jobs`, tra một lượt (một round-trip với Redis)"""
+        jobs = [job for job in set(jobs) if job_key(*job) is not None]
+        current = self._current_generation()
+        generations = range(current, current - self.generations, -1)
+        found = self.backend.contains_many(
+            generations, [bit_positions(job_key(*job), self.num_bits, self.num_hashes) for job in jobs])
+        return {job for job, known in zip(jobs, found) if known}
+
+    def observe(self, job_id, stamp):
+        key = job_key(job_id, stamp)
+        if key is not None:
+            self.add(key)
+
+    def close(self):
+        self.backend.save()
+        self.backend.expire(self._current_generation() - self.generations + 1)
@@ -1,5 +1,10 @@
 # Scrapy settings for jobsscraping project
 
+import os
+
+# Redis dùng chung với Celery (xem worker/celery_app.py) cho rate limit và seen filter
+REDIS_URL = os.getenv("CELERY_BROKER_URL", "redis://localhost:6379/0")
+
 BOT_NAME = 'jobsscraping'
 
 SPIDER_MODULES = ['jobsscraping.spiders']
@@ -13,12 +18,40 @@ ITEM_PIPELINES = {
    'jobsscraping.pipelines.JobsScrapingPipeline': 300,
 }
 
+# Database ingest: flush khi đủ số dòng hoặc sau số giây
+INGEST_BATCH_SIZE = 500
+INGEST_FLUSH_INTERVAL = 5
+# Số lần flush lỗi liên tiếp (batch lỗi được ghi lại lần sau) trước khi dừng crawl
+INGEST_MAX_FLUSH_FAILURES = 3
+
+# Gộp tin trùng giữa các nguồn khi ingest: MinHash + LSH, ngưỡng Jaccard ước lượng
+DEDUP_ENABLED = True
+DEDUP_THRESHOLD = 0.7
+
+# Feature đã chuẩn hóa (skill Id, mã thành phố, lương, số năm kinh nghiệm) tính lúc ingest
+JOB_FEATURES_ENABLED = True
+# Mô tả đã bỏ HTML + token đã chuẩn hóa (JobTexts) tính lúc ingest
+JOB_TEXTS_ENABLED = True
+# Gửi Id job vừa ingest cho worker chấm điểm với các CV đã match (worker.tasks.match_new_jobs)
+MATCH_DELTA_ENABLED = True
+MATCH_DELTA_BATCH_SIZE = 2000
+
 # Enable and configure HTTP caching
 HTTPCACHE_ENABLED = True
 HTTPCACHE_EXPIRATION_SECS = 0
 HTTPCACHE_DIR = 'httpcache'
 HTTPCACHE_IGNORE_HTTP_CODES = []
-HTTPCACHE_STORAGE = 'scrapy.extensions.httpcache.FilesystemCacheStorage'
+HTTPCACHE_STORAGE = 'jobsscraping.httpcache.SqliteCacheStorage'
+# TTL (giây) theo spider, ghi đè HTTPCACHE_EXPIRATION_SECS
+HTTPCACHE_SOURCE_TTLS = {
+   'topdev': 6 * 3600,
+   'vietnamwork': 6 * 3600,
+}
+# Giới hạn dung lượng mỗi file cache (một file cho mỗi source), entry cũ nhất bị xóa trước
+HTTPCACHE_MAX_BYTES = 2 * 1024 ** 3
+
+# Custom commands (scrapy compactcache)
+COMMANDS_MODULE = 'jobsscraping.commands'
 
 # User agent
 USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
@@ -29,4 +62,89 @@ RANDOMIZE_DOWNLOAD_DELAY = True
 
 # Concurrent requests
 CONCURRENT_REQUESTS = 16
-CONCURRENT_REQUESTS_PER_DOMAIN = 8
\ No newline at end of file
+CONCURRENT_REQUESTS_PER_DOMAIN = 8
+
+# Download handler giữ connection keep-alive theo host và ghi timing connect/TLS/TTFB/transfer
+# vào stats (timing/<host>/...). Host trong HTTP2_HOSTS dùng HTTP/2 nếu có cài package h2.
+DOWNLOAD_HANDLERS = {
+   'http': 'jobsscraping.transport.TimedDownloadHandler',
+   'https': 'jobsscraping.transport.TimedDownloadHandler',
+}
+HTTP2_HOSTS = ['api.topdev.vn', 'ms.vietnamworks.com', 'api.topcv.vn']
+# Giây giữ connection rảnh trong pool trước khi đóng
+HTTP_KEEPALIVE_TIMEOUT = 240
+# DNS cache có TTL (giây) thay cho cache vĩnh viễn mặc định
+DNS_RESOLVER = 'jobsscraping.transport.TTLCachingResolver'
+DNSCACHE_TTL = 300
+
+# Incremental crawl: high-water mark mỗi source, tắt bằng `-a incremental=0`
+EXTENSIONS = {
+   'jobsscraping.extensions.WatermarkExtension': 500,
+   'jobsscraping.extensions.JsonLinesFeedExtension': 510,
+   'jobsscraping.extensions.LatencyStatsExtension': 520,
+}
+INCREMENTAL_CRAWL = True
+# Backend 'file' (WATERMARK_DIR, chỉ dùng chung trên một máy hoặc volume chung) hoặc
+# 'redis' (dùng chung giữa các worker chia shard trên nhiều máy)
+WATERMARK_BACKEND = 'file'
+WATERMARK_DIR = 'state/watermarks'
+WATERMARK_REDIS_URL = REDIS_URL
+
+# Feed JSON Lines nén gzip, xoay file theo dung lượng chưa nén. Bật bằng
+# -s JSONL_FEED_DIR=outputs/{source} ({source} = tên spider)
+JSONL_FEED_DIR = None
+JSONL_FEED_ROTATE_BYTES = 64 * 1024 ** 2
+JSONL_FEED_FLUSH_ITEMS = 100
+
+# Histogram download latency (ms) trong stats, worker lưu vào ScrapingJobStats
+LATENCY_HISTOGRAM_BUCKETS_MS = [100, 250, 500, 1000, 2500, 5000, 10000]
+
+# Seen filter: Bloom filter theo source lưu giữa các lần crawl, bỏ trang chi tiết của job
+# đã ghi vào database trong SEEN_FILTER_TTL giây (bật theo INCREMENTAL_CRAWL / `-a incremental`). Backend 'file' hoặc 'redis' (dùng chung giữa các worker)
+SPIDER_MIDDLEWARES = {
+   'jobsscraping.middlewares.SeenFilterMiddleware': 600,
+}
+SEEN_FILTER_ENABLED = True
+SEEN_FILTER_BACKEND = 'file'
+SEEN_FILTER_DIR = 'state/seen'
+SEEN_FILTER_REDIS_URL = REDIS_URL
+SEEN_FILTER_CAPACITY = 1000000
+SEEN_FILTER_ERROR_RATE = 0.001
+SEEN_FILTER_TTL = 7 * 24 * 3600
+SEEN_FILTER_GENERATIONS = 4
+
+# VietnamWorks search API: số hit mỗi page và số page chạy song song
+VIETNAMWORK_HITS_PER_PAGE = 50
+VIETNAMWORK_PAGE_CONCURRENCY = 4
+# Các spider ApiJobSpider khác (TopCV, TopDev, LinkedIn): số page danh sách chạy song song
+API_PAGE_CONCURRENCY = 4
+
+# Adaptive concurrency (AIMD) theo host: tăng khi response nhanh, giảm khi 429/5xx.
+# GlobalRateLimitMiddleware đứng sau httpcache (900): response lấy từ cache không tính vào giới hạn
+DOWNLOADER_MIDDLEWARES = {
+   'jobsscraping.middlewares.GlobalRateLimitMiddleware': 910,
+   'jobsscraping.middlewares.AdaptiveConcurrencyMiddleware': 950,
+}
+AIMD_ENABLED = True
+AIMD_START_CONCURRENCY = 2
+AIMD_MIN_CONCURRENCY = 1
+AIMD_MAX_CONCURRENCY = 16
+AIMD_TARGET_LATENCY = 1.0
+AIMD_BACKOFF_FACTOR = 0.5
+AIMD_MAX_DELAY = 10
+
+# Giới hạn request/giây của mỗi source trên mọi worker (Redis), cả crawl chia shard lẫn không
+GLOBAL_RATE_LIMIT_ENABLED = True
+GLOBAL_RATE_LIMIT_REDIS_URL = REDIS_URL
+GLOBAL_RATE_LIMITS = {
+    'topdev': 8,
+    'vietnamwork': 8,
+    'topcv': 8,
+    'linkedin': 2,
+}
+# Số request được đi ngay khi source đang rảnh, trước khi bị giãn theo giới hạn
+GLOBAL_RATE_LIMIT_BURST = 2
+# Redis không trả lời trong GLOBAL_RATE_LIMIT_TIMEOUT giây thì tắt giới hạn trong
+# GLOBAL_RATE_LIMIT_RETRY_AFTER giây (request vẫn đi, chỉ còn AIMD giới hạn)
+GLOBAL_RATE_LIMIT_TIMEOUT = 1.0
+GLOBAL_RATE_LIMIT_RETRY_AFTER = 30
\ No newline at end of file
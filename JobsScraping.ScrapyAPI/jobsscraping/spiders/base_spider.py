@@ -1,16 +1,23 @@
 import scrapy
 import logging
 from abc import ABC, abstractmethod
+from scrapy.exceptions import CloseSpider
+from datetime import datetime
+from ..items import JobItem
+from ..utils import parse_shard, response_json, to_datetime, to_text
+from ..watermarks import job_stamp
 
 class BaseJobSpider(scrapy.Spider, ABC):
     """
     Base spider class for job scraping
     """
     
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, shard=None, **kwargs):
         super().__init__(*args, **kwargs)
         # Fix: Không sử dụng @property cho logger
         self._logger = logging.getLogger(self.name)
+        # Crawl chia shard (`-a shard=i/n`): spider chỉ lấy các page i, i + n, i + 2n, ...
+        self.shard_index, self.shard_count = parse_shard(shard)
     
     @property
     def logger(self):
@@ -45,4 +52,289 @@ class BaseJobSpider(scrapy.Spider, ABC):
         """
         Main parsing method
         """
-        return self.parse_job_list(response)
\ No newline at end of file
+        return self.parse_job_list(response)
+
+
+class PageStateMixin:
+    """
+    Giữ các page danh sách đã gửi nhưng chưa xử lý xong trong self.state['pending_pages'].
+
+    Chạy với JOBDIR, request đang tải lúc dừng không nằm trong hàng đợi đã lưu nhưng đã
+    vào dupefilter, nên resume sẽ mất các page đó. start_requests gửi lại các page dở
+    dang bằng resume_requests() với dont_filter=True; page về hai lần (vừa còn trong hàng
+    đợi vừa được gửi lại) chỉ được xử lý một lần.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # SpiderState thay dict này bằng bản đã lưu khi spider mở (chạy với JOBDIR)
+        self.state = {}
+        self._claimed_pages = set()
+
+    @property
+    def pending_pages(self):
+        return self.state.setdefault('pending_pages', set())
+
+    def page_sent(self, page):
+        self.pending_pages.add(page)
+
+    def claim_page(self, page):
+        """False nếu page đã hoặc đang được xử lý trong lần chạy này"""
+        if page not in self.pending_pages or page in self._claimed_pages:
+            return False
+        self._claimed_pages.add(page)
+        return True
+
+    def page_done(self, page):
+        self.pending_pages.discard(page)
+
+    def resume_requests(self, build_request):
+        """Request gửi lại các page dở dang của lần chạy trước; rỗng khi không resume"""
+        pages = sorted(self.pending_pages)
+        if pages:
+            self.logger.info(f"Resuming {self.name}: re-sending pages {pages}")
+        for page in pages:
+            yield build_request(page).replace(dont_filter=True)
+
+
+class ApiJobSpider(PageStateMixin, BaseJobSpider):
+    """
+    Spider khai báo cho API danh sách job có phân trang. Subclass chỉ khai báo:
+
+    - api_url: URL một page, format với {page} (first_page, first_page + 1, ...) hoặc
+      {offset} (0, page_size, ...), {page_size} và url_params()
+    - jobs_path / total_path: đường dẫn tới list job và tổng số job trong JSON
+      (total_path = None: crawl tới khi gặp page rỗng)
+    - id_field / stamp_fields: id và mốc thời gian của job cho incremental crawl
+    - field_map: field JobItem -> key, đường dẫn (tuple) hoặc hàm nhận job
+    - detail_url_field: nếu có, item được hoàn thiện ở trang chi tiết (fill_detail)
+
+    Page được fan-out song song: page đầu cho biết tổng số page, sau đó giữ tối đa
+    API_PAGE_CONCURRENCY page đang chạy; mỗi page về thì gửi page kế. Ngừng gửi
+    page mới khi gặp page rỗng, page toàn job đã biết (API trả job mới nhất trước)
+    hoặc đủ `max_pages`. Vị trí phân trang và các page dở dang nằm trong self.state
+    nên chạy với JOBDIR thì resume được (PageStateMixin). Với `-a shard=i/n` spider chỉ crawl page i, i + n, ... nên n
+    worker cùng crawl một source mà không trùng page.
+    """
+
+    api_url = None
+    method = "GET"
+    first_page = 1
+    page_size = 20
+    jobs_path = ("data",)
+    total_path = None
+    id_field = "id"
+    stamp_fields = ()
+    # API sắp xếp job mới nhất trước: page toàn job đã biết thì các page sau cũng vậy
+    newest_first = True
+    field_map = {}
+    detail_url_field = None
+    default_company = "Company Not Found"
+    request_headers = {"Accept": "application/json, text/plain, */*"}
+    # Giới hạn số page mỗi lần crawl (ghi đè bằng `-a max_pages=N`)
+    max_pages = None
+    # Setting giới hạn số page danh sách chạy song song
+    page_concurrency_setting = 'API_PAGE_CONCURRENCY'
+    # Gắn bởi WatermarkExtension khi chạy incremental
+    watermark = None
+
+    def __init__(self, *args, max_pages=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if max_pages:
+            self.max_pages = int(max_pages)
+
+    @property
+    def source(self):
+        return self.name
+
+    def url_params(self):
+        """Tham số thêm để format api_url (từ khóa, địa điểm...)"""
+        return {}
+
+    def page_url(self, index):
+        return self.api_url.format(
+            page=self.first_page + index,
+            offset=index * self.page_size,
+            page_size=self.page_size,
+            **self.url_params()
+        )
+
+    def page_body(self, index):
+        """Body của request page (API search dạng POST); mặc định không có"""
+        return None
+
+    def build_page_request(self, index):
+        """Request cho page thứ `index` (bắt đầu từ 0) của danh sách"""
+        self.page_sent(index)
+        return scrapy.Request(
+            url=self.page_url(index),
+            method=self.method,
+            body=self.page_body(index),
+            headers=self.request_headers,
+            callback=self.parse_job_list,
+            errback=self.page_failed,
+            meta={'page_index': index}
+        )
+
+    def start_requests(self):
+        if self.pending_pages:
+            yield from self.resume_requests(self.build_page_request)
+        else:
+            yield self.build_page_request(self.shard_index)
+
+    def page_failed(self, failure):
+        index = failure.request.meta.get('page_index') or 0
+        self.logger.error(f"Page {index} of {self.name} failed: {failure.value}")
+        yield from self.skip_page(index)
+
+    def skip_page(self, index):
+        """
+        Page tải hoặc đọc lỗi được đếm và bỏ qua, vẫn nhường chỗ trong cửa sổ fan-out cho
+        page kế. Page đầu lỗi thì không biết phân trang, dừng crawl với lý do riêng thay
+        vì "finished" không có item.
+        """
+        self.crawler.stats.inc_value(f'{self.name}/pages_failed')
+        self.page_done(index)
+        if index == self.shard_index:
+            raise CloseSpider("first_page_failed")
+        yield from self.follow_pages(index)
+
+    # --- Phân trang ---
+
+    @property
+    def total_pages(self):
+        return self.state.get('total_pages')
+
+    @property
+    def next_index(self):
+        return self.state.get('next_index', self.shard_index + self.shard_count)
+
+    @property
+    def stopped(self):
+        return self.state.get('stopped', False)
+
+    def read_total_pages(self, total):
+        if not total:
+            return None
+        return -(-int(total) // self.page_size)
+
+    def follow_pages(self, index):
+        if index == self.shard_index:
+            window = self.settings.getint(self.page_concurrency_setting, 4)
+        else:
+            window = 1
+
+        limit = min(filter(None, (self.total_pages, self.max_pages)), default=None)
+        while window > 0 and not self.stopped and (limit is None or self.next_index < limit):
+            yield self.build_page_request(self.next_index)
+            self.state['next_index'] = self.next_index + self.shard_count
+            window -= 1
+
+    def stop_paging(self, reason):
+        if not self.stopped:
+            self.logger.info(f"Stop paging {self.name}: {reason}")
+            self.state['stopped'] = True
+
+    # --- Đọc dữ liệu ---
+
+    @staticmethod
+    def resolve(job, spec):
+        """Giá trị theo spec của field_map: key, đường dẫn (tuple, đi qua list) hoặc hàm"""
+        if spec is None:
+            return None
+        if callable(spec):
+            return spec(job)
+        if isinstance(spec, str):
+            return job.get(spec) if isinstance(job, dict) else None
+        value = job
+        for key in spec:
+            if isinstance(value, list):
+                value = [v.get(key) for v in value if isinstance(v, dict) and v.get(key) is not None]
+            elif isinstance(value, dict):
+                value = value.get(key)
+            else:
+                return None
+        return value
+
+    def extract_jobs(self, response):
+        """(list job, tổng số job hoặc None) từ response một page; lỗi nếu không có list job"""
+        data = response_json(response)
+        jobs = self.resolve(data, self.jobs_path)
+        if not isinstance(jobs, list):
+            raise ValueError(f"no job list at {self.jobs_path}")
+        total = self.resolve(data, self.total_path) if self.total_path else None
+        return jobs, total
+
+    def build_item(self, job, scraped_at, stamp=None):
+        values = {}
+        for field, spec in self.field_map.items():
+            value = self.resolve(job, spec)
+            values[field] = to_datetime(value) if field == "posted_date" else to_text(value)
+        values["company"] = values.get("company") or self.default_company
+        return JobItem(
+            **values,
+            source=self.source,
+            job_id=to_text(self.resolve(job, self.id_field)),
+            stamp=stamp,
+            scraped_at=scraped_at,
+        )
+
+    def detail_url(self, job):
+        return self.resolve(job, self.detail_url_field) if self.detail_url_field else None
+
+    def build_detail_request(self, url, item):
+        return scrapy.Request(
+            url=url,
+            callback=self.parse_job_detail,
+            # SeenFilterMiddleware bỏ trang chi tiết của job (job_id, stamp) đã ghi gần đây ở run/worker khác
+            meta={"item": item}
+        )
+
+    def parse_job_list(self, response):
+        index = response.meta.get('page_index') or 0
+        if not self.claim_page(index):
+            return
+        try:
+            jobs, total = self.extract_jobs(response)
+        except Exception as e:
+            # Body không đọc được không có nghĩa là hết job: không dừng phân trang như page rỗng
+            self.logger.error(f"Cannot read page {index} of {self.name}: {e}")
+            yield from self.skip_page(index)
+            return
+
+        if index == self.shard_index:
+            self.state['total_pages'] = self.read_total_pages(total)
+            if self.total_pages:
+                self.crawler.stats.set_value(f'{self.name}/total_pages', self.total_pages)
+
+        # Một timestamp cho mọi item của page
+        scraped_at = datetime.utcnow()
+        known_jobs = 0
+        for job in jobs:
+            job_id = self.resolve(job, self.id_field)
+            stamp = job_stamp(*(self.resolve(job, field) for field in self.stamp_fields))
+            if self.watermark is not None and self.watermark.is_known(job_id, stamp):
+                known_jobs += 1
+                continue
+
+            item = self.build_item(job, scraped_at, stamp)
+            url = self.detail_url(job)
+            if url:
+                yield self.build_detail_request(url, item)
+            else:
+                yield item
+
+        if not jobs:
+            self.stop_paging(f"page {index} is empty")
+        elif self.newest_first and known_jobs == len(jobs):
+            self.stop_paging(f"page {index} already crawled")
+        yield from self.follow_pages(index)
+        self.page_done(index)
+
+    def fill_detail(self, response, item):
+        """Bổ sung field cho item từ trang chi tiết; subclass override"""
+
+    def parse_job_detail(self, response):
+        item = response.meta["item"]
+        self.fill_detail(response, item)
+        yield item
@@ -0,0 +1,93 @@
+from urllib.parse import quote_plus
+
+from ..items import intern_text
+from .base_spider import ApiJobSpider
+
+# Tiêu đề mục "job criteria" ở trang chi tiết -> field JobItem
+CRITERIA_FIELDS = {
+    "seniority level": "experience_level",
+    "employment type": "employment_type",
+    "job function": "job_type",
+    "industries": "industry",
+}
+
+
+class LinkedInSpider(ApiJobSpider):
+    """
+    Job trên LinkedIn qua guest API (không cần đăng nhập): danh sách là fragment
+    HTML các job card, mô tả đầy đủ nằm ở trang jobPosting của từng job.
+    """
+    name = 'linkedin'
+    allowed_domains = ['www.linkedin.com']
+
+    api_url = (
+        "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search?"
+        "keywords={keywords}&location={location}&sortBy=DD&start={offset}"
+    )
+    detail_api_url = "https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{job_id}"
+    page_size = 10
+    # Guest API không trả tổng số job và ngừng trả kết quả sau khoảng 1000 job
+    max_pages = 100
+    stamp_fields = ("posted_date",)
+    request_headers = {"Accept": "text/html,*/*"}
+    field_map = {
+        "title": "title",
+        "company": "company",
+        "location": "location",
+        "url": "url",
+        "posted_date": "posted_date",
+        "salary": "salary",
+    }
+
+    custom_settings = {
+        'ROBOTSTXT_OBEY': False,
+        # Concurrency/delay theo host do AdaptiveConcurrencyMiddleware điều chỉnh
+        'DOWNLOAD_DELAY': 0,
+        'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'FEED_EXPORT_ENCODING': 'utf-8',
+    }
+
+    def __init__(self, *args, keywords="", location="Vietnam", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.keywords = keywords
+        self.location = location
+
+    def url_params(self):
+        return {"keywords": quote_plus(self.keywords), "location": quote_plus(self.location)}
+
+    def extract_jobs(self, response):
+        """Job card của fragment HTML; guest API không có tổng số job"""
+        jobs = []
+        for card in response.css("div.base-card, div.base-search-card"):
+            urn = card.attrib.get("data-entity-urn") or ""
+            job_id = urn.rsplit(":", 1)[-1] or None
+            if job_id is None:
+                continue
+            url = card.css("a.base-card__full-link::attr(href)").get()
+            jobs.append({
+                "id": job_id,
+                "title": card.css("h3.base-search-card__title::text").get(default="").strip(),
+                # Công ty không có trang LinkedIn thì tên không nằm trong thẻ <a>
+                "company": (card.css("h4.base-search-card__subtitle a::text").get()
+                            or card.css("h4.base-search-card__subtitle::text").get(default="")).strip(),
+                "location": card.css("span.job-search-card__location::text").get(default="").strip(),
+                "posted_date": card.css("time::attr(datetime)").get(),
+                # Bỏ tham số tracking để Url của job ổn định giữa các lần crawl
+                "url": url.split("?", 1)[0] if url else None,
+                "salary": card.css("span.job-search-card__salary-info::text").get(default="").strip() or None,
+            })
+        return jobs, None
+
+    def detail_url(self, job):
+        return self.detail_api_url.format(job_id=job["id"])
+
+    def fill_detail(self, response, item):
+        description = response.css("div.show-more-less-html__markup").get()
+        if description:
+            item.description = description.strip()
+        for criteria in response.css("li.description__job-criteria-item"):
+            header = criteria.css("h3::text").get(default="").strip().lower()
+            field = CRITERIA_FIELDS.get(header)
+            value = criteria.css("span::text").get(default="").strip()
+            if field and value:
+                setattr(item, field, intern_text(value))
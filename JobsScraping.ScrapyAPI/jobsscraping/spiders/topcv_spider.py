@@ -0,0 +1,44 @@
+from .base_spider import ApiJobSpider
+
+
+def topcv_description(job):
+    """Mô tả đầy đủ: mô tả công việc + yêu cầu ứng viên (HTML)"""
+    return "\n".join(part for part in (job.get("description"), job.get("requirement")) if part) or None
+
+
+class TopCVSpider(ApiJobSpider):
+    name = 'topcv'
+    allowed_domains = ['api.topcv.vn']
+
+    # Endpoint và field_map chưa được kiểm tra với response thật: benchmarks/fixtures/topcv là
+    # dữ liệu dựng theo cấu trúc giả định, chỉ dùng để đo tốc độ parse. Vì vậy topcv không nằm
+    # trong worker.tasks.SCHEDULED_SOURCES cho tới khi có response thật để đối chiếu
+    api_url = "https://api.topcv.vn/api/v1/jobs?page={page}&per_page={page_size}&sort=new"
+    page_size = 50
+    jobs_path = ("data",)
+    total_path = ("meta", "total")
+    stamp_fields = ("updated_at", "created_at")
+    field_map = {
+        "title": "title",
+        "company": ("company", "name"),
+        "location": ("locations", "name"),
+        "description": topcv_description,
+        "url": "url",
+        "posted_date": "created_at",
+        "job_type": "job_type",
+        "salary": "salary",
+        "experience_level": "level",
+        "industry": ("industries", "name"),
+        "employment_type": "job_type",
+        "required_skills": ("skills", "name"),
+        "benefits": "benefit",
+        "years_of_experience": "experience",
+    }
+
+    custom_settings = {
+        'ROBOTSTXT_OBEY': False,
+        # Concurrency/delay theo host do AdaptiveConcurrencyMiddleware điều chỉnh
+        'DOWNLOAD_DELAY': 0,
+        'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+        'FEED_EXPORT_ENCODING': 'utf-8',
+    }
@@ -1,11 +1,9 @@
-import scrapy
-from datetime import datetime
+from .base_spider import ApiJobSpider
 
 
-class TopDevSpider(scrapy.Spider):
+class TopDevSpider(ApiJobSpider):
     name = 'topdev'
     allowed_domains = ['api.topdev.vn']
-    start_page = 1
 
     # Endpoint API
     api_url = (
@@ -18,65 +16,33 @@ class TopDevSpider(scrapy.Spider):
         "fields[company]=slug,tagline,addresses,skills_arr,industries_arr,industries_str,"
         "image_cover,image_galleries,benefits&page={page}&locale=en_US&ordering=jobs_new"
     )
+    jobs_path = ("data",)
+    # API trả sẵn số page (meta.last_page) nên không phụ thuộc số job mỗi page
+    total_path = ("meta", "last_page")
+    stamp_fields = ("refreshed", "published")
+    field_map = {
+        "title": "title",
+        "company": ("company", "slug"),
+        "location": "addresses",
+        "description": "content",
+        "url": lambda job: job.get("detail_url") or job.get("job_url"),
+        "posted_date": "published",
+        "job_type": "job_types_str",
+        "salary": "salary",
+        "experience_level": "job_levels_str",
+        "industry": ("company", "industries_str"),
+        "employment_type": "job_types_str",
+        "required_skills": "skills_str",
+        "benefits": "benefits",
+    }
 
     custom_settings = {
         'ROBOTSTXT_OBEY': False,
-        'DOWNLOAD_DELAY': 1,
-        'CONCURRENT_REQUESTS': 1,
+        # Concurrency/delay theo host do AdaptiveConcurrencyMiddleware điều chỉnh
+        'DOWNLOAD_DELAY': 0,
         'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         'FEED_EXPORT_ENCODING': 'utf-8',
     }
 
-    def start_requests(self):
-        """Bắt đầu crawl từ page 1"""
-        yield scrapy.Request(
-            url=self.api_url.format(page=self.start_page),
-            callback=self.parse_api,
-            meta={'page': self.start_page}
-        )
-
-    def parse_api(self, response):
-        """Parse JSON từ API"""
-        try:
-            data = response.json()
-            jobs = data.get("data", [])
-            current_page = response.meta['page']
-
-            if not jobs:
-                self.logger.info(f"Page {current_page} empty, stopping crawl.")
-                return
-
-            for job in jobs:
-                company = job.get("company", {})
-
-                job_data = {
-                    "id": job.get("id"),
-                    "title": job.get("title"),
-                    "company": company.get("slug") or "Company Not Found",
-                    "location": job.get("addresses"),
-                    "description": job.get("content"),
-                    "url": job.get("detail_url") or job.get("job_url"),
-                    "posted_date": job.get("published"),
-                    "job_type": job.get("job_types_str"),
-                    "salary": job.get("salary"),
-                    "experience_level": job.get("job_levels_str"),
-                    "industry": company.get("industries_str"),
-                    "employment_type": job.get("job_types_str"),
-                    "required_skills": job.get("skills_str"),
-                    "benefits": job.get("benefits"),
-                    "source": "topdev",
-                    "scraped_at": datetime.utcnow(),
-                }
-
-                yield job_data
-
-            # Crawl page tiếp theo
-            next_page = current_page + 1
-            yield scrapy.Request(
-                url=self.api_url.format(page=next_page),
-                callback=self.parse_api,
-                meta={'page': next_page}
-            )
-
-        except Exception as e:
-            self.logger.error(f"Error parsing API response: {e}")
+    def read_total_pages(self, total):
+        return int(total) if total else None
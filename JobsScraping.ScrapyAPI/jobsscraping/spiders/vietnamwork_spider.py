@@ -1,24 +1,53 @@
-import scrapy
-from .base_spider import BaseJobSpider
-from datetime import datetime
+from .base_spider import ApiJobSpider
 import json
-import re
 from w3lib.html import remove_tags
+from ..extractors import extract_embedded_json, extract_job_requirement
+from ..items import JobItem, intern_text
+from ..utils import join_names, response_json, to_datetime, to_text
 
-class VietnamWorkSpider(BaseJobSpider):
+class VietnamWorkSpider(ApiJobSpider):
     name = 'vietnamwork'
     allowed_domains = ['vietnamworks.com', 'ms.vietnamworks.com']
     api_url = 'https://ms.vietnamworks.com/job-search/v1.0/search'
     
     custom_settings = {
         'ROBOTSTXT_OBEY': False,
-        'DOWNLOAD_DELAY': 1,
-        'CONCURRENT_REQUESTS': 1,
+        # Số page search chạy song song do VIETNAMWORK_PAGE_CONCURRENCY giới hạn,
+        # concurrency/delay theo host do AdaptiveConcurrencyMiddleware điều chỉnh
+        'DOWNLOAD_DELAY': 0,
         'USER_AGENT': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
         'FEED_EXPORT_ENCODING': 'utf-8'
     }
 
-    def start_requests(self):
+    request_headers = {
+        "Content-Type": "application/json",
+        "Origin": "https://www.vietnamworks.com",
+        "Referer": "https://www.vietnamworks.com/",
+        "Accept": "application/json, text/plain, */*"
+    }
+
+    # Page search gửi bằng POST, fan-out/resume/shard dùng chung với ApiJobSpider
+    method = "POST"
+    first_page = 0  # page = 0 là trang đầu tiên
+    id_field = "jobId"
+    stamp_fields = ("approvedOn", "onlineOn", "createdOn")
+    # Kết quả sắp theo độ liên quan, page toàn job đã biết không có nghĩa các page sau cũng vậy
+    newest_first = False
+    detail_url_field = "jobUrl"
+    page_concurrency_setting = 'VIETNAMWORK_PAGE_CONCURRENCY'
+
+    detail_headers = {
+        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
+        "Origin": "https://www.vietnamworks.com",
+        "Referer": "https://www.vietnamworks.com/"
+    }
+
+    @property
+    def page_size(self):
+        return self.settings.getint('VIETNAMWORK_HITS_PER_PAGE', 50)
+
+    def page_body(self, index):
+        """Payload POST search API cho một page"""
         payload = {
             "userId": 7959290,
             "query": "",
@@ -30,8 +59,8 @@ class VietnamWorkSpider(BaseJobSpider):
             ],
             "ranges": [],
             "order": [{"field": "relevant", "value": "asc"}],
-            "hitsPerPage": 50,
-            "page": 1,  # page = 1 là trang thứ 2
+            "hitsPerPage": self.page_size,
+            "page": self.first_page + index,
             "retrieveFields": [
                 "address","benefits","jobTitle","salaryMax","isSalaryVisible","jobLevelVI",
                 "isShowLogo","salaryMin","companyLogo","userId","jobLevel","jobLevelId",
@@ -46,193 +75,82 @@ class VietnamWorkSpider(BaseJobSpider):
             ],
             "summaryVersion": ""
         }
-        headers = {
-            "Content-Type": "application/json",
-            "Origin": "https://www.vietnamworks.com",
-            "Referer": "https://www.vietnamworks.com/",
-            "Accept": "application/json, text/plain, */*"
-        }
-        yield scrapy.Request(
-            url=self.api_url,
-            method="POST",
-            body=json.dumps(payload),
-            headers=headers,
-            callback=self.parse_job_list,
-            meta={'page': 1}
-        )
+        return json.dumps(payload)
 
-    def parse_job_list(self, response):
-        """Parse JSON từ API job search"""
-        try:
-            data = response.json()
-        except Exception:
-            self.logger.error("Không parse được JSON từ API.")
-            return
-
-        # Tùy cấu trúc API, cố gắng tìm mảng job
+    def extract_jobs(self, response):
+        """Tùy cấu trúc API, cố gắng tìm mảng job; tổng số page đọc từ cả response"""
+        data = response_json(response)
         jobs = None
-        for key in ("data", "jobs", "hits", "results"):
-            if isinstance(data.get(key), list):
-                jobs = data.get(key)
-                break
-            if isinstance(data.get(key), dict) and isinstance(data[key].get("items"), list):
-                jobs = data[key]["items"]
-                break
-        if jobs is None:
+        if isinstance(data, list):
             # Một số API trả về trực tiếp list
-            if isinstance(data, list):
-                jobs = data
-            else:
+            jobs = data
+        elif isinstance(data, dict):
+            for key in ("data", "jobs", "hits", "results"):
+                if isinstance(data.get(key), list):
+                    jobs = data.get(key)
+                    break
+                if isinstance(data.get(key), dict) and isinstance(data[key].get("items"), list):
+                    jobs = data[key]["items"]
+                    break
+            if jobs is None:
                 # fallback tìm list lớn nhất
-                jobs = next((v for v in data.values() if isinstance(v, list)), [])
-
-        if not jobs:
-            self.logger.info("Không có job nào trong response.")
-            return
-
-        for job in jobs:
-            job_id = job.get("jobId")
-            job_title = job.get("jobTitle")
-            job_url = job.get("jobUrl")
-            company_name = job.get("companyName")
-            company_logo = job.get("companyLogo")
-            working_locations = job.get("workingLocations") or []
-            first_loc = working_locations[0] if working_locations else {}
-            address = (first_loc or {}).get("address")
-            city_vi = (first_loc or {}).get("cityNameVI")
-
-            salary_min = job.get("salaryMin")
-            salary_max = job.get("salaryMax")
-            pretty_salary = job.get("prettySalary")
-
-            skills = job.get("skills") or []
-            skill_names = [s.get("skillName") for s in skills if isinstance(s, dict) and s.get("skillName")]
-
-            job_level_vi = job.get("jobLevelVI")
-
-            industries_v3 = job.get("industriesV3") or []
-            industries_names_vi = [i.get("industryV3NameVI") for i in industries_v3 if isinstance(i, dict) and i.get("industryV3NameVI")]
-
-            job_funcs_v3 = job.get("jobFunctionsV3") or []
-            job_funcs_names_vi = [f.get("jobFunctionV3NameVI") for f in job_funcs_v3 if isinstance(f, dict) and f.get("jobFunctionV3NameVI")]
-
-            created_on = job.get("createdOn")
-            expired_on = job.get("expiredOn")
-
-            base_data = {
-                "jobId": job_id,
-                "jobTitle": job_title,
-                "jobUrl": job_url,
-                "companyName": company_name,
-                "companyLogo": company_logo,
-                "workingLocations.address": address,
-                "workingLocations.cityNameVI": city_vi,
-                "salaryMin": salary_min,
-                "salaryMax": salary_max,
-                "prettySalary": pretty_salary,
-                "skills.skillName": skill_names,
-                "jobLevelVI": job_level_vi,
-                "industriesV3.industryV3NameVI": industries_names_vi,
-                "jobFunctionsV3.jobFunctionV3NameVI": job_funcs_names_vi,
-                "createdOn": created_on,
-                "expiredOn": expired_on,
-                "source": "vietnamwork",
-                "scraped_date": datetime.utcnow()
-            }
-
-            if job_url:
-                # Theo yêu cầu: truy cập jobUrl với method POST để lấy JSON embed
-                yield scrapy.Request(
-                    url=job_url,
-                    method="POST",
-                    callback=self.parse_job_detail,
-                    meta={"base_data": base_data, "jobId": job_id},
-                    headers={
-                        "Content-Type": "application/x-www-form-urlencoded; charset=UTF-8",
-                        "Origin": "https://www.vietnamworks.com",
-                        "Referer": "https://www.vietnamworks.com/"
-                    }
-                )
-            else:
-                # Không có jobUrl thì yield dữ liệu cơ bản
-                # TODO: Lưu base_data vào DB tại đây qua lớp CRUD/ORM của bạn.
-                yield base_data
-
-        # Có thể phân trang tiếp nếu cần: tăng page và gọi lại API
-        # next_page = (response.meta.get('page') or 1) + 1
-        # payload['page'] = next_page
-        # yield scrapy.Request(...)
-
-    def parse_job_detail(self, response):
-        """Parse trang chi tiết: tìm JSON nhúng, lấy jobRequirement.jobLevel & yearsOfExperience, loại bỏ tag HTML."""
-        base_data = response.meta.get("base_data") or {}
-        text = response.text or ""
-
-        # Thử nhiều pattern để lấy JSON embed:
-        candidates = []
-
-        # Pattern Next.js __NEXT_DATA__
-        for m in re.finditer(r'<script[^>]*id="__NEXT_DATA__"[^>]*>\s*({.*?})\s*</script>', text, flags=re.DOTALL):
-            candidates.append(m.group(1))
-
-        # Pattern window.__NUXT__ =
-        for m in re.finditer(r'window\.__NUXT__\s*=\s*({.*?});\s*</script>', text, flags=re.DOTALL):
-            candidates.append(m.group(1))
-
-        # Pattern application/json trong script
-        for m in re.finditer(r'<script[^>]*type="application/json"[^>]*>\s*({.*?})\s*</script>', text, flags=re.DOTALL):
-            candidates.append(m.group(1))
-
-        # Fallback: JSON trong biến global nào đó
-        for m in re.finditer(r'=\s*({\".*?\"})\s*[,;]</script>', text, flags=re.DOTALL):
-            candidates.append(m.group(1))
-
-        embed = None
-        for raw in candidates:
-            try:
-                embed = json.loads(raw)
-                break
-            except Exception:
-                continue
-
-        job_level = None
-        years_of_exp = None
-
-        if embed:
-            # Tìm đệ quy theo key trong embed JSON
-            def walk_find(node, keys):
-                found = []
-                if isinstance(node, dict):
-                    for k, v in node.items():
-                        if k in keys:
-                            found.append((k, v))
-                        found.extend(walk_find(v, keys))
-                elif isinstance(node, list):
-                    for it in node:
-                        found.extend(walk_find(it, keys))
-                return found
-
-            # Lấy jobRequirement trước
-            job_req_nodes = [v for k, v in walk_find(embed, {"jobRequirement"})]
-            # Nếu không có, cố gắng tìm trực tiếp keys cần
-            if job_req_nodes:
-                # Lấy node đầu tiên có dict
-                jr = next((n for n in job_req_nodes if isinstance(n, (dict, str))), None)
-                if isinstance(jr, dict):
-                    job_level = jr.get("jobLevel")
-                    years_of_exp = jr.get("yearsOfExperience")
-                elif isinstance(jr, str):
-                    # Nếu jobRequirement là HTML/string -> có thể chứa yearsOfExperience
-                    # Giữ nguyên xử lý tiếp bên dưới
-                    pass
+                jobs = next((v for v in data.values() if isinstance(v, list)), None)
+        if jobs is None:
+            raise ValueError("no job list in search response")
+        return [job for job in jobs if isinstance(job, dict)], data if isinstance(data, dict) else None
+
+    def read_total_pages(self, data):
+        """Số page từ tổng số hit của response đầu tiên"""
+        if not data:
+            return None
+        meta = data.get("meta") if isinstance(data.get("meta"), dict) else {}
+        for source in (meta, data):
+            if source.get("nbPages"):
+                return int(source["nbPages"])
+            for key in ("nbHits", "totalHits", "total"):
+                if source.get(key):
+                    return super().read_total_pages(source[key])
+        return None
+
+    def build_item(self, job, scraped_at, stamp=None):
+        working_locations = job.get("workingLocations")
+        first_loc = (working_locations[0] if working_locations else None) or {}
+
+        # Mô tả + yêu cầu dạng HTML như content của TopDev, JobTextNormalizer làm sạch lúc ingest
+        description = "\n".join(part for part in (job.get("jobDescription"), job.get("jobRequirement"))
+                                 if isinstance(part, str) and part) or None
+
+        return JobItem(
+            title=job.get("jobTitle"),
+            company=job.get("companyName"),
+            location=to_text(first_loc.get("address") or first_loc.get("cityNameVI")),
+            description=description,
+            url=job.get("jobUrl"),
+            posted_date=to_datetime(job.get("createdOn")),
+            job_type=join_names(job.get("jobFunctionsV3"), "jobFunctionV3NameVI"),
+            salary=to_text(job.get("prettySalary")),
+            # 0 nghĩa là không ghi lương (thương lượng)
+            salary_min=job.get("salaryMin") or None,
+            salary_max=job.get("salaryMax") or None,
+            expired_on=to_datetime(job.get("expiredOn")),
+            experience_level=to_text(job.get("jobLevelVI")),
+            industry=join_names(job.get("industriesV3"), "industryV3NameVI"),
+            required_skills=join_names(job.get("skills"), "skillName"),
+            source=self.source,
+            job_id=to_text(job.get("jobId")),
+            stamp=stamp,
+            scraped_at=scraped_at,
+        )
 
-            if job_level is None:
-                jl_nodes = [v for k, v in walk_find(embed, {"jobLevel"})]
-                job_level = jl_nodes[0] if jl_nodes else None
+    def build_detail_request(self, url, item):
+        # Theo yêu cầu: truy cập jobUrl với method POST để lấy JSON embed
+        return super().build_detail_request(url, item).replace(method="POST", headers=self.detail_headers)
 
-            if years_of_exp is None:
-                y_nodes = [v for k, v in walk_find(embed, {"yearsOfExperience"})]
-                years_of_exp = y_nodes[0] if y_nodes else None
+    def fill_detail(self, response, item):
+        """Trang chi tiết: tìm JSON nhúng, lấy jobRequirement.jobLevel & yearsOfExperience, loại bỏ tag HTML."""
+        # Một lượt quét tìm JSON nhúng, lấy field theo đường dẫn đã biết
+        embed = extract_embedded_json(response.text)
+        job_level, years_of_exp = extract_job_requirement(embed)
 
         # Làm sạch nếu là string có tag HTML
         if isinstance(job_level, str):
@@ -240,11 +158,7 @@ class VietnamWorkSpider(BaseJobSpider):
         if isinstance(years_of_exp, str):
             years_of_exp = remove_tags(years_of_exp).strip()
 
-        job_data = dict(base_data)
-        job_data.update({
-            "jobRequirement.jobLevel": job_level,
-            "jobRequirement.yearsOfExperience": years_of_exp
-        })
-
-        # TODO: Lưu job_data vào DB tại đây qua lớp CRUD/ORM của bạn (ví dụ: gọi hàm trong `database/crud.py`).
-        yield job_data
\ No newline at end of file
+        # Cấp bậc trong jobRequirement ưu tiên hơn jobLevelVI của trang search
+        if job_level:
+            item.experience_level = intern_text(to_text(job_level))
+        item.years_of_experience = to_text(years_of_exp)
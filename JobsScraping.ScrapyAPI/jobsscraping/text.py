@@ -0,0 +1,100 @@
+import logging
+import re
+
+from w3lib.html import remove_tags, replace_entities
+
+from .utils import json_loads, normalize_text
+
+logger = logging.getLogger(__name__)
+
+# Từ dừng tiếng Anh và tiếng Việt (đã bỏ dấu như normalize_text)
+STOP_WORDS = frozenset("""
+a an and are as at be been but by can for from has have in is it its of on or our that the their this
+to was we were will with you your who what which when where how all any also more most other such than
+then there these they those into about over under very not no do does
+va cac cua co la cho voi trong duoc nhung mot khong nguoi tai de theo tu nay khi se da dang cung nhu
+ve ra vao len hoac neu thi ma bang tren duoi sau truoc nhieu moi rat hon cung chung toi ban minh
+""".split())
+
+_BLOCK_TAGS = re.compile(r"<\s*(br|/p|/div|/li|/h[1-6]|/tr|/ul|/ol)\b[^>]*>", re.IGNORECASE)
+_LIST_ITEM = re.compile(r"<\s*li\b[^>]*>", re.IGNORECASE)
+_UNCLOSED_TAG = re.compile(r"<[^>]*$")
+_SPACES = re.compile(r"[ \t\r\f\v\xa0]+")
+
+
+def html_to_text(html):
+    """HTML mô tả job -> plain text, giữ xuống dòng theo đoạn/mục danh sách"""
+    if not html:
+        return ""
+    if "<" in html:
+        html = _LIST_ITEM.sub("\n- ", _BLOCK_TAGS.sub("\n", html))
+        # Description bị cắt theo độ dài cột có thể kết thúc giữa một tag
+        html = remove_tags(_UNCLOSED_TAG.sub("", html))
+    if "&" in html:
+        html = replace_entities(html)
+    lines = (_SPACES.sub(" ", line).strip() for line in html.splitlines())
+    return "\n".join(line for line in lines if line)
+
+
+def tokenize(text):
+    """Token chữ thường, bỏ dấu, bỏ từ dừng và token một ký tự"""
+    return [token for token in normalize_text(text).split() if len(token) > 1 and token not in STOP_WORDS]
+
+
+def row_description(row):
+    """Mô tả đầy đủ của một dòng JobsDes: RawContent không bị cắt theo độ dài cột như Description"""
+    if row.get("RawContent"):
+        try:
+            description = json_loads(row["RawContent"]).get("description")
+        except (ValueError, AttributeError):
+            description = None
+        if description:
+            return description
+    return row.get("Description")
+
+
+def row_plain_text(row):
+    """Plain text của mô tả: dùng PlainText JobTextNormalizer đã gắn vào row nếu có"""
+    if "PlainText" in row:
+        return row["PlainText"]
+    return html_to_text(row_description(row))
+
+
+class JobTextNormalizer:
+    """
+    Lưu plain text (bỏ HTML) và token stream (chữ thường, bỏ dấu, bỏ từ dừng) của
+    mô tả job vào JobTexts lúc ingest. Search và matching đọc JobTexts thay vì xử
+    lý lại HTML ở mỗi request.
+
+    apply() cũng gắn "PlainText" vào từng row để các bước ingest sau (feature,
+    dedup) dùng luôn, không strip HTML lần nữa.
+    """
+
+    @classmethod
+    def from_settings(cls, settings):
+        if not settings.getbool("JOB_TEXTS_ENABLED", True):
+            return None
+        return cls()
+
+    @staticmethod
+    def normalize(row):
+        """(plain text của mô tả, token của title + mô tả)"""
+        plain_text = html_to_text(row_description(row))
+        tokens = tokenize(f"{row.get('Title') or ''}\n{plain_text}")
+        return plain_text, " ".join(tokens)
+
+    def apply(self, db, rows):
+        """Ghi JobTexts cho các dòng (khóa theo Url), trả về số job đã xử lý"""
+        from database.crud import JobCRUD, JobTextCRUD
+
+        by_url = {row["Url"]: row for row in rows if row.get("Url")}
+        ids = JobCRUD.get_job_ids_by_urls(db, list(by_url))
+        texts = []
+        for url, job_id in ids.items():
+            row = by_url[url]
+            plain_text, tokens = self.normalize(row)
+            row["PlainText"] = plain_text
+            texts.append({"JobId": job_id, "PlainText": plain_text, "Tokens": tokens})
+        if texts:
+            JobTextCRUD.replace_job_texts(db, list(ids.values()), texts)
+        return len(texts)
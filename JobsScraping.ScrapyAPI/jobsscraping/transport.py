@@ -0,0 +1,227 @@
+import logging
+from collections import deque
+from time import monotonic, time
+
+from OpenSSL import SSL
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler
+from scrapy.resolver import CachingThreadedResolver
+from scrapy.utils.datatypes import LocalCache
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet import defer
+from twisted.internet.base import ThreadedResolver
+from twisted.internet.interfaces import IResolverSimple
+from twisted.python.failure import Failure
+from twisted.web.client import HTTPConnectionPool
+from zope.interface import implementer
+
+from .middlewares import percentile
+
+try:
+    from scrapy.core.downloader.handlers.http2 import H2DownloadHandler
+except ImportError:  # HTTP/2 cần package h2, không có thì dùng HTTP/1.1 keep-alive
+    H2DownloadHandler = None
+
+logger = logging.getLogger(__name__)
+
+
+class HostTimings:
+    """
+    Thời gian (ms) theo host và giai đoạn, ghi vào stats dạng timing/<host>/<phase>_*:
+
+    - connect: mở TCP connection mới (gồm DNS khi cache miss)
+    - tls: TLS handshake của connection mới
+    - ttfb: từ lúc gửi request tới khi nhận header (gồm connect/TLS nếu phải mở connection)
+    - transfer: từ header tới hết body
+
+    Số lần connect so với số request (ttfb_count) cho biết tỉ lệ dùng lại connection.
+    """
+
+    def __init__(self, stats):
+        self.stats = stats
+        self.samples = {}
+
+    def record(self, host, phase, seconds):
+        ms = seconds * 1000
+        samples = self.samples.get((host, phase))
+        if samples is None:
+            samples = self.samples[(host, phase)] = deque(maxlen=10000)
+        samples.append(ms)
+        self.stats.inc_value(f"timing/{host}/{phase}_count")
+        self.stats.inc_value(f"timing/{host}/{phase}_total_ms", round(ms, 3))
+
+    def close(self):
+        hosts = set()
+        for (host, phase), samples in self.samples.items():
+            hosts.add(host)
+            self.stats.set_value(f"timing/{host}/{phase}_p50_ms", round(percentile(samples, 0.5), 1))
+            self.stats.set_value(f"timing/{host}/{phase}_p95_ms", round(percentile(samples, 0.95), 1))
+        for host in hosts:
+            requests = self.stats.get_value(f"timing/{host}/ttfb_count", 0)
+            connects = self.stats.get_value(f"timing/{host}/connect_count", 0)
+            if requests:
+                self.stats.set_value(f"timing/{host}/connection_reuse", round(max(0.0, 1 - connects / requests), 3))
+
+
+class TimedConnectionPool(HTTPConnectionPool):
+    """HTTPConnectionPool đo thời gian mở connection mới theo host"""
+
+    def __init__(self, reactor, timings, persistent=True):
+        super().__init__(reactor, persistent=persistent)
+        self.timings = timings
+
+    def _newConnection(self, key, endpoint):
+        started = time()
+        # key = (scheme, host, port); qua proxy thì key là ("http-proxy", endpoint)
+        host = key[1].decode() if len(key) == 3 and isinstance(key[1], bytes) else "proxy"
+
+        def connected(protocol):
+            self.timings.record(host, "connect", time() - started)
+            return protocol
+
+        return super()._newConnection(key, endpoint).addCallback(connected)
+
+
+class TimedContextFactory:
+    """Bọc context factory của Scrapy, đo TLS handshake của mỗi connection mới"""
+
+    def __init__(self, context_factory, timings):
+        self.context_factory = context_factory
+        self.timings = timings
+
+    def __getattr__(self, name):
+        return getattr(self.context_factory, name)
+
+    def creatorForNetloc(self, hostname, port):
+        options = self.context_factory.creatorForNetloc(hostname, port)
+        ctx = getattr(options, "_ctx", None)
+        if ctx is None:
+            return options
+
+        host = hostname.decode() if isinstance(hostname, bytes) else str(hostname)
+        original = options._identityVerifyingInfoCallback
+        handshake = {}
+
+        def info_callback(connection, where, ret):
+            if where & SSL.SSL_CB_HANDSHAKE_START and "started" not in handshake:
+                handshake["started"] = time()
+            elif where & SSL.SSL_CB_HANDSHAKE_DONE and "done" not in handshake and "started" in handshake:
+                # TLS 1.3 gửi session ticket sau handshake cũng gọi lại callback, chỉ đo lần đầu
+                handshake["done"] = True
+                self.timings.record(host, "tls", time() - handshake["started"])
+            return original(connection, where, ret)
+
+        # Context mới cho mỗi connection nên thay info callback không ảnh hưởng connection khác
+        from twisted.internet._sslverify import _tolerateErrors
+        ctx.set_info_callback(_tolerateErrors(info_callback))
+        return options
+
+
+class TimedDownloadHandler(HTTP11DownloadHandler):
+    """
+    Download handler cho http/https:
+
+    - Pool keep-alive giữ tối đa max(CONCURRENT_REQUESTS_PER_DOMAIN, AIMD_MAX_CONCURRENCY)
+      connection mỗi host. AIMD có thể nâng concurrency của host quá CONCURRENT_REQUESTS_PER_DOMAIN,
+      pool nhỏ hơn thì connection dư bị đóng sau mỗi request và lần sau lại phải handshake.
+    - Host trong HTTP2_HOSTS đi qua H2DownloadHandler của Scrapy (các request multiplex trên
+      một connection) nếu có cài package h2.
+    - Timing connect/TLS/TTFB/transfer theo host trong stats (xem HostTimings).
+    """
+
+    def __init__(self, settings, crawler=None):
+        super().__init__(settings, crawler)
+        from twisted.internet import reactor
+
+        self.timings = HostTimings(crawler.stats) if crawler is not None else None
+        if self.timings is not None:
+            self._pool = TimedConnectionPool(reactor, self.timings)
+            self._pool._factory.noisy = False
+            self._contextFactory = TimedContextFactory(self._contextFactory, self.timings)
+        self._pool.maxPersistentPerHost = max(settings.getint("CONCURRENT_REQUESTS_PER_DOMAIN"),
+                                              settings.getint("AIMD_MAX_CONCURRENCY", 0))
+        self._pool.cachedConnectionTimeout = settings.getint("HTTP_KEEPALIVE_TIMEOUT", 240)
+
+        self.http2_hosts = set(settings.getlist("HTTP2_HOSTS"))
+        self.h2 = None
+        if self.http2_hosts and H2DownloadHandler is not None:
+            self.h2 = H2DownloadHandler(settings, crawler)
+            self.h2._context_factory = self._contextFactory
+        elif self.http2_hosts:
+            logger.info("Package h2 is not installed, using HTTP/1.1 keep-alive for HTTP2_HOSTS")
+
+    def download_request(self, request, spider):
+        host = urlparse_cached(request).hostname
+        started = time()
+        # H2DownloadHandler chưa hỗ trợ proxy
+        if self.h2 is not None and host in self.http2_hosts and not request.meta.get("proxy"):
+            dfd = self.h2.download_request(request, spider)
+        else:
+            dfd = super().download_request(request, spider)
+        if self.timings is None:
+            return dfd
+
+        def downloaded(response):
+            ttfb = request.meta.get("download_latency")
+            if ttfb is not None:
+                self.timings.record(host, "ttfb", ttfb)
+                self.timings.record(host, "transfer", max(0.0, time() - started - ttfb))
+            return response
+
+        return dfd.addCallback(downloaded)
+
+    def close(self):
+        if self.timings is not None:
+            self.timings.close()
+        if self.h2 is not None:
+            self.h2.close()
+        return super().close()
+
+
+@implementer(IResolverSimple)
+class TTLCachingResolver(CachingThreadedResolver):
+    """
+    CachingThreadedResolver có TTL (DNSCACHE_TTL giây): resolver mặc định của Scrapy giữ
+    IP tới khi process dừng, worker chạy lâu sẽ không thấy host đổi IP. Các lookup đồng
+    thời cho cùng một tên dùng chung một lượt resolve; resolve lỗi thì dùng tạm IP cũ.
+    """
+
+    def __init__(self, reactor, cache_size, timeout, ttl=300):
+        super().__init__(reactor, cache_size, timeout)
+        self.ttl = ttl
+        # tên -> (IP, hết hạn lúc), riêng với dnscache dùng chung của Scrapy
+        self.cache = LocalCache(cache_size)
+        self.pending = {}
+
+    @classmethod
+    def from_crawler(cls, crawler, reactor):
+        settings = crawler.settings
+        cache_size = settings.getint("DNSCACHE_SIZE") if settings.getbool("DNSCACHE_ENABLED") else 0
+        return cls(reactor, cache_size, settings.getfloat("DNS_TIMEOUT"), settings.getfloat("DNSCACHE_TTL", 300))
+
+    def getHostByName(self, name, timeout=None):
+        entry = self.cache.get(name)
+        if entry is not None and entry[1] > monotonic():
+            return defer.succeed(entry[0])
+
+        waiters = self.pending.get(name)
+        if waiters is None:
+            waiters = self.pending[name] = []
+            dfd = ThreadedResolver.getHostByName(self, name, (self.timeout,))
+            dfd.addBoth(self._resolved, name, entry)
+        waiter = defer.Deferred()
+        waiters.append(waiter)
+        return waiter
+
+    def _resolved(self, result, name, stale):
+        waiters = self.pending.pop(name, [])
+        if isinstance(result, Failure):
+            if stale is not None:
+                logger.warning(f"DNS lookup for {name} failed, using cached address {stale[0]}")
+                result = stale[0]
+        elif self.ttl > 0 and self.cache.limit:
+            self.cache[name] = (result, monotonic() + self.ttl)
+        for waiter in waiters:
+            if isinstance(result, Failure):
+                waiter.errback(result)
+            else:
+                waiter.callback(result)
@@ -0,0 +1,150 @@
+import contextlib
+import json
+import os
+import re
+import tempfile
+import unicodedata
+from datetime import datetime, timezone
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn, fallback về json chuẩn
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+_NON_WORD = re.compile(r"[\W_]+", re.UNICODE)
+
+
+def to_text(value):
+    """Chuyển giá trị lồng nhau (list/dict từ API) thành chuỗi phẳng"""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple, set)):
+        parts = [to_text(v) for v in value]
+        return ", ".join(p for p in parts if p) or None
+    if isinstance(value, dict):
+        for key in ("value", "name", "full_addresses", "address_region_list", "address"):
+            if value.get(key):
+                return to_text(value[key])
+        return json.dumps(value, ensure_ascii=False, default=str)
+    return str(value)
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """
+    Khóa độc quyền giữa các process (worker, shard) trên file `path`.lock, dùng quanh
+    đoạn đọc - merge - ghi file state dùng chung
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    with open(f"{path}.lock", "a+b") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        else:
+            lock.seek(0)
+            # LK_LOCK thử lại trong ~10 giây rồi báo lỗi
+            msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write(path, data):
+    """Ghi `data` (bytes) qua file tạm riêng của process rồi os.replace, nên không ai đọc thấy file ghi dở"""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def arg_enabled(value, default):
+    """Spider argument bật/tắt (`-a incremental=0`) đến dưới dạng string"""
+    if value is None:
+        return default
+    if isinstance(value, str):
+        return value.strip().lower() not in ("0", "false", "no", "off", "")
+    return bool(value)
+
+
+def parse_shard(value):
+    """Spider argument `-a shard=i/n` (shard thứ i trong n shard) -> (i, n); không có thì (0, 1)"""
+    if not value:
+        return 0, 1
+    index, _, count = str(value).partition("/")
+    index, count = int(index), int(count or 1)
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"Invalid shard {value!r}, expected i/n with 0 <= i < n")
+    return index, count
+
+
+def to_datetime(value):
+    """Parse ngày đăng từ các định dạng API khác nhau, trả về UTC naive"""
+    if isinstance(value, dict):
+        value = value.get("datetime") or value.get("date")
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, (int, float)):
+        parsed = datetime.fromtimestamp(value, tz=timezone.utc)
+    elif isinstance(value, str) and value:
+        parsed = None
+        for fmt in (None, "%d-%m-%Y", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"):
+            try:
+                parsed = datetime.fromisoformat(value) if fmt is None else datetime.strptime(value, fmt)
+                break
+            except ValueError:
+                continue
+        if parsed is None:
+            return None
+    else:
+        return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def json_loads(data):
+    """Decode JSON (str hoặc bytes) bằng orjson nếu có cài"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def response_json(response):
+    """JSON của response, decode thẳng từ body (bytes) thay vì response.json() đi qua response.text"""
+    return json_loads(response.body)
+
+
+def join_names(values, key):
+    """Nối field `key` của list object từ API ("skills": [{"skillName": ...}]) trong một lượt"""
+    if not values:
+        return None
+    return ", ".join(value[key] for value in values if isinstance(value, dict) and value.get(key)) or None
+
+
+def normalize_text(value):
+    """Chữ thường, bỏ dấu tiếng Việt và ký tự đặc biệt: 'FPT Software' == 'fpt-software'"""
+    if not value:
+        return ""
+    value = unicodedata.normalize("NFKD", value.replace("đ", "d").replace("Đ", "D"))
+    value = "".join(c for c in value if not unicodedata.combining(c))
+    return _NON_WORD.sub(" ", value.lower()).strip()
@@ -0,0 +1,155 @@
+import json
+import logging
+import os
+
+from .utils import atomic_write, file_lock, to_datetime
+
+try:
+    import redis
+except ImportError:  # redis chỉ cần khi dùng backend "redis"
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+def job_stamp(*values):
+    """Lấy mốc thời gian đầu tiên có giá trị (refreshed, published, ...) dạng ISO string"""
+    for value in values:
+        parsed = to_datetime(value)
+        if parsed is not None:
+            return parsed.isoformat()
+    return None
+
+
+class WatermarkStore:
+    """
+    High-water mark của một source, lưu trong file JSON.
+
+    Gồm mốc thời gian mới nhất đã crawl và map job_id -> stamp của các job đã
+    thấy. Job có cùng id và stamp với lần crawl trước được xem là không đổi.
+
+    File chỉ dùng chung được giữa các worker cùng máy (hoặc cùng volume WATERMARK_DIR);
+    crawl chia shard trên nhiều máy dùng WATERMARK_BACKEND = 'redis'.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.high_water = None
+        self.seen = {}
+        self._observed = {}
+        self.known_count = 0
+        self.new_count = 0
+        self.load()
+
+    @classmethod
+    def for_source(cls, directory, source):
+        return cls(os.path.join(directory, f"{source}.json"))
+
+    @classmethod
+    def from_settings(cls, settings, source):
+        backend = settings.get("WATERMARK_BACKEND", "file")
+        if backend == "redis":
+            return RedisWatermarkStore(settings.get("WATERMARK_REDIS_URL"), source)
+        if backend == "file":
+            return cls.for_source(settings.get("WATERMARK_DIR"), source)
+        raise ValueError(f"Unknown WATERMARK_BACKEND: {backend}")
+
+    def _read(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cannot read watermark {self.path}: {e}")
+            return {}
+
+    def load(self):
+        data = self._read()
+        self.high_water = data.get("high_water")
+        self.seen = data.get("seen", {})
+
+    def is_known(self, job_id, stamp):
+        """Job đã crawl ở lần trước và không thay đổi kể từ đó"""
+        if job_id is None:
+            return False
+        known = self.seen.get(str(job_id), False) == stamp
+        if known:
+            self.known_count += 1
+        else:
+            self.new_count += 1
+        return known
+
+    def observe(self, job_id, stamp):
+        if job_id is None:
+            return
+        self._observed[str(job_id)] = stamp
+        if stamp and (self.high_water is None or stamp > self.high_water):
+            self.high_water = stamp
+
+    def save(self):
+        """
+        Ghi đè nguyên tử, merge với bản trên đĩa để không mất dữ liệu của worker khác.
+        Đọc - merge - ghi nằm trong file lock nên các shard đóng cùng lúc không ghi đè nhau
+        """
+        if not self._observed:
+            return
+        with file_lock(self.path):
+            data = self._read()
+            seen = data.get("seen", {})
+            seen.update(self._observed)
+            high_water = max(filter(None, (data.get("high_water"), self.high_water)), default=None)
+            atomic_write(self.path, json.dumps({"high_water": high_water, "seen": seen}).encode("utf-8"))
+
+        self.seen = seen
+        self.high_water = high_water
+        self._observed = {}
+
+
+class RedisWatermarkStore(WatermarkStore):
+    """
+    Watermark trong Redis, dùng chung giữa các worker trên mọi máy: hash
+    `watermark:<source>:seen` (job_id -> stamp) và sorted set `watermark:<source>:high_water`
+    chỉ giữ stamp lớn nhất (cùng score nên xếp theo chuỗi, stamp ISO so sánh được).
+    Mỗi worker chỉ ghi thêm job đã thấy nên các shard đóng cùng lúc không ghi đè nhau.
+    """
+
+    def __init__(self, url, source):
+        if redis is None:
+            raise RuntimeError("WATERMARK_BACKEND = 'redis' requires the redis package")
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        super().__init__(f"watermark:{source}")
+
+    def _read(self):
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            pipe.zrange(f"{self.path}:high_water", -1, -1)
+            pipe.hgetall(f"{self.path}:seen")
+            high_water, seen = pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Cannot read watermark {self.path}: {e}")
+            return {}
+        # Job không có stamp lưu chuỗi rỗng
+        seen = {job_id: stamp or None for job_id, stamp in seen.items()}
+        return {"high_water": high_water[0] if high_water else None, "seen": seen}
+
+    def save(self):
+        if not self._observed:
+            return
+        try:
+            pipe = self.client.pipeline()
+            pipe.hset(f"{self.path}:seen", mapping={job_id: stamp or "" for job_id, stamp in self._observed.items()})
+            if self.high_water:
+                # MULTI: thêm stamp rồi chỉ giữ stamp lớn nhất
+                pipe.zadd(f"{self.path}:high_water", {self.high_water: 0})
+                pipe.zremrangebyrank(f"{self.path}:high_water", 0, -2)
+            pipe.zrange(f"{self.path}:high_water", -1, -1)
+            high_water = pipe.execute()[-1]
+        except redis.RedisError as e:
+            # Lần crawl sau chỉ không bỏ được các job này, không mất dữ liệu
+            logger.error(f"Cannot save watermark {self.path}: {e}")
+            return
+
+        self.seen.update(self._observed)
+        self.high_water = high_water[0] if high_water else None
+        self._observed = {}
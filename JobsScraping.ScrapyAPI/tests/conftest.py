@@ -0,0 +1,43 @@
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+# Test chạy trên SQLite trong bộ nhớ, không đụng tới SQL Server thật; phải đặt trước khi import database.db
+os.environ["DATABASE_URL"] = "sqlite://"
+
+
+@pytest.fixture
+def db():
+    from database import db as database, models
+    import worker.matching as matching
+
+    database.engine.echo = False
+    # SQL Server có sẵn GETUTCDATE(), SQLite thì không
+    if not event.contains(database.engine, "connect", _register_getutcdate):
+        event.listen(database.engine, "connect", _register_getutcdate)
+    models.Base.metadata.create_all(bind=database.engine)
+    # Ma trận job và tf cache theo process, không để lọt giữa các test
+    matching._engine = None
+    matching._term_counts = matching.TermCounts()
+    session = database.SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+        models.Base.metadata.drop_all(bind=database.engine)
+
+
+@pytest.fixture
+def eager_celery():
+    from worker.celery_app import celery_app
+
+    previous = {key: celery_app.conf[key] for key in ("task_always_eager", "task_eager_propagates", "result_backend")}
+    celery_app.conf.update(task_always_eager=True, task_eager_propagates=True, result_backend="cache+memory://")
+    yield celery_app
+    celery_app.conf.update(previous)
+
+
+def _register_getutcdate(connection, record):
+    connection.create_function("getutcdate", 0, lambda: datetime.utcnow().isoformat(" "))
@@ -0,0 +1,48 @@
+from database import models
+from database.crud import JobCRUD
+from jobsscraping.dedup import NearDuplicateIndex
+
+BACKEND = "Backend developer Python Django REST API PostgreSQL Docker, làm việc với team sản phẩm thanh toán. " * 3
+ACCOUNTANT = "Kế toán thuế, báo cáo tài chính, sổ sách, đối chiếu công nợ với khách hàng. " * 3
+
+
+def job(url, title="Backend Developer", company="Acme", description=BACKEND):
+    return {"Title": title, "Company": company, "Location": "Hà Nội", "Url": url, "Description": description,
+            "Source": "test"}
+
+
+def write(db, rows):
+    JobCRUD.bulk_upsert_jobs(db, rows)
+    return NearDuplicateIndex().assign(db, rows)
+
+
+def clusters(db):
+    db.expire_all()
+    return {row.Url: (row.Id, row.ClusterId) for row in db.query(models.JobsDes)}
+
+
+def test_assign_groups_near_duplicates(db):
+    rows = [job("https://a/0"), job("https://a/1"), job("https://a/2", "Kế toán tổng hợp", "Beta", ACCOUNTANT)]
+    assert write(db, rows) == {"fingerprinted": 3, "duplicates": 1}
+    assert clusters(db) == {"https://a/0": (1, 1), "https://a/1": (2, 1), "https://a/2": (3, 3)}
+
+    # Nội dung không đổi: không tính lại fingerprint
+    assert NearDuplicateIndex().assign(db, rows) == {"fingerprinted": 0, "duplicates": 0}
+
+
+def test_assign_refingerprints_changed_job(db):
+    rows = [job("https://a/0"), job("https://a/1", "Kế toán tổng hợp", "Beta", ACCOUNTANT)]
+    write(db, rows)
+    assert clusters(db)["https://a/1"] == (2, 2)
+    bands = db.query(models.JobLshBand).filter_by(JobId=2).count()
+
+    # Job 2 đổi thành bản sao của job 1: band cũ được thay và job vào cluster của job 1
+    assert write(db, [job("https://a/1")]) == {"fingerprinted": 1, "duplicates": 1}
+    assert clusters(db)["https://a/1"] == (2, 1)
+    assert db.query(models.JobLshBand).filter_by(JobId=2).count() == bands
+    assert db.query(models.JobFingerprint).count() == 2
+
+    # Đổi lại nội dung khác hẳn: job tách ra thành cluster riêng
+    assert write(db, [job("https://a/1", "Kế toán tổng hợp", "Beta", ACCOUNTANT)]) == \
+        {"fingerprinted": 1, "duplicates": 0}
+    assert clusters(db) == {"https://a/0": (1, 1), "https://a/1": (2, 2)}
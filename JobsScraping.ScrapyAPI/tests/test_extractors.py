@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+from jobsscraping.extractors import extract_embedded_json, extract_job_requirement
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "..", "benchmarks", "fixtures", "vietnamwork")
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("detail_1780001.html", ("<strong>Quản lý</strong>", "1")),
+    ("detail_1780555.html", ("<strong>Nhân viên</strong>", "3")),
+    ("detail_1781234.html", ("<strong>Mới tốt nghiệp</strong>", "8")),
+])
+def test_extract_job_requirement_from_fixture(name, expected):
+    embed = extract_embedded_json(read_fixture(name))
+    assert isinstance(embed, dict)
+    assert extract_job_requirement(embed) == expected
+
+
+def test_extract_embedded_json_fallbacks():
+    # Không có __NEXT_DATA__: script application/json, sau đó window.__NUXT__
+    html = '<script>var a = 1;</script><script type="application/json">{"jobLevel": "Senior"}</script>'
+    assert extract_embedded_json(html) == {"jobLevel": "Senior"}
+    html = '<script>window.__NUXT__ = {"job": {"yearsOfExperience": 2}};</script>'
+    assert extract_embedded_json(html) == {"job": {"yearsOfExperience": 2}}
+
+
+@pytest.mark.parametrize("html", [None, "", "<html></html>", '<script id="__NEXT_DATA__">{not json</script>'])
+def test_extract_embedded_json_missing_or_invalid(html):
+    assert extract_embedded_json(html) is None
+
+
+def test_extract_job_requirement_searches_whole_tree():
+    embed = {"props": {"pageProps": {"other": [{"jobRequirement": {"jobLevel": "Trưởng phòng"}}],
+                                     "yearsOfExperience": 5}}}
+    assert extract_job_requirement(embed) == ("Trưởng phòng", 5)
+    assert extract_job_requirement(None) == (None, None)
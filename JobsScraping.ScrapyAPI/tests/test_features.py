@@ -0,0 +1,32 @@
+import pytest
+
+from jobsscraping.features import city_code, parse_salary
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1500 - 2800 USD", (1500.0, 2800.0, "USD")),
+    ("Up to $2,000", (None, 2000.0, "USD")),
+    ("15 - 25 triệu", (15_000_000.0, 25_000_000.0, "VND")),
+    ("Trên 12 triệu", (12_000_000.0, None, "VND")),
+    ("20.000.000 đ", (20_000_000.0, 20_000_000.0, "VND")),
+    # Số năm kinh nghiệm đứng trước không được đọc thành lương
+    ("3+ năm kinh nghiệm, lương 20 triệu", (20_000_000.0, 20_000_000.0, "VND")),
+])
+def test_parse_salary(text, expected):
+    assert parse_salary(text) == expected
+
+
+@pytest.mark.parametrize("text", ["Từ 2 năm", "Từ 2 năm đến 5 năm", "1000 - 2000", "Thương lượng", None])
+def test_parse_salary_ignores_text_without_currency(text):
+    assert parse_salary(text) == (None, None, None)
+
+
+@pytest.mark.parametrize("location", ["Thủ Đức", "TP. Thủ Đức", "Quận 10", "Q.1", "District 7", "Bình Thạnh"])
+def test_city_code_hcm_districts(location):
+    assert city_code(location) == "HCM"
+
+
+def test_city_code_cities():
+    assert city_code("Quận Cầu Giấy, Hà Nội") == "HN"
+    assert city_code("Đà Nẵng") == "DN"
+    assert city_code("Vũng Tàu") is None
@@ -0,0 +1,69 @@
+import json
+import os
+
+from database import models
+from jobsscraping.feeds import CHECKPOINT_FILENAME, FeedLoader, PartReader, RotatingJsonLinesWriter
+
+
+def job(i):
+    return {"title": f"Python Developer {i}", "company": "A", "url": f"https://a/{i}", "source": "test"}
+
+
+def read(reader):
+    return [json.loads(line)["url"] for line in reader.lines()]
+
+
+def test_part_reader_follows_part_being_written(tmp_path):
+    writer = RotatingJsonLinesWriter(str(tmp_path), "test", flush_every=2)
+    for i in range(3):
+        writer.write(job(i))
+    reader = PartReader(writer.parts[0])
+
+    # Chỉ đọc tới phần đã sync flush; dòng thứ 3 chưa flush
+    assert read(reader) == ["https://a/0", "https://a/1"]
+    assert not reader.finished
+
+    writer.write(job(3))
+    assert read(reader) == ["https://a/2", "https://a/3"]
+    writer.write(job(4))
+    writer.close("finished")
+    assert read(reader) == ["https://a/4"]
+    assert reader.finished
+    reader.close()
+
+
+def test_part_reader_skips_loaded_bytes(tmp_path):
+    writer = RotatingJsonLinesWriter(str(tmp_path), "test")
+    for i in range(4):
+        writer.write(job(i))
+    writer.close("finished")
+
+    skip = sum(len(json.dumps(job(i)).encode("utf-8")) + 1 for i in range(2))
+    reader = PartReader(writer.parts[0], skip=skip, chunk_size=16)
+    assert read(reader) == ["https://a/2", "https://a/3"]
+    reader.close()
+
+
+def test_feed_loader_resumes_from_checkpoint(db, tmp_path):
+    writer = RotatingJsonLinesWriter(str(tmp_path), "test", flush_every=3)
+    for i in range(4):
+        writer.write(job(i))
+
+    # Crawl còn đang ghi: loader nạp các dòng đã flush rồi dừng
+    first = FeedLoader(str(tmp_path), batch_size=2).run()
+    assert (first["rows_inserted"], first["parts_done"]) == (3, 0)
+    with open(os.path.join(tmp_path, CHECKPOINT_FILENAME), encoding="utf-8") as f:
+        checkpoint = json.load(f)
+    assert checkpoint["done"] == []
+    assert checkpoint["offsets"]["test-00000.jsonl.gz"] == sum(
+        len(json.dumps(job(i)).encode("utf-8")) + 1 for i in range(3))
+
+    for i in range(4, 6):
+        writer.write(job(i))
+    writer.close("finished")
+
+    # Lần chạy sau tiếp tục từ offset đã lưu, không nạp lại dòng cũ
+    second = FeedLoader(str(tmp_path), batch_size=2).run()
+    assert (second["rows_inserted"], second["rows_updated"], second["rows_unchanged"]) == (3, 0, 0)
+    assert second["parts_done"] == 1
+    assert db.query(models.JobsDes).count() == 6
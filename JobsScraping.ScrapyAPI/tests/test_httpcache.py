@@ -0,0 +1,76 @@
+import time
+
+import pytest
+from scrapy import Spider
+from scrapy.http import HtmlResponse, Request
+from scrapy.utils.test import get_crawler
+
+from jobsscraping.httpcache import SqliteCacheStorage
+
+
+@pytest.fixture
+def open_storage(tmp_path):
+    opened = []
+
+    def open_storage(name="topdev", **settings):
+        crawler = get_crawler(Spider, dict({"HTTPCACHE_DIR": str(tmp_path), "HTTPCACHE_EXPIRATION_SECS": 0,
+                                            "HTTPCACHE_MAX_BYTES": 0}, **settings))
+        spider = crawler._create_spider(name)
+        storage = SqliteCacheStorage(crawler.settings)
+        storage.open_spider(spider)
+        opened.append((storage, spider))
+        return storage, spider
+
+    yield open_storage
+    for storage, spider in opened:
+        storage.close_spider(spider)
+
+
+def response(url, body=b"<html><body>Python Developer</body></html>"):
+    request = Request(url)
+    return request, HtmlResponse(url, body=body, headers={"Content-Type": "text/html; charset=utf-8"},
+                                 request=request)
+
+
+def test_store_and_retrieve(open_storage):
+    storage, spider = open_storage()
+    request, stored = response("https://topdev.vn/viec-lam/1", body=b"<p>job</p>" * 500)
+    assert storage.retrieve_response(spider, request) is None
+
+    storage.store_response(spider, request, stored)
+    cached = storage.retrieve_response(spider, Request("https://topdev.vn/viec-lam/1"))
+    assert isinstance(cached, HtmlResponse)
+    assert (cached.url, cached.status, cached.body) == (stored.url, 200, stored.body)
+    assert cached.headers["Content-Type"] == b"text/html; charset=utf-8"
+    assert storage.retrieve_response(spider, Request("https://topdev.vn/viec-lam/2")) is None
+
+
+def test_cache_persists_across_runs(open_storage):
+    storage, spider = open_storage()
+    request, stored = response("https://topdev.vn/viec-lam/1")
+    storage.store_response(spider, request, stored)
+    storage.close_spider(spider)
+
+    storage, spider = open_storage()
+    assert storage.retrieve_response(spider, request).body == stored.body
+
+
+def test_source_ttl_expires_entries(open_storage, monkeypatch):
+    storage, spider = open_storage(HTTPCACHE_SOURCE_TTLS={"topdev": 60})
+    request, stored = response("https://topdev.vn/viec-lam/1")
+    storage.store_response(spider, request, stored)
+    assert storage.retrieve_response(spider, request) is not None
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 61)
+    assert storage.retrieve_response(spider, request) is None
+
+
+def test_no_expiration_by_default(open_storage, monkeypatch):
+    storage, spider = open_storage("linkedin")
+    request, stored = response("https://www.linkedin.com/jobs/view/1")
+    storage.store_response(spider, request, stored)
+
+    now = time.time()
+    monkeypatch.setattr(time, "time", lambda: now + 365 * 24 * 3600)
+    assert storage.retrieve_response(spider, request) is not None
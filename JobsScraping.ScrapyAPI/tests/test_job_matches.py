@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from database import models
+from database.crud import JobMatchCRUD, SkillCRUD
+from jobsscraping.features import JobFeatureExtractor
+
+
+def add_jobs(db):
+    rows = [
+        {"Title": "Python Developer", "Company": "A", "Location": "Hồ Chí Minh", "Url": "https://a/1",
+         "RequiredSkills": "Python, SQL", "ExperienceLevel": "Junior", "PostedDate": datetime(2026, 1, 2),
+         "Source": "test"},
+        {"Title": "Java Developer", "Company": "B", "Location": "Hà Nội", "Url": "https://b/1",
+         "RequiredSkills": "Java, Spring", "ExperienceLevel": "Senior", "PostedDate": datetime(2026, 1, 1),
+         "Source": "test"},
+    ]
+    db.add_all(models.JobsDes(**row) for row in rows)
+    db.commit()
+    JobFeatureExtractor().apply(db, rows)
+    return {job.Url: job.Id for job in db.query(models.JobsDes)}
+
+
+def add_cv(db):
+    user = models.User(Email="cv@test", Address="Quận 1, TP HCM")
+    db.add(user)
+    db.commit()
+    cv = models.CV(UserId=user.Id)
+    db.add(cv)
+    db.commit()
+    for skill_id in SkillCRUD.get_or_create_skill_ids(db, ["Python", "SQL"]).values():
+        db.add(models.CVSkill(CVId=cv.Id, SkillId=skill_id))
+    db.add(models.WorkExperience(CVId=cv.Id, JobTitle="Developer", CompanyName="C",
+                                 StartDate=datetime(2022, 1, 1), EndDate=datetime(2025, 1, 1)))
+    db.commit()
+    return cv.Id
+
+
+def test_process_job_matches_persists_and_reads_back(db, eager_celery):
+    from worker.matching import SCORING_VERSION
+    from worker.tasks import process_job_matches
+
+    job_ids = add_jobs(db)
+    cv_id = add_cv(db)
+
+    result = process_job_matches.apply(args=[cv_id]).get()
+    assert result["matches_saved"] >= 1
+
+    db.expire_all()
+    matches = JobMatchCRUD.get_matches_for_cv(db, cv_id, min_score=0.3)
+    assert [match.JobId for match in matches][0] == job_ids["https://a/1"]
+    assert len(matches) == result["matches_saved"]
+    assert all(match.AlgorithmVersion == SCORING_VERSION and match.CorpusVersion for match in matches)
+    assert float(matches[0].MatchScore) >= 0.8
+    assert matches[0].MatchedSkills == "Python, SQL"
+    assert db.get(models.CVMatchState, cv_id).AlgorithmVersion == SCORING_VERSION
@@ -0,0 +1,37 @@
+from datetime import datetime
+
+from database import models
+from database.crud import JobCRUD
+from jobsscraping.matchdelta import MatchDeltaNotifier
+
+
+def job(url, **values):
+    row = {"Title": "Python Developer", "Company": "A", "Location": "Hồ Chí Minh", "Url": url,
+           "Description": "Django", "PostedDate": datetime(2026, 1, 2, 8, 30, 15, 123456), "Source": "test",
+           "RawContent": f'{{"scraped_at": "{datetime.utcnow()}"}}'}
+    row.update(values)
+    return row
+
+
+def test_bulk_upsert_skips_unchanged_rows(db):
+    first = JobCRUD.bulk_upsert_jobs(db, [job("https://a/1"), job("https://a/2")])
+    assert (first["inserted"], first["updated"], first["unchanged"]) == (2, 0, 0)
+    assert sorted(first["job_ids"]) == ["https://a/1", "https://a/2"]
+
+    # Lần crawl sau: job 1 giữ nguyên (chỉ RawContent khác), job 2 đổi mô tả, job 3 mới
+    second = JobCRUD.bulk_upsert_jobs(db, [job("https://a/1"), job("https://a/2", Description="Django, AWS"),
+                                          job("https://a/3")])
+    assert (second["inserted"], second["updated"], second["unchanged"]) == (1, 1, 1)
+    assert sorted(second["job_ids"]) == ["https://a/2", "https://a/3"]
+
+    db.expire_all()
+    assert db.query(models.JobsDes).filter_by(Url="https://a/2").one().Description == "Django, AWS"
+
+
+def test_match_notifier_queues_only_new_and_changed_jobs(db):
+    JobCRUD.bulk_upsert_jobs(db, [job("https://a/1"), job("https://a/2")])
+    counts = JobCRUD.bulk_upsert_jobs(db, [job("https://a/1"), job("https://a/2", Salary="20 triệu")])
+
+    notifier = MatchDeltaNotifier(batch_size=100)
+    assert notifier.apply(list(counts["job_ids"].values())) == 1
+    assert notifier.pending == {counts["job_ids"]["https://a/2"]}
@@ -0,0 +1,44 @@
+import numpy as np
+
+from worker.matching import MatchingEngine, TextIndex
+
+
+def profile(skills=(), city_code=None, years=None, terms=()):
+    return {"skills": dict.fromkeys(skills, ""), "city_code": city_code, "years": years, "terms": list(terms)}
+
+
+def build_engine():
+    # (Id, ClusterId, CityCode, MinYearsExperience) mới nhất trước
+    features = [(3, None, "HCM", 2), (2, None, "HN", 5), (1, None, "REMOTE", None)]
+    job_skills = [(3, 10), (3, 11), (2, 10), (2, 12), (1, 13)]
+    texts = [(3, "python django postgres"), (2, "java spring"), (1, "golang kubernetes")]
+    vocabulary = TextIndex.build_vocabulary({"python": 1, "django": 1, "postgres": 1, "java": 1, "spring": 1,
+                                             "golang": 1, "kubernetes": 1}, 3)
+    return MatchingEngine.build(features, job_skills, job_texts=texts, vocabulary=vocabulary)
+
+
+def test_perfect_pair_scores_one_and_clears_default_threshold():
+    engine = build_engine()
+    cv = profile(skills=(10, 11), city_code="HCM", years=3, terms=("python", "django", "postgres"))
+
+    scores = engine.score([cv])[0]
+    assert scores[list(engine.job_ids).index(3)] == np.float32(1.0)
+    assert scores.max() <= 1.0
+
+    result = engine.match([cv], k=3, min_score=0.3)[0]
+    assert result["top"][0][0] == 3
+    assert result["top"][0][1] > 0.3
+
+
+def test_score_only_counts_criteria_with_data():
+    engine = build_engine()
+    # Chỉ có skill: trùng 1/2 skill của job 3 -> 0.5 dù không có kinh nghiệm, địa điểm, text
+    scores = engine.score([profile(skills=(10,))])[0]
+    assert scores[list(engine.job_ids).index(3)] == np.float32(0.5)
+
+
+def test_pair_without_comparable_data_scores_zero():
+    engine = build_engine()
+    scores = engine.score([profile()])[0]
+    assert not scores.any()
+    assert engine.match([profile()], min_score=0.3)[0]["matches_found"] == 0
@@ -0,0 +1,70 @@
+import os
+import time
+
+import pytest
+
+from jobsscraping.seen import FileBloomBackend, SeenFilter, bloom_parameters
+
+
+@pytest.mark.parametrize("capacity, error_rate, expected", [
+    (1000000, 0.001, (14377588, 10)),
+    (1000, 0.01, (9586, 7)),
+    (10, 0.5, (15, 1)),
+])
+def test_bloom_parameters(capacity, error_rate, expected):
+    assert bloom_parameters(capacity, error_rate) == expected
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, "time", lambda: now[0])
+    return now
+
+
+def seen_filter(directory, ttl=400, generations=4, capacity=1000, error_rate=0.01):
+    num_bits, num_hashes = bloom_parameters(capacity, error_rate)
+    return SeenFilter(FileBloomBackend(str(directory), "topdev", num_bits), num_bits, num_hashes, ttl, generations)
+
+
+def test_false_positive_rate_within_capacity(tmp_path, clock):
+    seen = seen_filter(tmp_path)
+    for i in range(1000):
+        seen.observe(i, "2026-01-01T00:00:00")
+    assert all(seen.is_known(i, "2026-01-01T00:00:00") for i in range(1000))
+    false_positives = sum(seen.is_known(i, "2026-01-01T00:00:00") for i in range(1000, 11000))
+    assert false_positives < 300
+
+
+def test_generations_expire_after_ttl(tmp_path, clock):
+    # ttl 400, 4 generation: mỗi generation 100 giây
+    seen = seen_filter(tmp_path)
+    seen.observe(1, "2026-01-01T00:00:00")
+    seen.close()
+    assert sorted(os.listdir(tmp_path)) == ["topdev.10.bloom", "topdev.10.bloom.lock"]
+
+    # Generation 10 còn nằm trong 4 generation gần nhất tới hết generation 13
+    clock[0] = 1399.0
+    seen = seen_filter(tmp_path)
+    assert seen.is_known(1, "2026-01-01T00:00:00")
+    # Job khác stamp (đã đổi nội dung) không được xem là đã thấy
+    assert not seen.is_known(1, "2026-01-02T00:00:00")
+    assert not seen.is_known(None, None)
+
+    clock[0] = 1400.0
+    seen = seen_filter(tmp_path)
+    assert not seen.is_known(1, "2026-01-01T00:00:00")
+    seen.close()
+    assert not any(name.endswith(".bloom") for name in os.listdir(tmp_path))
+
+
+def test_known_jobs_and_merge_between_workers(tmp_path, clock):
+    first, second = seen_filter(tmp_path), seen_filter(tmp_path)
+    first.observe(1, "a")
+    second.observe(2, "b")
+    first.close()
+    second.close()
+
+    seen = seen_filter(tmp_path)
+    jobs = [(1, "a"), (2, "b"), (2, "changed"), (3, "c"), (None, "x")]
+    assert seen.known_jobs(jobs) == {(1, "a"), (2, "b")}
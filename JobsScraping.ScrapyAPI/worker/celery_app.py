@@ -33,5 +33,10 @@ celery_app.conf.update(
 # Task routing
 celery_app.conf.task_routes = {
     'worker.tasks.scrape_jobs': {'queue': 'celery'},
+    'worker.tasks.plan_scrape': {'queue': 'celery'},
+    'worker.tasks.merge_shards': {'queue': 'celery'},
+    'worker.tasks.load_feed': {'queue': 'celery'},
     'worker.tasks.process_job_matches': {'queue': 'celery'},
+    'worker.tasks.process_batch_matches': {'queue': 'celery'},
+    'worker.tasks.match_new_jobs': {'queue': 'celery'},
 }
\ No newline at end of file
@@ -0,0 +1,191 @@
+import json
+import os
+import threading
+import logging
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Stats dạng đỉnh/thời lượng: gộp các shard bằng max thay vì cộng
+MAX_STATS_SUFFIXES = ("elapsed_time_seconds", "_p50_ms", "_p95_ms", "/concurrency", "/concurrency_max", "/delay",
+                      "total_pages", "memusage/max", "memusage/startup")
+
+
+def json_safe_stats(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Chuyển stats của Scrapy thành dict serialize được bằng JSON (Celery result)"""
+    safe = {}
+    for key, value in stats.items():
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        elif not isinstance(value, (str, int, float, bool, type(None))):
+            value = str(value)
+        safe[key] = value
+    return safe
+
+
+def merge_crawl_stats(stats_list: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Gộp stats (JSON-safe) của các shard: counter cộng lại; thời lượng, giá trị đỉnh
+    (concurrency, latency percentile) và mốc thời gian (finish_time, high water)
+    lấy max; start_time lấy sớm nhất. Percentile gộp bằng max nên chỉ là cận trên.
+    """
+    merged: Dict[str, Any] = {}
+    finish_reasons = set()
+    for stats in stats_list:
+        for key, value in stats.items():
+            if key == "finish_reason":
+                finish_reasons.add(value)
+            elif key not in merged:
+                merged[key] = value
+            elif key == "start_time":
+                merged[key] = min(merged[key], value)
+            elif isinstance(value, str):
+                merged[key] = max(merged[key], value)
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                if key.endswith(MAX_STATS_SUFFIXES):
+                    merged[key] = max(merged[key], value)
+                else:
+                    merged[key] += value
+    # Tỉ lệ dùng lại connection tính lại từ tổng số connect / request của mọi shard
+    for key in [key for key in merged if key.endswith("/connection_reuse")]:
+        host = key[:-len("/connection_reuse")]
+        requests = merged.get(f"{host}/ttfb_count", 0)
+        if requests:
+            merged[key] = round(max(0.0, 1 - merged.get(f"{host}/connect_count", 0) / requests), 3)
+    # Một shard dừng sớm (shutdown, lỗi) thì cả crawl mang lý do đó
+    merged["finish_reason"] = ",".join(sorted(finish_reasons - {"finished"})) or "finished"
+    return merged
+
+
+def crawl_stats_row(stats: Dict[str, Any]) -> Dict[str, Any]:
+    """Các cột ScrapingJobStats rút ra từ stats của Scrapy"""
+    status_prefix = "downloader/response_status_count/"
+    responses_by_status = {
+        key[len(status_prefix):]: value for key, value in stats.items() if key.startswith(status_prefix)
+    }
+    latency_histogram = {
+        key[len("latency/"):]: value for key, value in stats.items()
+        if key.startswith(("latency/le_", "latency/gt_"))
+    }
+    items = stats.get("item_scraped_count", 0)
+    elapsed = stats.get("elapsed_time_seconds")
+    return {
+        "FinishReason": stats.get("finish_reason"),
+        "ItemsScraped": items,
+        "RequestCount": stats.get("downloader/request_count", 0),
+        "ResponseCount": stats.get("downloader/response_count", 0),
+        "ResponseBytes": stats.get("downloader/response_bytes", 0),
+        "ElapsedSeconds": elapsed,
+        "ItemsPerSecond": round(items / elapsed, 3) if elapsed else None,
+        "LatencyP50Ms": stats.get("latency/p50_ms"),
+        "LatencyP95Ms": stats.get("latency/p95_ms"),
+        "ResponsesByStatus": json.dumps(responses_by_status),
+        "LatencyHistogram": json.dumps(latency_histogram),
+        "RawStats": json.dumps(json_safe_stats(stats)),
+    }
+
+
+class CrawlExecutor:
+    """
+    Chạy spider ngay trong worker process thay vì fork `scrapy crawl`.
+
+    Twisted reactor và CrawlerRunner được khởi tạo một lần cho mỗi worker
+    process và chạy trong một daemon thread; task Celery gửi crawl sang
+    reactor thread và chờ kết quả. Settings của project chỉ load một lần.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._runner = None
+        self._settings = None
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            os.environ.setdefault("SCRAPY_SETTINGS_MODULE", "jobsscraping.settings")
+            from scrapy.crawler import CrawlerRunner
+            from scrapy.utils.misc import create_instance, load_object
+            from scrapy.utils.project import get_project_settings
+            from twisted.internet import reactor
+
+            settings = get_project_settings()
+            # Reactor đã được cài sẵn trong thread này, không để Scrapy đòi reactor khác
+            settings.set("TWISTED_REACTOR", None, priority="cmdline")
+            self._settings = settings
+            self._runner = CrawlerRunner(settings)
+            # CrawlerRunner không tự cài DNS_RESOLVER như CrawlerProcess
+            resolver = create_instance(load_object(settings["DNS_RESOLVER"]), settings, self._runner, reactor=reactor)
+            resolver.install_on_reactor()
+
+            self._thread = threading.Thread(
+                target=reactor.run,
+                kwargs={"installSignalHandlers": False},
+                name="scrapy-reactor",
+                daemon=True,
+            )
+            self._thread.start()
+            logger.info("Started in-process Scrapy reactor")
+
+    def crawl(
+        self,
+        spider_name: str,
+        settings: Optional[Dict[str, Any]] = None,
+        on_progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        progress_interval: float = 5.0,
+        **spider_kwargs,
+    ) -> Dict[str, Any]:
+        """
+        Chạy một spider tới khi kết thúc và trả về stats của crawl.
+        `on_progress` được gọi định kỳ với snapshot stats đang chạy.
+        """
+        self._ensure_started()
+        from scrapy.crawler import Crawler
+        from twisted.internet import reactor
+
+        done = threading.Event()
+        state: Dict[str, Any] = {}
+
+        def _finish(outcome):
+            state["outcome"] = outcome
+            done.set()
+
+        def _start():
+            try:
+                crawl_settings = self._settings.copy()
+                crawl_settings.update(settings or {}, priority="cmdline")
+                spidercls = self._runner.spider_loader.load(spider_name)
+                crawler = Crawler(spidercls, crawl_settings)
+                state["crawler"] = crawler
+                self._runner.crawl(crawler, **spider_kwargs).addBoth(_finish)
+            except Exception as e:
+                _finish(e)
+
+        reactor.callFromThread(_start)
+        try:
+            while not done.wait(progress_interval):
+                crawler = state.get("crawler")
+                if on_progress is not None and crawler is not None and crawler.stats is not None:
+                    on_progress(dict(crawler.stats.get_stats()))
+        except BaseException:
+            # Soft time limit / revoke: dừng crawl để reactor không giữ spider mồ côi
+            crawler = state.get("crawler")
+            if crawler is not None:
+                reactor.callFromThread(crawler.stop)
+                done.wait(30)
+            raise
+
+        outcome = state.get("outcome")
+        if isinstance(outcome, BaseException):
+            raise outcome
+        if hasattr(outcome, "value") and isinstance(outcome.value, BaseException):
+            raise outcome.value
+
+        return dict(state["crawler"].stats.get_stats())
+
+
+# Một executor cho mỗi worker process, khởi tạo lười sau khi Celery fork
+crawl_executor = CrawlExecutor()
@@ -0,0 +1,430 @@
+import hashlib
+import logging
+import os
+import threading
+import time
+from itertools import repeat
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+# Trọng số từng thành phần điểm; điểm = trung bình có trọng số của các thành phần mà cả CV và
+# job có dữ liệu, trong [0, 1]. Industry chưa có dữ liệu để so nên chưa là tiêu chí.
+SKILL_WEIGHT = np.float32(0.4)
+EXPERIENCE_WEIGHT = np.float32(0.3)
+LOCATION_WEIGHT = np.float32(0.2)
+TEXT_WEIGHT = np.float32(0.3)
+
+# Token có trong hơn tỉ lệ này số job gần như không phân biệt được job nào, không đưa vào vocabulary
+TEXT_MAX_DF = 0.5
+# Số job đếm tf mỗi lượt trong TermCounts
+TEXT_BUILD_CHUNK = 5000
+
+# Giây trước khi worker load lại ma trận job từ database
+MATCHING_INDEX_MAX_AGE = float(os.getenv("MATCHING_INDEX_MAX_AGE", "300"))
+
+# Tăng khi đổi công thức chấm điểm; JobMatch ghi kèm để biết dòng nào chấm theo công thức cũ
+# 2: thêm độ tương đồng TF-IDF giữa OCR text của CV và mô tả job
+# 3: chia cho tổng trọng số các tiêu chí được tính thay vì số tiêu chí (điểm tối đa 1 thay vì 0.25)
+SCORING_VERSION = 3
+
+# Số CV chấm cùng một lượt trong match()
+SCORE_CHUNK_ROWS = 8
+
+REMOTE = "REMOTE"
+
+
+def tfidf_weights(rows: np.ndarray, columns: np.ndarray, counts: np.ndarray, idf: np.ndarray, row_count: int
+                  ) -> np.ndarray:
+    """Trọng số (1 + log tf) * idf của các phần tử (hàng, cột, tf), chuẩn hóa L2 theo hàng"""
+    weights = ((1 + np.log(counts.astype(np.float32))) * idf[columns]).astype(np.float32)
+    norms = np.sqrt(np.bincount(rows, weights * weights, minlength=row_count)).astype(np.float32)
+    return weights / norms[rows]
+
+
+class TermCounts:
+    """
+    tf của JobTexts.Tokens theo job, khóa theo phiên bản text (JobTexts.UpdatedAt).
+
+    Tokenize là phần chậm nhất khi dựng TextIndex (Python phải tra từng token); bản dùng
+    chung trong process worker (get_engine) giữ lại tf giữa các lần load ma trận nên mỗi
+    lần chỉ đọc và đếm JobTexts mới hoặc đã ghi lại, vector TF-IDF dựng lại từ tf bằng
+    phép toán mảng với IDF hiện tại.
+    """
+
+    def __init__(self):
+        # Id token riêng của cache, chỉ thêm không đổi: không phụ thuộc vocabulary lúc load
+        self.term_ids: Dict[str, int] = {}
+        self.terms: List[str] = []
+        # JobId -> (phiên bản, id token, tf)
+        self.jobs: Dict[int, Tuple[Any, np.ndarray, np.ndarray]] = {}
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def add(self, job_texts: Iterable[Tuple[int, Optional[str]]], versions: Optional[Dict[int, Any]] = None):
+        """Đếm tf của các (JobId, Tokens), thay tf cũ của job nếu có"""
+        chunk = []
+        for job_id, tokens in job_texts:
+            chunk.append((job_id, tokens.split() if tokens else []))
+            if len(chunk) >= TEXT_BUILD_CHUNK:
+                self._add_chunk(chunk, versions)
+                chunk = []
+        if chunk:
+            self._add_chunk(chunk, versions)
+
+    def _add_chunk(self, chunk: List[Tuple[int, List[str]]], versions: Optional[Dict[int, Any]]):
+        # map(dict.get) tra token trong C, Python chỉ lặp theo văn bản và theo token lần đầu gặp
+        ids, lengths = [], []
+        for _, tokens in chunk:
+            ids.extend(map(self.term_ids.get, tokens, repeat(-1)))
+            lengths.append(len(tokens))
+        ids = np.asarray(ids, dtype=np.int64)
+        unseen = np.flatnonzero(ids < 0)
+        if len(unseen):
+            tokens = [token for _, job_tokens in chunk for token in job_tokens]
+            for position in unseen.tolist():
+                term_id = self.term_ids.get(tokens[position])
+                if term_id is None:
+                    term_id = self.term_ids[tokens[position]] = len(self.terms)
+                    self.terms.append(tokens[position])
+                ids[position] = term_id
+
+        # Khóa hàng * 2^32 + id token: một lần sort đếm tf của mọi cặp (job, token) trong khối
+        rows = np.repeat(np.arange(len(chunk), dtype=np.int64), lengths)
+        keys, counts = np.unique((rows << 32) + ids, return_counts=True)
+        bounds = np.searchsorted(keys >> 32, np.arange(len(chunk) + 1))
+        term_ids = (keys & 0xFFFFFFFF).astype(np.int32)
+        counts = counts.astype(np.int32)
+        for row, (job_id, _) in enumerate(chunk):
+            start, end = bounds[row], bounds[row + 1]
+            version = versions.get(job_id) if versions is not None else None
+            self.jobs[job_id] = (version, term_ids[start:end].copy(), counts[start:end].copy())
+
+    def refresh(self, db):
+        """Đồng bộ với JobTexts: bỏ job đã xóa, đếm lại job mới hoặc có UpdatedAt khác"""
+        from database.crud import JobTextCRUD
+
+        versions = JobTextCRUD.get_text_versions(db)
+        for job_id in [job_id for job_id in self.jobs if job_id not in versions]:
+            del self.jobs[job_id]
+        changed = [job_id for job_id, version in versions.items()
+                   if job_id not in self.jobs or self.jobs[job_id][0] != version]
+        if not changed:
+            return
+        if len(changed) > len(versions) // 2:
+            # Lần load đầu: đọc tuần tự cả bảng thay vì IN theo từng khối Id
+            changed_ids = set(changed)
+            self.add(((job_id, tokens) for job_id, tokens in JobTextCRUD.iter_tokens(db) if job_id in changed_ids),
+                     versions)
+        else:
+            self.add(JobTextCRUD.iter_tokens(db, changed), versions)
+
+    def index(self, vocabulary: Tuple[Dict[str, int], np.ndarray], job_ids: np.ndarray) -> "TextIndex":
+        """TextIndex của các job theo vocabulary/IDF hiện tại; job chưa đếm tf thì không có text"""
+        terms, idf = vocabulary
+        column_of = np.fromiter(map(terms.get, self.terms, repeat(-1)), dtype=np.int64, count=len(self.terms))
+        entries = [self.jobs.get(job_id) for job_id in job_ids.tolist()]
+        lengths = [len(entry[1]) if entry is not None else 0 for entry in entries]
+        present = [entry for entry in entries if entry is not None]
+
+        rows = np.repeat(np.arange(len(job_ids), dtype=np.int64), lengths)
+        ids = np.concatenate([entry[1] for entry in present]) if present else np.empty(0, np.int32)
+        counts = np.concatenate([entry[2] for entry in present]) if present else np.empty(0, np.int32)
+        columns = column_of[ids]
+        known = columns >= 0
+        rows, columns, counts = rows[known], columns[known], counts[known]
+        weights = tfidf_weights(rows, columns, counts, idf, len(job_ids))
+        return TextIndex(terms, idf, sparse.csr_matrix(
+            (weights, (columns, rows)), shape=(len(terms), len(job_ids)), dtype=np.float32,
+        ))
+
+
+class TextIndex:
+    """
+    Vector TF-IDF của JobTexts.Tokens (tf = 1 + log tf, chuẩn hóa L2) cho các job của
+    một MatchingEngine; độ tương đồng cosine với text của CV là tích vô hướng.
+
+    IDF tính từ TermStats (document frequency trên cả corpus, cập nhật mỗi lần ghi
+    JobTexts), không từ tập job đang index, nên index của vài job mới (matching delta)
+    cho cùng vector với index đầy đủ. Ma trận lưu dạng terms x jobs: text CV chỉ có vài
+    trăm token khác nhau, tích CV x jobs chỉ đi qua danh sách job của các token đó.
+    """
+
+    def __init__(self, vocabulary: Dict[str, int], idf: np.ndarray, postings: sparse.csr_matrix):
+        self.vocabulary = vocabulary
+        self.idf = idf
+        self.postings = postings
+        # Job không có JobTexts (hoặc không token nào trong vocabulary) thì không tính tiêu chí text
+        self.has_text = (np.bincount(postings.indices, minlength=postings.shape[1]) > 0).astype(np.float32)
+
+    @staticmethod
+    def build_vocabulary(doc_freqs: Dict[str, int], doc_count: int) -> Tuple[Dict[str, int], np.ndarray]:
+        """(token -> cột, IDF theo cột) với IDF = ln((1 + N) / (1 + df)) + 1; bỏ token quá phổ biến"""
+        max_df = max(doc_count * TEXT_MAX_DF, 1)
+        terms = sorted(term for term, df in doc_freqs.items() if df <= max_df)
+        frequencies = np.array([doc_freqs[term] for term in terms], dtype=np.float64)
+        idf = (np.log((1 + doc_count) / (1 + frequencies)) + 1).astype(np.float32)
+        return {term: column for column, term in enumerate(terms)}, idf
+
+    @classmethod
+    def load_vocabulary(cls, db) -> Tuple[Dict[str, int], np.ndarray]:
+        from database.crud import JobTextCRUD, TermStatCRUD
+
+        return cls.build_vocabulary(TermStatCRUD.get_doc_freqs(db), JobTextCRUD.count_texts(db))
+
+    @classmethod
+    def build(cls, vocabulary: Tuple[Dict[str, int], np.ndarray], job_ids: np.ndarray,
+              job_texts: Iterable[Tuple[int, Optional[str]]]) -> "TextIndex":
+        """vocabulary: build_vocabulary(); job_texts: (JobId, Tokens), job không có trong job_ids bị bỏ qua"""
+        wanted = set(job_ids.tolist())
+        counts = TermCounts()
+        counts.add((job_id, tokens) for job_id, tokens in job_texts if job_id in wanted)
+        return counts.index(vocabulary, job_ids)
+
+    def similarity(self, profiles: Sequence[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (cosine CVs x jobs giữa token text của CV (profile['terms']) và mô tả job,
+        cờ 0/1 CV có token nào trong vocabulary)
+        """
+        rows, columns = [], []
+        for row, tokens in enumerate(profile["terms"] for profile in profiles):
+            known = [column for column in map(self.vocabulary.get, tokens) if column is not None]
+            rows.extend([row] * len(known))
+            columns.extend(known)
+        keys, counts = np.unique(np.asarray(rows, dtype=np.int64) * len(self.vocabulary)
+                                 + np.asarray(columns, dtype=np.int64), return_counts=True)
+        rows, columns = np.divmod(keys, max(len(self.vocabulary), 1))
+        queries = sparse.csr_matrix(
+            (tfidf_weights(rows, columns, counts, self.idf, len(profiles)), (rows, columns)),
+            shape=(len(profiles), len(self.vocabulary)), dtype=np.float32,
+        )
+        has_text = (np.diff(queries.indptr) > 0).astype(np.float32)[:, None]
+        return (queries @ self.postings).toarray(), has_text
+
+
+class MatchingEngine:
+    """
+    Chấm điểm CV với mọi job bằng phép nhân ma trận thưa thay vì vòng lặp Python.
+
+    Job giữ dưới dạng ma trận CSR jobs x skills (vocabulary là Skills.Id) cùng các
+    mảng feature (mã thành phố, số năm kinh nghiệm tối thiểu). Một CV là một vector
+    skill, một batch CV là ma trận CVs x skills; số skill trùng của mọi cặp CV/job
+    là một phép nhân sparse, các thành phần còn lại là phép toán trên mảng. Top-K
+    chọn bằng argpartition. Độ tương đồng giữa text CV và mô tả job (TextIndex) là
+    một tiêu chí nữa khi engine có text.
+
+    Chỉ job mới nhất của mỗi nhóm tin trùng (ClusterId) được đưa vào ma trận.
+    """
+
+    def __init__(self, job_ids: np.ndarray, skills: sparse.csr_matrix, skill_vocab: Dict[int, int],
+                 city_codes: np.ndarray, city_vocab: Dict[str, int], min_years: np.ndarray,
+                 text: Optional[TextIndex] = None):
+        self.job_ids = job_ids
+        self.text = text
+        self.skills = skills
+        self.skill_vocab = skill_vocab
+        self.skill_ids = np.empty(len(skill_vocab), dtype=np.int64)
+        for skill_id, column in skill_vocab.items():
+            self.skill_ids[column] = skill_id
+        self.city_codes = city_codes
+        self.city_vocab = city_vocab
+        self.min_years = min_years
+        self.built_at = time.monotonic()
+        self.corpus_version = self._fingerprint()
+
+        # Hệ số theo job tính một lần, điểm một batch chỉ còn nhân/cộng float32 trên mảng
+        skill_counts = np.diff(skills.indptr)
+        self.has_skills = (skill_counts > 0).astype(np.float32)
+        self.skill_scale = np.divide(SKILL_WEIGHT, skill_counts, out=np.zeros(len(job_ids), np.float32),
+                                     where=skill_counts > 0).astype(np.float32)
+        self.has_years = (~np.isnan(min_years)).astype(np.float32)
+        self.years_inverse = np.divide(1.0, min_years, out=np.zeros(len(job_ids), np.float32),
+                                       where=min_years > 0).astype(np.float32)
+        # Job không yêu cầu năm kinh nghiệm (0) được điểm kinh nghiệm tối đa
+        self.years_free = (min_years == 0).astype(np.float32)
+        self.has_city = (city_codes >= 0).astype(np.float32)
+        self.remote = (city_codes == city_vocab[REMOTE]) if REMOTE in city_vocab else np.zeros(len(job_ids), bool)
+
+    def _fingerprint(self) -> str:
+        """Hash của mọi dữ liệu dùng để chấm điểm: tập job không đổi thì phiên bản không đổi"""
+        digest = hashlib.blake2b(digest_size=8)
+        for array in (self.job_ids, self.skills.indptr, self.skill_ids[self.skills.indices], self.min_years,
+                      self.city_codes):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        # Mã thành phố trong city_codes là vị trí trong city_vocab (theo thứ tự gặp)
+        digest.update("\x1f".join(sorted(self.city_vocab, key=self.city_vocab.get)).encode("utf-8"))
+        if self.text is not None:
+            for array in (self.text.postings.indptr, self.text.postings.indices, self.text.postings.data):
+                digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()
+
+    def __len__(self):
+        return len(self.job_ids)
+
+    @classmethod
+    def build(cls, features: Sequence[tuple], job_skills: Sequence[Tuple[int, int]],
+              job_texts: Optional[Iterable[Tuple[int, Optional[str]]]] = None,
+              vocabulary: Optional[Tuple[Dict[str, int], np.ndarray]] = None,
+              term_counts: Optional[TermCounts] = None) -> "MatchingEngine":
+        """
+        features: (Id, ClusterId, CityCode, MinYearsExperience) theo thứ tự mới nhất
+        trước (JobFeatureCRUD.get_matching_features); job_skills: cặp (JobId, SkillId).
+        Chấm cả text khi có vocabulary (TextIndex.load_vocabulary), tf lấy từ term_counts
+        hoặc đếm từ job_texts: (JobId, Tokens)
+        """
+        job_ids, city_codes, min_years = [], [], []
+        city_vocab: Dict[str, int] = {}
+        seen_clusters = set()
+        for job_id, cluster_id, city_code, years in features:
+            cluster = cluster_id or job_id
+            if cluster in seen_clusters:
+                continue
+            seen_clusters.add(cluster)
+            job_ids.append(job_id)
+            city_codes.append(city_vocab.setdefault(city_code, len(city_vocab)) if city_code else -1)
+            min_years.append(np.nan if years is None else years)
+
+        ids = np.asarray(job_ids, dtype=np.int64)
+        pairs = np.asarray(job_skills, dtype=np.int64).reshape(-1, 2)
+        # JobId -> hàng trong ma trận; bỏ cặp của job không được giữ (tin trùng)
+        order = np.argsort(ids, kind="stable")
+        positions = np.searchsorted(ids[order], pairs[:, 0]) if len(ids) else np.zeros(len(pairs), np.int64)
+        positions = np.minimum(positions, max(len(ids) - 1, 0))
+        kept = (ids[order][positions] == pairs[:, 0]) if len(ids) else np.zeros(len(pairs), bool)
+        rows = order[positions[kept]]
+        skill_values, columns = np.unique(pairs[kept, 1], return_inverse=True)
+        skill_vocab = {int(skill_id): column for column, skill_id in enumerate(skill_values)}
+
+        matrix = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, columns.reshape(-1))),
+            shape=(len(ids), len(skill_vocab)),
+        )
+        # JobSkill có khóa chính (JobId, SkillId) nhưng vẫn ép về nhị phân cho chắc
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0
+        text = None
+        if vocabulary is not None and term_counts is not None:
+            text = term_counts.index(vocabulary, ids)
+        elif vocabulary is not None:
+            text = TextIndex.build(vocabulary, ids, job_texts or [])
+        return cls(ids, matrix, skill_vocab, np.asarray(city_codes, dtype=np.int32), city_vocab,
+                   np.asarray(min_years, dtype=np.float32), text)
+
+    @classmethod
+    def load(cls, db) -> "MatchingEngine":
+        from database.crud import JobFeatureCRUD
+
+        started = time.monotonic()
+        # tf của JobTexts giữ giữa các lần load, chỉ đếm text mới/đổi
+        _term_counts.refresh(db)
+        engine = cls.build(JobFeatureCRUD.get_matching_features(db), JobFeatureCRUD.get_job_skill_pairs(db),
+                           vocabulary=TextIndex.load_vocabulary(db), term_counts=_term_counts)
+        logger.info(f"Built matching index: {len(engine)} jobs x {len(engine.skill_vocab)} skills, "
+                    f"{engine.skills.nnz} entries, {engine.text.postings.nnz} text entries "
+                    f"({len(engine.text.vocabulary)} terms) in {time.monotonic() - started:.2f}s")
+        return engine
+
+    def profile_matrix(self, profiles: Sequence[Dict[str, Any]]) -> sparse.csr_matrix:
+        """Ma trận CVs x skills của các profile (cv_profile); skill không job nào có thì bỏ qua"""
+        rows, columns = [], []
+        for row, profile in enumerate(profiles):
+            for skill_id in profile["skills"]:
+                column = self.skill_vocab.get(skill_id)
+                if column is not None:
+                    rows.append(row)
+                    columns.append(column)
+        return sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, columns)),
+            shape=(len(profiles), len(self.skill_vocab)),
+        )
+
+    def score(self, profiles: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """Ma trận điểm CVs x jobs (float32) của một batch profile"""
+        # Số skill trùng của mọi cặp: (jobs x skills, CSR) @ (skills x CVs, dense), một lượt qua
+        # các phần tử khác 0 của ma trận job
+        overlap = (self.skills @ self.profile_matrix(profiles).T.toarray()).T
+
+        has_cv_skills = np.array([bool(p["skills"]) for p in profiles], dtype=np.float32)[:, None]
+        years = np.array([p["years"] or 0.0 for p in profiles], dtype=np.float32)[:, None]
+        has_cv_years = np.array([p["years"] is not None for p in profiles], dtype=np.float32)[:, None]
+        cities = np.array([self.city_vocab.get(p["city_code"], -2) if p["city_code"] else -1 for p in profiles],
+                          dtype=np.int32)[:, None]
+        has_cv_city = (cities != -1).astype(np.float32)
+
+        # Mỗi thành phần chỉ tính khi cả CV và job có dữ liệu (nhân với cờ 0/1); `weights` là tổng
+        # trọng số các thành phần được tính của từng cặp
+        scores = overlap * self.skill_scale
+        weights = has_cv_skills * self.has_skills * SKILL_WEIGHT
+
+        experience_used = has_cv_years * self.has_years
+        scores += np.minimum(years * self.years_inverse + self.years_free, 1) * experience_used * EXPERIENCE_WEIGHT
+        weights += experience_used * EXPERIENCE_WEIGHT
+
+        location_used = has_cv_city * self.has_city
+        scores += ((self.city_codes == cities) | self.remote) * location_used * LOCATION_WEIGHT
+        weights += location_used * LOCATION_WEIGHT
+
+        if self.text is not None:
+            similarity, has_cv_text = self.text.similarity(profiles)
+            scores += similarity * TEXT_WEIGHT
+            weights += has_cv_text * self.text.has_text * TEXT_WEIGHT
+
+        # Cặp không có tiêu chí nào để so được 0 điểm
+        return np.divide(scores, weights, out=np.zeros_like(scores), where=weights > 0)
+
+    @staticmethod
+    def top_k(scores: np.ndarray, k: int, min_score: float = 0.0) -> List[Tuple[int, float]]:
+        """(vị trí job, điểm) của tối đa k job điểm cao nhất trong một hàng điểm, giảm dần"""
+        if k <= 0 or not len(scores):
+            return []
+        if k < len(scores):
+            candidates = np.argpartition(scores, -k)[-k:]
+        else:
+            candidates = np.arange(len(scores))
+        candidates = candidates[scores[candidates] > min_score]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(int(index), float(scores[index])) for index in candidates]
+
+    def match(self, profiles: Sequence[Dict[str, Any]], k: int = 10, min_score: float = 0.3
+              ) -> List[Dict[str, Any]]:
+        """
+        Top-k job của từng profile: [{'matches_found': số job > min_score,
+        'top': [(JobId, điểm, vị trí job), ...]}, ...]
+        """
+        results = []
+        # Chấm theo từng nhóm CV: ma trận điểm CVs x jobs của cả batch lớn vượt cache CPU
+        for start in range(0, len(profiles), SCORE_CHUNK_ROWS):
+            for row in self.score(profiles[start:start + SCORE_CHUNK_ROWS]):
+                top = self.top_k(row, k, min_score)
+                results.append({
+                    "matches_found": int(np.count_nonzero(row > min_score)),
+                    "top": [(int(self.job_ids[index]), score, index) for index, score in top],
+                })
+        return results
+
+    def job_skill_ids(self, index: int) -> List[int]:
+        """Skills.Id của job ở vị trí index"""
+        start, end = self.skills.indptr[index], self.skills.indptr[index + 1]
+        return self.skill_ids[self.skills.indices[start:end]].tolist()
+
+    def job_min_years(self, index: int) -> Optional[int]:
+        value = self.min_years[index]
+        return None if np.isnan(value) else int(value)
+
+
+_engine: Optional[MatchingEngine] = None
+_term_counts = TermCounts()
+_engine_lock = threading.Lock()
+
+
+def get_engine(db, max_age: float = MATCHING_INDEX_MAX_AGE) -> MatchingEngine:
+    """MatchingEngine dùng chung trong process worker, load lại khi cũ hơn max_age giây"""
+    global _engine
+    with _engine_lock:
+        if _engine is None or time.monotonic() - _engine.built_at > max_age:
+            _engine = MatchingEngine.load(db)
+        return _engine
@@ -1,21 +1,87 @@
-from celery import current_task
+from celery import chord, current_task, group
+from celery.exceptions import SoftTimeLimitExceeded
 from worker.celery_app import celery_app
-import subprocess
-import sys
+import hashlib
 import os
+import shutil
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import logging
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def start_scraping_job(task_id: str, source: str, max_jobs: int, scraping_job_id: Optional[int] = None,
+                       shard: Optional[str] = None, parent_id: Optional[int] = None) -> Optional[int]:
+    """Đánh dấu ScrapingJob đang chạy (tạo mới nếu task không được gọi từ API), trả về Id"""
+    from database.db import get_db_context
+    from database.crud import ScrapingJobCRUD
+    
+    try:
+        with get_db_context() as db:
+            if scraping_job_id is None:
+                # Task retry giữ nguyên task id nên không tạo thêm dòng mới
+                db_job = ScrapingJobCRUD.get_scraping_job_by_task_id(db, task_id)
+                if db_job is None:
+                    db_job = ScrapingJobCRUD.create_scraping_job(db, source, task_id=task_id, max_jobs=max_jobs,
+                                                                 shard=shard, parent_id=parent_id)
+                scraping_job_id = db_job.Id
+            ScrapingJobCRUD.update_scraping_job_status(
+                db, scraping_job_id, "running",
+                TaskId=task_id, StartedAt=datetime.utcnow(), CompletedAt=None, ErrorMessage=None
+            )
+        return scraping_job_id
+    except Exception as e:
+        # Telemetry lỗi không được làm hỏng lần crawl
+        logger.warning(f"Cannot record start of scraping job for {source}: {e}")
+        return scraping_job_id
+
+def finish_scraping_job(scraping_job_id: Optional[int], status: str, stats: Optional[Dict[str, Any]] = None,
+                        error_message: Optional[str] = None, save_stats: bool = True):
+    """
+    Ghi kết quả và stats của lần crawl vào ScrapingJobs / ScrapingJobStats.
+    Dòng cha của crawl chia shard không lưu ScrapingJobStats (đã có ở từng shard).
+    """
+    if scraping_job_id is None:
+        return
+    from database.db import get_db_context
+    from database.crud import ScrapingJobCRUD
+    from worker.crawler import crawl_stats_row
+    
+    try:
+        with get_db_context() as db:
+            ScrapingJobCRUD.update_scraping_job_status(
+                db, scraping_job_id, status,
+                CompletedAt=datetime.utcnow(),
+                JobsScraped=(stats or {}).get('item_scraped_count', 0),
+                ErrorMessage=error_message
+            )
+            if stats and save_stats:
+                ScrapingJobCRUD.save_scraping_job_stats(db, scraping_job_id, crawl_stats_row(stats))
+    except Exception as e:
+        logger.warning(f"Cannot record result of scraping job {scraping_job_id}: {e}")
+
+def crawl_state_dir(project_path: str, source: str, task_id: str) -> str:
+    """Thư mục JOBDIR của một task scrape"""
+    return os.path.join(project_path, 'state', 'crawls', source, task_id)
+
 @celery_app.task(bind=True, name='worker.tasks.scrape_jobs')
-def scrape_jobs(self, source: str, max_jobs: int = 50) -> Dict[str, Any]:
+def scrape_jobs(self, source: str, max_jobs: int = 50, scraping_job_id: Optional[int] = None,
+                resume_from: Optional[str] = None, shard: Optional[str] = None,
+                parent_id: Optional[int] = None) -> Dict[str, Any]:
     """
     Scrape jobs from specified source using Scrapy
+
+    Mỗi task có thư mục state riêng (JOBDIR: disk queue, request đã thấy, state
+    của spider) theo task id. Retry giữ nguyên task id nên chạy tiếp từ chỗ dừng;
+    task đã bị cancel thì chạy lại bằng `resume_from=<task id cũ>`, state được
+    chuyển sang task mới.
+
+    `shard="i/n"`: chỉ crawl phần i trong n phần của source (xem plan_scrape);
+    khi đó giới hạn request/giây chung của source (Redis) được bật.
     """
+    scraping_job_id = start_scraping_job(self.request.id, source, max_jobs, scraping_job_id, shard, parent_id)
     try:
         # Update task status
         self.update_state(
@@ -32,57 +98,189 @@ def scrape_jobs(self, source: str, max_jobs: int = 50) -> Dict[str, Any]:
         output_dir = os.path.join(project_path, 'outputs')
         os.makedirs(output_dir, exist_ok=True)
         
-        # Build Scrapy command
-        output_file = os.path.join(output_dir, f'{source}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json')
-        
-        cmd = [
-            sys.executable, '-m', 'scrapy', 'crawl', source,
-            '-s', f'CLOSESPIDER_ITEMCOUNT={max_jobs}',
-            '-s', 'LOG_LEVEL=INFO',
-            '-o', output_file,
-            '--nolog'
-        ]
-        
-        logger.info(f"Starting Scrapy crawl for {source}")
-        logger.info(f"Command: {' '.join(cmd)}")
-        logger.info(f"Working directory: {project_path}")
-        logger.info(f"Output file: {output_file}")
-        
-        # Execute Scrapy command
-        process = subprocess.Popen(
-            cmd,
-            cwd=project_path,  # Set working directory to project root
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            shell=False
-        )
+        # JSON Lines nén gzip, xoay file theo dung lượng (xem JsonLinesFeedExtension)
+        feed_dir = os.path.join(output_dir, f'{source}_{datetime.now().strftime("%Y%m%d_%H%M%S")}')
+        if shard:
+            feed_dir += f'_shard{shard.replace("/", "of")}'
         
-        # Wait for process to complete
-        stdout, stderr = process.communicate()
-        return_code = process.returncode
+        job_dir = crawl_state_dir(project_path, source, self.request.id)
+        if resume_from:
+            # Chuyển state của task cũ sang task id mới để task này cũng resume được nếu bị dừng
+            previous_dir = crawl_state_dir(project_path, source, resume_from)
+            if os.path.exists(previous_dir) and not os.path.exists(job_dir):
+                os.replace(previous_dir, job_dir)
+        crawl_settings = {
+            'CLOSESPIDER_ITEMCOUNT': max_jobs,
+            'JSONL_FEED_DIR': feed_dir,
+            'JOBDIR': job_dir,
+        }
+        spider_kwargs = {}
+        if shard:
+            spider_kwargs['shard'] = shard
         
-        logger.info(f"Scrapy stdout: {stdout}")
-        logger.info(f"Scrapy stderr: {stderr}")
-        logger.info(f"Scrapy return code: {return_code}")
+        logger.info(f"Starting Scrapy crawl for {source}" + (f" (shard {shard})" if shard else ""))
+        logger.info(f"Feed directory: {feed_dir}")
+        if os.path.exists(job_dir):
+            logger.info(f"Resuming crawl state from {job_dir}")
         
-        if return_code == 0:
-            logger.info(f"Successfully scraped jobs from {source}")
-            return {
-                'status': 'success',
-                'source': source,
-                'jobs_scraped': max_jobs,
-                'completed_at': datetime.utcnow().isoformat()
-            }
+        def report_progress(stats: Dict[str, Any]):
+            self.update_state(
+                state='PROGRESS',
+                meta={
+                    'current': stats.get('item_scraped_count', 0),
+                    'total': max_jobs,
+                    'status': 'Scraping...'
+                }
+            )
+        
+        # Chạy spider trong reactor của worker process, không fork `scrapy crawl`
+        from worker.crawler import crawl_executor, json_safe_stats
+        stats = crawl_executor.crawl(source, settings=crawl_settings, on_progress=report_progress, **spider_kwargs)
+        
+        if stats.get('finish_reason') == 'shutdown':
+            # Crawl bị dừng giữa chừng (worker shutdown): giữ JOBDIR để chạy tiếp
+            finish_scraping_job(scraping_job_id, "cancelled", stats)
         else:
-            error_msg = f"Scrapy failed with return code {return_code}. Stderr: {stderr}"
-            logger.error(error_msg)
-            raise Exception(error_msg)
+            shutil.rmtree(job_dir, ignore_errors=True)
+            finish_scraping_job(scraping_job_id, "completed", stats)
+        
+        logger.info(f"Successfully scraped jobs from {source}: {stats.get('finish_reason')}")
+        return {
+            'status': 'success',
+            'source': source,
+            'shard': shard,
+            'scraping_job_id': scraping_job_id,
+            'jobs_scraped': stats.get('item_scraped_count', 0),
+            'finish_reason': stats.get('finish_reason'),
+            'feed_dir': feed_dir,
+            'job_dir': job_dir if os.path.exists(job_dir) else None,
+            'stats': json_safe_stats(stats),
+            'completed_at': datetime.utcnow().isoformat()
+        }
             
+    except SoftTimeLimitExceeded:
+        # Cancel (revoke với SIGUSR1) hoặc hết soft time limit: crawl đã dừng êm và lưu
+        # JOBDIR, không retry; chạy tiếp bằng resume_from
+        logger.warning(f"Scrape task {self.request.id} for {source} was stopped, crawl state kept")
+        finish_scraping_job(scraping_job_id, "cancelled", error_message="Stopped before completion")
+        raise
     except Exception as e:
         logger.error(f"Error in scrape_jobs task: {e}")
+        finish_scraping_job(scraping_job_id, "failed", error_message=str(e))
+        # Retry giữ task id -> dùng lại JOBDIR, chỉ crawl phần còn lại
         raise self.retry(exc=e, countdown=60, max_retries=3)
 
+@celery_app.task(bind=True, name='worker.tasks.plan_scrape')
+def plan_scrape(self, source: str, shards: int = 4, max_jobs: int = 500,
+                scraping_job_id: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Chia crawl một source thành `shards` task scrape_jobs chạy song song (chord).
+
+    Shard i crawl các page i, i + n, i + 2n, ... nên full refresh tăng tốc theo số
+    worker; tổng request/giây của source vẫn bị giới hạn bởi GLOBAL_RATE_LIMITS.
+    Khi mọi shard xong, merge_shards gộp stats và kết quả vào dòng ScrapingJobs
+    của planner.
+    """
+    scraping_job_id = start_scraping_job(self.request.id, source, max_jobs, scraping_job_id)
+    try:
+        # CLOSESPIDER_ITEMCOUNT tính theo từng shard
+        per_shard = -(-max_jobs // shards)
+        header = group(
+            scrape_jobs.s(source, per_shard, shard=f"{index}/{shards}", parent_id=scraping_job_id)
+            for index in range(shards)
+        )
+        callback = merge_shards.s(source, scraping_job_id).on_error(
+            shard_plan_failed.s(scraping_job_id=scraping_job_id))
+        result = chord(header)(callback)
+        
+        logger.info(f"Planned {shards} shards for {source}, merge task {result.id}")
+        return {
+            'status': 'planned',
+            'source': source,
+            'shards': shards,
+            'scraping_job_id': scraping_job_id,
+            'merge_task_id': result.id,
+            # result.parent là GroupResult của các shard (None khi chạy eager)
+            'shard_task_ids': [shard_result.id for shard_result in getattr(result.parent, 'results', None) or []]
+        }
+    except Exception as e:
+        logger.error(f"Error in plan_scrape task: {e}")
+        finish_scraping_job(scraping_job_id, "failed", error_message=str(e))
+        raise
+
+@celery_app.task(bind=True, name='worker.tasks.merge_shards')
+def merge_shards(self, results: List[Dict[str, Any]], source: str,
+                 scraping_job_id: Optional[int] = None) -> Dict[str, Any]:
+    """Gộp kết quả các shard của plan_scrape (callback của chord)"""
+    from worker.crawler import merge_crawl_stats
+    
+    stats = merge_crawl_stats([result.get('stats') or {} for result in results])
+    cancelled = any(result.get('finish_reason') == 'shutdown' for result in results)
+    finish_scraping_job(scraping_job_id, "cancelled" if cancelled else "completed", stats, save_stats=False)
+    
+    logger.info(f"Merged {len(results)} shards of {source}: {stats.get('item_scraped_count', 0)} jobs")
+    return {
+        'status': 'success',
+        'source': source,
+        'scraping_job_id': scraping_job_id,
+        'shards': len(results),
+        'jobs_scraped': stats.get('item_scraped_count', 0),
+        'finish_reason': stats.get('finish_reason'),
+        'feed_dirs': [result.get('feed_dir') for result in results],
+        'shard_results': [
+            {key: result.get(key) for key in ('shard', 'scraping_job_id', 'jobs_scraped', 'finish_reason', 'job_dir')}
+            for result in results
+        ],
+        'stats': stats,
+        'completed_at': datetime.utcnow().isoformat()
+    }
+
+@celery_app.task(name='worker.tasks.shard_plan_failed')
+def shard_plan_failed(request, exc, traceback, scraping_job_id: Optional[int] = None):
+    """Errback của chord: một shard hỏng hẳn (hết retry / bị cancel) thì đánh dấu dòng của planner"""
+    logger.error(f"Shard task {request.id} failed: {exc}")
+    status = "cancelled" if isinstance(exc, SoftTimeLimitExceeded) else "failed"
+    finish_scraping_job(scraping_job_id, status, error_message=f"Shard task {request.id} failed: {exc}")
+
+@celery_app.task(bind=True, name='worker.tasks.load_feed')
+def load_feed(self, feed_dir: str, follow: bool = False, batch_size: int = 500) -> Dict[str, Any]:
+    """
+    Stream a JSON Lines feed directory into JobsDes; retries resume from the feed checkpoint
+    """
+    try:
+        from jobsscraping.dedup import NearDuplicateIndex
+        from jobsscraping.features import JobFeatureExtractor
+        from jobsscraping.feeds import FeedLoader
+        from jobsscraping.matchdelta import MatchDeltaNotifier
+        from jobsscraping.text import JobTextNormalizer
+        
+        self.update_state(state='PROGRESS', meta={'status': f'Loading {feed_dir}...'})
+        loader = FeedLoader(feed_dir, batch_size=batch_size, dedup_index=NearDuplicateIndex(),
+                            feature_extractor=JobFeatureExtractor(), text_normalizer=JobTextNormalizer(),
+                            match_notifier=MatchDeltaNotifier())
+        result = loader.run(follow=follow)
+        
+        logger.info(f"Loaded feed {feed_dir}: {result}")
+        return {
+            'status': 'success',
+            'feed_dir': feed_dir,
+            **result,
+            'completed_at': datetime.utcnow().isoformat()
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in load_feed task: {e}")
+        raise self.retry(exc=e, countdown=60, max_retries=3)
+
+# Số CV chấm và ghi JobMatch mỗi lượt của process_batch_matches
+MATCH_BATCH_SIZE = 32
+# Số JobMatch tối đa lưu cho mỗi CV (API trả tối đa 200)
+MATCH_SAVE_TOP_K = 200
+# Điểm tối thiểu để lưu JobMatch
+MATCH_MIN_SCORE = 0.3
+# Số CV đọc và cập nhật mỗi lượt của match_new_jobs
+MATCH_DELTA_CV_BATCH = 256
+
 @celery_app.task(bind=True, name='worker.tasks.process_job_matches')
 def process_job_matches(self, cv_id: int) -> Dict[str, Any]:
     """
@@ -96,56 +294,224 @@ def process_job_matches(self, cv_id: int) -> Dict[str, Any]:
         
         # Import here to avoid circular imports
         from database.db import get_db_context
-        from database.crud import JobCRUD, CVCRUD
+        from database.crud import CVCRUD, JobMatchCRUD
+        from worker.matching import get_engine
         
         with get_db_context() as db:
             # Get CV
-            cv = CVCRUD.get_cvs_by_user_id(db, cv_id)
-            if not cv:
-                raise Exception(f"CV not found for user {cv_id}")
-            
-            # Get all active jobs
-            jobs = JobCRUD.search_jobs(db, "", limit=1000)
+            cvs = CVCRUD.get_cvs_for_matching(db, [cv_id])
+            if not cvs:
+                raise Exception(f"CV {cv_id} not found")
+            cv = cvs[0]
             
-            # Calculate match scores
-            matches = []
-            for job in jobs:
-                match_score = calculate_match_score(cv, job)
-                if match_score > 0.3:  # Only include matches > 30%
-                    matches.append({
-                        'job_id': job.id,
-                        'cv_id': cv.id,
-                        'match_score': match_score,
-                        'matched_skills': get_matched_skills(cv, job),
-                        'matched_experience': get_matched_experience(cv, job)
-                    })
+            # Chấm điểm với mọi job (mỗi nhóm tin trùng một job) bằng ma trận job x skill
+            # dùng chung trong worker; top MATCH_SAVE_TOP_K được lưu vào JobMatch thay cho kết quả cũ
+            profile = cv_profile(cv)
+            engine = get_engine(db)
+            result = engine.match([profile], k=MATCH_SAVE_TOP_K, min_score=MATCH_MIN_SCORE)[0]
+            JobMatchCRUD.replace_job_matches(db, [cv.Id], job_match_rows(engine, cv.Id, profile, result),
+                                             states=[match_state_row(cv.Id, profile, engine.corpus_version)])
+            matches = [{
+                'job_id': job_id,
+                'cv_id': cv.Id,
+                'match_score': score,
+                'matched_skills': get_matched_skills(profile, engine.job_skill_ids(index)),
+                'matched_experience': get_matched_experience(profile, engine.job_min_years(index))
+            } for job_id, score, index in result['top'][:10]]
             
-            # Sort by match score
-            matches.sort(key=lambda x: x['match_score'], reverse=True)
-            
-            logger.info(f"Found {len(matches)} job matches for CV {cv_id}")
+            logger.info(f"Found {result['matches_found']} job matches for CV {cv_id}")
             
             return {
                 'status': 'success',
                 'cv_id': cv_id,
-                'matches_found': len(matches),
-                'top_matches': matches[:10]  # Return top 10 matches
+                'matches_found': result['matches_found'],
+                'matches_saved': len(result['top']),
+                'top_matches': matches  # Return top 10 matches
             }
             
     except Exception as e:
         logger.error(f"Error in process_job_matches task: {e}")
         raise self.retry(exc=e, countdown=60, max_retries=3)
 
+@celery_app.task(bind=True, name='worker.tasks.process_batch_matches')
+def process_batch_matches(self, cv_ids: List[int], min_score: float = MATCH_MIN_SCORE,
+                          top_k: int = MATCH_SAVE_TOP_K) -> Dict[str, Any]:
+    """
+    Chấm điểm nhiều CV trong một task: ma trận job chỉ load một lần, mỗi lượt
+    MATCH_BATCH_SIZE CV được chấm cùng nhau và JobMatch của chúng được ghi lại
+    bằng một lần bulk insert. Tiến độ báo qua một state PROGRESS duy nhất.
+    """
+    try:
+        from database.db import get_db_context
+        from database.crud import CVCRUD, JobMatchCRUD
+        from worker.matching import get_engine
+        
+        cv_ids = list(dict.fromkeys(cv_ids))
+        self.update_state(
+            state='PROGRESS',
+            meta={'current': 0, 'total': len(cv_ids), 'status': 'Loading job matrix...'}
+        )
+        
+        results = []
+        matches_saved = 0
+        with get_db_context() as db:
+            engine = get_engine(db)
+            for start in range(0, len(cv_ids), MATCH_BATCH_SIZE):
+                chunk = cv_ids[start:start + MATCH_BATCH_SIZE]
+                cvs = CVCRUD.get_cvs_for_matching(db, chunk)
+                profiles = [cv_profile(cv) for cv in cvs]
+                
+                rows = []
+                for cv, profile, result in zip(cvs, profiles, engine.match(profiles, k=top_k, min_score=min_score)):
+                    rows.extend(job_match_rows(engine, cv.Id, profile, result))
+                    results.append({'cv_id': cv.Id, 'matches_found': result['matches_found'],
+                                    'matches_saved': len(result['top'])})
+                JobMatchCRUD.replace_job_matches(db, [cv.Id for cv in cvs], rows,
+                                                 states=[match_state_row(cv.Id, p, engine.corpus_version)
+                                                         for cv, p in zip(cvs, profiles)])
+                matches_saved += len(rows)
+                
+                self.update_state(
+                    state='PROGRESS',
+                    meta={
+                        'current': min(start + len(chunk), len(cv_ids)),
+                        'total': len(cv_ids),
+                        'matches_saved': matches_saved,
+                        'status': f'Matched {min(start + len(chunk), len(cv_ids))}/{len(cv_ids)} CVs'
+                    }
+                )
+        
+        found = {result['cv_id'] for result in results}
+        missing = [cv_id for cv_id in cv_ids if cv_id not in found]
+        logger.info(f"Matched {len(results)} CVs against {len(engine)} jobs, saved {matches_saved} job matches")
+        
+        return {
+            'status': 'success',
+            'cvs_processed': len(results),
+            'cvs_not_found': missing,
+            'matches_saved': matches_saved,
+            'results': results
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in process_batch_matches task: {e}")
+        raise self.retry(exc=e, countdown=60, max_retries=3)
+
+@celery_app.task(bind=True, name='worker.tasks.match_new_jobs')
+def match_new_jobs(self, job_ids: List[int], min_score: float = MATCH_MIN_SCORE,
+                   top_k: int = MATCH_SAVE_TOP_K) -> Dict[str, Any]:
+    """
+    Cập nhật JobMatch sau một lô ingest (MatchDeltaNotifier): chỉ các job mới/đổi
+    được chấm với mọi CV đã có CVMatchState, rồi gộp vào top-K đã lưu của từng CV.
+    CV đổi profile (hoặc chấm bằng công thức cũ) từ lần chấm đầy đủ trước thì chấm
+    lại với mọi job.
+
+    Job đổi có thể làm đổi job đại diện của nhóm tin trùng, nên cả nhóm được chấm
+    lại và JobMatch cũ của mọi job trong nhóm bị thay. Job bị đẩy khỏi top-K không
+    quay lại khi job khác trong top-K giảm điểm; lần chấm đầy đủ kế tiếp sẽ bù.
+    Dòng gộp vào giữ CorpusVersion của lần chấm đầy đủ gần nhất của CV.
+    """
+    try:
+        from database.db import get_db_context
+        from database.crud import CVCRUD, JobCRUD, JobFeatureCRUD, JobMatchCRUD, JobTextCRUD
+        from worker.matching import SCORING_VERSION, MatchingEngine, TextIndex, get_engine
+        
+        with get_db_context() as db:
+            clusters = sorted(set(JobCRUD.get_cluster_ids(db, list(job_ids)).values()))
+            features = JobFeatureCRUD.get_matching_features(db, cluster_ids=clusters)
+            affected = {row[0] for row in features}
+            # IDF lấy từ TermStats của cả corpus nên vector text của các job này giống trong ma trận đầy đủ
+            delta = MatchingEngine.build(features, JobFeatureCRUD.get_job_skill_pairs(db, sorted(affected)),
+                                         JobTextCRUD.iter_tokens(db, sorted(affected)), TextIndex.load_vocabulary(db))
+            
+            states = JobMatchCRUD.get_match_states(db)
+            cv_ids = sorted(states)
+            self.update_state(
+                state='PROGRESS',
+                meta={'current': 0, 'total': len(cv_ids), 'status': f'Matching {len(delta)} new jobs...'}
+            )
+            
+            full_engine = None
+            counts = {'cvs_merged': 0, 'cvs_rescored': 0, 'matches_added': 0, 'matches_removed': 0}
+            for start in range(0, len(cv_ids) if len(delta) else 0, MATCH_DELTA_CV_BATCH):
+                cvs = CVCRUD.get_cvs_for_matching(db, cv_ids[start:start + MATCH_DELTA_CV_BATCH])
+                profiles = [cv_profile(cv) for cv in cvs]
+                stale = [states[cv.Id][:2] != (profile['hash'], SCORING_VERSION) for cv, profile in zip(cvs, profiles)]
+                
+                # CV đổi profile: chấm lại với mọi job, ma trận load lại để có cả job vừa ingest
+                rescore = [(cv, profile) for cv, profile, is_stale in zip(cvs, profiles, stale) if is_stale]
+                if rescore:
+                    if full_engine is None:
+                        full_engine = get_engine(db, max_age=0)
+                    rows = []
+                    results = full_engine.match([profile for _, profile in rescore], k=top_k, min_score=min_score)
+                    for (cv, profile), result in zip(rescore, results):
+                        rows.extend(job_match_rows(full_engine, cv.Id, profile, result))
+                    JobMatchCRUD.replace_job_matches(db, [cv.Id for cv, _ in rescore], rows,
+                                                     states=[match_state_row(cv.Id, p, full_engine.corpus_version)
+                                                             for cv, p in rescore])
+                    counts['cvs_rescored'] += len(rescore)
+                
+                # CV không đổi: chỉ chấm các job trong delta rồi gộp với top-K đã lưu
+                merge = [(cv, profile) for cv, profile, is_stale in zip(cvs, profiles, stale) if not is_stale]
+                if merge:
+                    results = delta.match([profile for _, profile in merge], k=top_k, min_score=min_score)
+                    current = JobMatchCRUD.get_match_scores(db, [cv.Id for cv, _ in merge])
+                    delete_ids, rows = [], []
+                    for (cv, profile), result in zip(merge, results):
+                        stored = current[cv.Id]
+                        if not result['top'] and not any(job_id in affected for _, job_id, _ in stored):
+                            continue
+                        new_rows = job_match_rows(delta, cv.Id, profile, result, corpus_version=states[cv.Id][2])
+                        candidates = [(score, match_id, None) for match_id, job_id, score in stored
+                                      if job_id not in affected]
+                        candidates += [(row['MatchScore'], None, row) for row in new_rows]
+                        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+                        kept = candidates[:top_k]
+                        kept_ids = {match_id for _, match_id, _ in kept if match_id is not None}
+                        delete_ids.extend(match_id for match_id, _, _ in stored if match_id not in kept_ids)
+                        rows.extend(row for _, _, row in kept if row is not None)
+                        counts['cvs_merged'] += 1
+                    if delete_ids or rows:
+                        JobMatchCRUD.merge_job_matches(db, delete_ids, rows)
+                    counts['matches_added'] += len(rows)
+                    counts['matches_removed'] += len(delete_ids)
+                
+                done = min(start + MATCH_DELTA_CV_BATCH, len(cv_ids))
+                self.update_state(
+                    state='PROGRESS',
+                    meta={'current': done, 'total': len(cv_ids), **counts,
+                          'status': f'Matched {done}/{len(cv_ids)} CVs'}
+                )
+        
+        logger.info(f"Matched {len(delta)} new jobs ({len(job_ids)} ingested) against {len(cv_ids)} CVs: {counts}")
+        
+        return {
+            'status': 'success',
+            'jobs_received': len(job_ids),
+            'jobs_scored': len(delta),
+            'cvs_checked': len(cv_ids),
+            **counts
+        }
+        
+    except Exception as e:
+        logger.error(f"Error in match_new_jobs task: {e}")
+        raise self.retry(exc=e, countdown=60, max_retries=3)
+
+# Source crawl theo lịch. topcv chưa có trong lịch: endpoint và field_map của TopCVSpider
+# chưa được kiểm tra với response thật (fixture trong benchmarks là dữ liệu dựng), chạy tay
+# qua /scraping/start
+SCHEDULED_SOURCES = ['topdev', 'vietnamwork', 'linkedin']
+
 @celery_app.task(bind=True, name='worker.tasks.schedule_scraping')
 def schedule_scraping(self) -> Dict[str, Any]:
     """
-    Schedule scraping jobs for all sources
+    Schedule scraping jobs for all sources in SCHEDULED_SOURCES
     """
     try:
-        sources = ['topdev', 'vietnamwork', 'topcv', 'linkedin']
         scheduled_tasks = []
         
-        for source in sources:
+        for source in SCHEDULED_SOURCES:
             # Schedule scraping task
             task = scrape_jobs.delay(source, max_jobs=50)
             scheduled_tasks.append({
@@ -166,51 +532,70 @@ def schedule_scraping(self) -> Dict[str, Any]:
         logger.error(f"Error in schedule_scraping task: {e}")
         raise
 
-def calculate_match_score(cv, job) -> float:
-    """Calculate match score between CV and job"""
-    score = 0.0
-    total_criteria = 0
+def cv_profile(cv) -> Dict[str, Any]:
+    """Feature của CV để so với JobFeatures / JobSkill / JobTexts, tính một lần cho mọi job"""
+    from jobsscraping.features import city_code
+    from jobsscraping.text import tokenize
     
-    # Skill match (40% weight)
-    if cv.skills and job.required_skills:
-        skill_match = len(set(skill.name.lower() for skill in cv.skills) & 
-                         set(job.required_skills.lower().split(',')))
-        total_skills = len(job.required_skills.split(','))
-        if total_skills > 0:
-            score += (skill_match / total_skills) * 0.4
-        total_criteria += 1
+    years = 0.0
+    for experience in cv.WorkExperiences or []:
+        if experience.StartDate:
+            end = experience.EndDate or datetime.utcnow()
+            years += max((end - experience.StartDate).days, 0) / 365.25
+    skills = {cv_skill.SkillId: cv_skill.Skill.Name for cv_skill in cv.Skills or []}
+    location = city_code(cv.User.Address) if cv.User else None
+    # Token cùng cách chuẩn hóa với JobTexts.Tokens; CV nhập tay không có OCR thì dùng Summary
+    terms = tokenize(cv.OCRText or cv.Summary or '')
     
-    # Experience match (30% weight)
-    if cv.work_experiences and job.experience_level:
-        # Add experience matching logic
-        score += 0.3
-        total_criteria += 1
-    
-    # Location match (20% weight)
-    if cv.address and job.location:
-        if cv.address.lower() in job.location.lower() or job.location.lower() in cv.address.lower():
-            score += 0.2
-        total_criteria += 1
+    # Hash những gì quyết định điểm (không tính ngày hiện tại), so với CVMatchState.ProfileHash
+    digest = hashlib.blake2b(digest_size=8)
+    digest.update(repr((sorted(skills), location, sorted(
+        (str(experience.StartDate), str(experience.EndDate)) for experience in cv.WorkExperiences or []
+    ), sorted(terms))).encode('utf-8'))
+    return {
+        'skills': skills,
+        'city_code': location,
+        'years': years if cv.WorkExperiences else None,
+        'terms': terms,
+        'hash': digest.hexdigest(),
+    }
+
+def match_state_row(cv_id: int, profile: Dict[str, Any], corpus_version: str) -> Dict[str, Any]:
+    """Dòng CVMatchState ghi cùng kết quả chấm đầy đủ của một CV với ma trận job `corpus_version`"""
+    from worker.matching import SCORING_VERSION
     
-    # Industry match (10% weight)
-    # Add industry matching logic
-    score += 0.1
-    total_criteria += 1
+    return {
+        'CVId': cv_id,
+        'ProfileHash': profile['hash'],
+        'AlgorithmVersion': SCORING_VERSION,
+        'CorpusVersion': corpus_version,
+        'MatchedAt': datetime.utcnow(),
+    }
+
+def job_match_rows(engine, cv_id: int, profile: Dict[str, Any], result: Dict[str, Any],
+                   corpus_version: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Dòng JobMatch cho top job của một CV (kết quả MatchingEngine.match), kèm phiên bản điểm.
+    CorpusVersion là `corpus_version` nếu có (matching delta), không thì của `engine`
+    """
+    from worker.matching import SCORING_VERSION
     
-    return score / total_criteria if total_criteria > 0 else 0.0
+    return [{
+        'CVId': cv_id,
+        'JobId': job_id,
+        'MatchScore': round(score, 2),
+        'MatchedSkills': get_matched_skills(profile, engine.job_skill_ids(index))[:1000],
+        'AlgorithmVersion': SCORING_VERSION,
+        'CorpusVersion': corpus_version or engine.corpus_version,
+    } for job_id, score, index in result['top']]
 
-def get_matched_skills(cv, job) -> str:
+def get_matched_skills(profile: Dict[str, Any], job_skill_ids: List[int]) -> str:
     """Get matched skills between CV and job"""
-    if not cv.skills or not job.required_skills:
-        return ""
-    
-    cv_skills = set(skill.name.lower() for skill in cv.skills)
-    job_skills = set(skill.strip().lower() for skill in job.required_skills.split(','))
-    matched = cv_skills & job_skills
-    
-    return ", ".join(matched)
+    matched = set(job_skill_ids) & profile['skills'].keys()
+    return ", ".join(sorted(profile['skills'][skill_id] for skill_id in matched))
 
-def get_matched_experience(cv, job) -> str:
+def get_matched_experience(profile: Dict[str, Any], required: Optional[int]) -> str:
     """Get matched experience between CV and job"""
-    # Add experience matching logic
-    return "Experience matching logic to be implemented"
\ No newline at end of file
+    if profile['years'] is None or required is None:
+        return ""
+    return f"{profile['years']:.1f} years of experience, job requires {required}+"